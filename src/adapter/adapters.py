@@ -16,12 +16,19 @@
     # ---------------------------------------------------------------------------------------------
 
 import configuration
+import executor
+import scheduler
 #import eventHandler
 import publishSubscribe
+import metrics
+import tracing
+import profiling
 import inspect
 import threading
+import bisect
 import time
 import re
+import types
 # from spi.manager import SPIManager
 import logging
 
@@ -34,6 +41,193 @@ except ImportError as e:
 
 debug   = False
 verbose = False
+
+try:
+    _string_types = (str, unicode)
+except NameError:
+    _string_types = (str, )
+
+# deadlines of delay() and periodic()
+try:
+    clock = time.monotonic
+except AttributeError:
+    clock = time.time
+
+# shortest interval of periodic() [sec], 0 would loop without waiting
+MIN_PERIOD = 0.001
+
+class _OutputEmitter:
+    """publish targets of one output method, precomputed at configuration time"""
+    
+    def __init__(self, name):
+        self.name = name
+        # (topic, alias) for broadcasts, (topic, alias, _ValueFilter or None) for values
+        self.commands = []
+        self.values = []
+
+class _ValueFilter:
+    """reduces value updates of an output_value, configured by attributes
+       'min.interval', 'max.rate', 'deadband', 'dedupe'.
+       A value suppressed by the interval is sent when the interval is over,
+       unless a newer value replaced it. schedule(delay, callback) runs the
+       send of this value."""
+    
+    def __init__(self, topic, alias, minInterval, deadband, dedupe, schedule):
+        self.topic = topic
+        self.alias = alias
+        self.minInterval = minInterval
+        self.deadband = deadband
+        self.dedupe = dedupe
+        self._schedule = schedule
+        self._lock = threading.Lock()
+        self._last = None
+        self._lastNumeric = None
+        self._lastTime = 0
+        self._pending = None
+        self._task = None
+        self.suppressed = 0
+        
+    def accept(self, value):
+        """True when value can be sent now. Values delayed by the interval
+           are published by a scheduler task."""
+        self._lock.acquire()
+        try:
+            if self._last != None:
+                if self.dedupe and value == self._last:
+                    self._pending = None
+                    self.suppressed += 1
+                    return False
+                if self.deadband != None:
+                    numeric = self._numeric(value)
+                    if numeric != None and self._lastNumeric != None and abs(numeric - self._lastNumeric) < self.deadband:
+                        self._pending = None
+                        self.suppressed += 1
+                        return False
+            if self.minInterval != None:
+                wait = self._lastTime + self.minInterval - clock()
+                if wait > 0:
+                    if self._pending != None:
+                        self.suppressed += 1
+                    self._pending = value
+                    if self._task == None:
+                        self._task = self._schedule(wait, self._flush)
+                    return False
+            self._sent(value)
+            return True
+        finally:
+            self._lock.release()
+            
+    def _flush(self):
+        self._lock.acquire()
+        try:
+            self._task = None
+            value = self._pending
+            if value == None:
+                return
+            self._sent(value)
+        finally:
+            self._lock.release()
+        publishSubscribe.Pub.publish( self.topic, { 'name':self.alias, 'value':value } )
+        
+    def _sent(self, value):
+        self._last = value
+        if self.deadband != None:
+            self._lastNumeric = self._numeric(value)
+        self._lastTime = clock()
+        self._pending = None
+        
+    def _numeric(self, value):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+        
+class _EmitterContext(threading.local):
+    """the emitter of the output method currently executing in a thread"""
+    emitter = None
+
+class PollStatistics:
+    """loop period of a polling adapter, measured from one delay(poll.interval)
+       to the next one. Jitter is the period minus the interval; a period 
+       longer than (1 + OVERRUN) * interval is an overrun."""
+    
+    OVERRUN = 0.5
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.loops = 0
+        self.periodSum = 0.0
+        self.periodMin = None
+        self.periodMax = None
+        self.overruns = 0
+        # jitter count per metrics.BUCKETS, last is above
+        self.jitter = [0] * (len(metrics.BUCKETS) + 1)
+        self.jitterSum = 0.0
+        self._overrunLimit = interval * (1 + self.OVERRUN)
+        self._last = None
+        
+    def tick(self):
+        now = metrics.clock()
+        last = self._last
+        self._last = now
+        if last == None:
+            return
+        period = now - last
+        self.loops += 1
+        self.periodSum += period
+        if self.periodMin == None or period < self.periodMin:
+            self.periodMin = period
+        if self.periodMax == None or period > self.periodMax:
+            self.periodMax = period
+        if period > self._overrunLimit:
+            self.overruns += 1
+        jitter = period - self.interval
+        if jitter < 0:
+            jitter = 0.0
+        self.jitter[ bisect.bisect_left(metrics.BUCKETS, jitter) ] += 1
+        self.jitterSum += jitter
+        
+    def pause(self):
+        """the time till the next tick is not a loop period"""
+        self._last = None
+        
+    def periodMean(self):
+        if self.loops == 0:
+            return None
+        return self.periodSum / self.loops
+        
+    def jitterPercentile(self, p):
+        """upper bucket bound containing the percentile p (0..100), None above last bucket"""
+        if self.loops == 0:
+            return None
+        limit = self.loops * p / 100.0
+        count = 0
+        for bound, c in zip(metrics.BUCKETS, self.jitter):
+            count += c
+            if count >= limit:
+                return bound
+        return None
+        
+    def getMetrics(self):
+        cumulative = []
+        count = 0
+        for c in self.jitter:
+            count += c
+            cumulative.append(count)
+        return ( ('scratchclient_poll_interval_seconds', (), self.interval),
+                 ('scratchclient_poll_period_max_seconds', (), self.periodMax or 0.0),
+                 ('scratchclient_poll_overruns_total', (), self.overruns),
+                 ('scratchclient_poll_jitter_seconds', (), (cumulative, count, self.jitterSum) ) )
+                 
+    def summary(self):
+        """one line of text"""
+        if self.loops == 0:
+            return 'interval {i:.4f}s, no loops'.format(i=self.interval)
+        p99 = self.jitterPercentile(99)
+        return 'interval {i:.4f}s, loops {n:d}, period mean {m:.4f}s min {mi:.4f}s max {ma:.4f}s, jitter mean {j:.4f}s p99 {p:s}, overruns {o:d}'.format(
+            i=self.interval, n=self.loops, m=self.periodMean(), mi=self.periodMin, ma=self.periodMax,
+            j=self.jitterSum / self.loops, p= ('<= {b:g}s'.format(b=p99) if p99 != None else '> {b:g}s'.format(b=metrics.BUCKETS[-1])), 
+            o=self.overruns)
         
 class Adapter (configuration.AdapterSetting):
     """base functionality for adapters"""
@@ -61,6 +255,23 @@ class Adapter (configuration.AdapterSetting):
     #
     mandatoryParameters = None
     mandatoryAlias = None
+    #
+    # when True, each value from scratch is delivered, also when unchanged
+    inputValueRepeat = False
+    #
+    # output_value name --> min.interval [sec], when not configured
+    outputValueMinInterval = {}
+    #
+    # PollStatistics, for adapters with parameter 'poll.interval'
+    pollStatistics = None
+    #
+    # scheduler.Scheduler, with switch -scheduler for adapters implementing poll()
+    scheduler = None
+    pollTask = None
+    #
+    # executor.Executor, shared worker pool for blocking work, see submit()
+    executor = None
+    _ownExecutor = False
 
     # state = None
 
@@ -79,9 +290,15 @@ class Adapter (configuration.AdapterSetting):
         self.outputs = []
         self.input_values = []
         self.output_values = []
-        self.scratchInputValueMethod = []
+        # scratch name --> tuple of input methods
+        self.scratchInputValueMethod = {}
         self.mandatoryAlias = []
-        self.scratchInputMethod = []
+        self.scratchInputMethod = {}
+        
+        self._emitters = {}
+        self._emitting = _EmitterContext()
+        # callers of send(), sendValue() which are no output method, warned
+        self._unboundCallers = set()
         
     def setName(self, name): 
         self.name = name       
@@ -90,10 +307,66 @@ class Adapter (configuration.AdapterSetting):
     def setOutputs(self, outputs):
         """ inputs is configuration.OutputSetting"""
         self.outputs = outputs
+        self._bindEmitters()
         
     def addOutputs(self, outputs):
         """ inputs is configuration.OutputSetting"""
         self.outputs.extend( outputs )
+        self._bindEmitters()
+        
+    def _bindEmitters(self):
+        """bind each output method to an emitter which knows alias and topic.
+        send() and sendValue() use the emitter of the output method they are 
+        called from."""
+        for emitter in self._emitters.values():
+            emitter.commands = []
+            emitter.values = []
+            
+        for ov in self.outputs:
+            if len(ov.scratchNames) > 0:
+                alias = ov.scratchNames[0]
+                topic = "scratch.output.command.{name:s}".format(name=alias)
+                self._getEmitter(ov.name).commands.append( (topic, alias) )
+                
+        for ov in self.output_values:
+            if len(ov.scratchNames) > 0:
+                alias = ov.scratchNames[0]
+                topic = "scratch.output.value.{name:s}".format(name=alias)
+                valueFilter = None
+                minInterval = ov.minInterval
+                if minInterval == None:
+                    minInterval = self.outputValueMinInterval.get(ov.name)
+                # min.interval='0' switches off the adapter default
+                if minInterval == 0:
+                    minInterval = None
+                if minInterval != None or ov.deadband != None or ov.dedupe:
+                    valueFilter = _ValueFilter(topic, alias, minInterval, ov.deadband, ov.dedupe, self._scheduleFlush)
+                self._getEmitter(ov.name).values.append( (topic, alias, valueFilter) )
+                
+    def _getEmitter(self, name):
+        emitter = self._emitters.get(name)
+        if emitter == None:
+            emitter = _OutputEmitter(name)
+            self._emitters[name] = emitter
+            
+            method = getattr(self, name, None)
+            if method != None:
+                self._wrapOutputMethod(name, method, emitter)
+        return emitter
+        
+    def _wrapOutputMethod(self, name, method, emitter):
+        """replace the output method by a method setting the emitter context"""
+        context = self._emitting
+        
+        def emit(_self, *args, **kwargs):
+            previous = context.emitter
+            context.emitter = emitter
+            try:
+                return method(*args, **kwargs)
+            finally:
+                context.emitter = previous
+                
+        setattr(self, name, types.MethodType(emit, self))
 
     def setInputs(self, inputs):
         """ inputs is configuration.InputSetting"""
@@ -101,20 +374,24 @@ class Adapter (configuration.AdapterSetting):
         self._setInputs(inputs)
         
     def _setInputs(self, inputs):
+        self._indexInputs(inputs, self.scratchInputMethod, "scratch.input.command.{name:s}", self.resolveCommand)
+        
+    def _indexInputs(self, inputs, index, topicFormat, resolver):
+        """extend the index scratch name --> tuple of methods. The resolver is 
+        subscribed once for each new scratch name."""
         
         moduleMethodDict = {} # dict( inspect.getmembers(self, inspect.ismethod ) )
         for c in inspect.getmembers(self, inspect.ismethod ):
             moduleMethodDict[c[0]] = c[1]
          
         for inp in inputs:
+            f = moduleMethodDict[inp.name]
             for sn in inp.scratchNames:
-                topic = "scratch.input.command.{name:s}".format(name=sn)
-                publishSubscribe.Pub.subscribe(topic, self.resolveCommand)
-               
-        for inp in inputs:
-            for sn in inp.scratchNames:
-                f = moduleMethodDict[inp.name]
-                self.scratchInputMethod.append( { 'name': sn, 'method' : f} )
+                if sn in index:
+                    index[sn] = index[sn] + (f, )
+                else:
+                    index[sn] = (f, )
+                    publishSubscribe.Pub.subscribe(topicFormat.format(name=sn), resolver)
 
     def addInputs(self, inputs):
         """ inputs is configuration.InputSetting"""
@@ -125,10 +402,12 @@ class Adapter (configuration.AdapterSetting):
     def setOutputValues(self, outputs):
         """ inputs is configuration.InputSetting"""
         self.output_values = outputs
+        self._bindEmitters()
 
     def addOutputValues(self, outputs):
         """ inputs is configuration.InputSetting"""
         self.output_values.extend( outputs)
+        self._bindEmitters()
 
     def setInputValues(self, inputs):
         """ inputs is configuration.InputSetting"""
@@ -141,39 +420,103 @@ class Adapter (configuration.AdapterSetting):
         self._setInputValues(inputs)
         
     def _setInputValues(self, inputs):    
-        moduleMethodDict = {} # dict( inspect.getmembers(self, inspect.ismethod ) )
-        for c in inspect.getmembers(self, inspect.ismethod ):
-            moduleMethodDict[c[0]] = c[1]
-
-        for inp in inputs:
-            for sn in inp.scratchNames:
-                topic = "scratch.input.value.{name:s}".format(name=sn)
-                publishSubscribe.Pub.subscribe(topic, self.resolveValue)
-         
-        for inp in inputs:
-            for sn in inp.scratchNames:
-                f = moduleMethodDict[inp.name]
-                self.scratchInputValueMethod.append( { 'name': sn, 'method' : f} )        
+        self._indexInputs(inputs, self.scratchInputValueMethod, "scratch.input.value.{name:s}", self.resolveValue)
             
+    def setScheduler(self, scheduler):
+        """poll() is called by the scheduler instead of an own thread"""
+        self.scheduler = scheduler
+        
+    def _scheduleFlush(self, delay, callback):
+        """delayed values of the output_value filters run on the scheduler of
+        switch -scheduler, else on a scheduler thread shared by the adapters"""
+        flushScheduler = self.scheduler
+        if flushScheduler == None:
+            flushScheduler = scheduler.shared()
+        return flushScheduler.schedule(None, callback, self.name, delay)
+        
+    def setExecutor(self, executor):
+        """work passed to submit() runs in the shared worker pool"""
+        self.executor = executor
+        
+    def submit(self, callback, args = (), key = None, duplicate = None):
+        """run callback(*args) in a worker thread of the executor, for blocking 
+        work like subprocess calls or network requests. Input methods are called 
+        from the listener thread and must not block.
+        With a key, duplicate 'drop' or 'merge' handles a pending job with the 
+        same key, see executor.py. Jobs of an adapter run one at a time, optional 
+        parameter 'executor.concurrency'; up to 'queue.max' are pending (default 30). 
+        Returns False when the job was dropped."""
+        if self.executor == None:
+            # not started by scratchClient
+            self.executor = executor.Executor(threads = 1)
+            self.executor.setActive(True)
+            self._ownExecutor = True
+        return self.executor.submit(self.name, callback, args, key, duplicate,
+                                    int(self.parameters.get('executor.concurrency', 1)),
+                                    int(self.parameters.get('queue.max', 30)) )
+        
     def start(self):
         """Start adapter Thread"""
+        if self.scheduler != None and self._startPollTask():
+            return
         if debug:
             print("Start adapter Thread")
-        self.thread = threading.Thread(target=self.run)
+        self.thread = threading.Thread(target=profiling.wrap(self.run, self.name))
         self.thread.setName(self.name)
         self._stopEvent.clear()
+        self._startPollStatistics()
         self.thread.start()
         
+    def _startPollTask(self):
+        """register poll() with the scheduler, False if there is no poll.interval"""
+        try:
+            interval = float(self.parameters['poll.interval'])
+        except (KeyError, ValueError):
+            return False
+        self._stopEvent.clear()
+        self._startPollStatistics()
+        self.pollStart()
+        self.pollTask = self.scheduler.schedule(interval, self._poll, self.name)
+        return True
+        
+    def _poll(self):
+        if self.pollStatistics != None:
+            self.pollStatistics.tick()
+        self.poll()
+        
+    def _startPollStatistics(self):
+        """statistics are kept over restarts; the inactive time is no loop period"""
+        if self.pollStatistics != None:
+            self.pollStatistics.pause()
+            return
+        if not 'poll.interval' in self.parameters:
+            return
+        try:
+            self.pollStatistics = PollStatistics( float(self.parameters['poll.interval']) )
+        except ValueError:
+            pass
+        
     def stop(self):
         """stop adapter thread. It is the thread's responsibility to timely shut down"""
         self._stopEvent.set()
+        if self.pollTask != None:
+            self.pollTask.cancel()
+            self.pollTask = None
+        if self.executor != None:
+            self.executor.cancel(self.name)
+            if self._ownExecutor:
+                self.executor.setActive(False)
+                self.executor = None
+                self._ownExecutor = False
         if self.thread != None:
             self.thread.join(1)
-            if self.thread.isAlive():
+            if self.thread.is_alive():
                 logger.debug(self.name +  " no timely join in adapter")
 
     def stopped(self):
         """helper method for the thread's run method to find out whether a stop is pending"""
+        if profiling.enabled:
+            profiling.checkpoint()
         return self._stopEvent.isSet()
 
     def run(self):
@@ -181,6 +524,17 @@ class Adapter (configuration.AdapterSetting):
         logger.debug(self.name + " adapter.run()")
         pass
     
+    def pollStart(self):
+        """polling adapters: initial state before the first poll()"""
+        pass
+    
+    def runPoll(self):
+        """run method for adapters implementing poll(), when not scheduled"""
+        _del = float(self.parameters['poll.interval'])
+        self.pollStart()
+        for _ in self.periodic(_del):
+            self.poll()
+        
     # def registerOutput(self, outputSender):
     #     """used by configurationManager to implement binding to the send-Methods to scratch"""
     #     self.outputSender = outputSender
@@ -201,6 +555,13 @@ class Adapter (configuration.AdapterSetting):
     def isActive (self):
         return self.active
 
+    def getMetrics(self):
+        """metrics of the adapter, as (name, labels, value), asked for on scrape.
+        The label 'adapter' is added by the caller."""
+        if self.pollStatistics != None:
+            return self.pollStatistics.getMetrics()
+        return ()
+        
     
     def sendCommandAlias(self, alias):
         publishSubscribe.Pub.publish( "scratch.output.command.{name:s}".format( name=alias ), { 'name':alias } )
@@ -208,67 +569,91 @@ class Adapter (configuration.AdapterSetting):
     
     def send(self):
         """send a broadcast event to scratch"""
-        callerName = inspect.stack()[1][3]
+        emitter = self._emitting.emitter
+        if emitter == None:
+            emitter = self._callerEmitter( inspect.currentframe().f_back.f_code.co_name, 'send' )
+            if emitter == None:
+                return
         
-        cnt = 0
-        for ov in self.outputs:
-            if ov.name == callerName:
-                alias = ov.scratchNames[0]
-                publishSubscribe.Pub.publish( "scratch.output.command.{name:s}".format( name=alias ), { 'name':alias } )
-                #eventHandler.resolveCommand(self, self.name, alias)
-                cnt += 1
-        if cnt > 1:
+        commands = emitter.commands
+        for topic, alias in commands:
+            publishSubscribe.Pub.publish( topic, { 'name':alias } )
+        if len(commands) > 1:
             logger.error("MULTIPLE SEND, BAD, REALLY BAD")  
                   
     def sendValue(self, value):
         """send a numeric or string value"""
-        callerName = inspect.stack()[1][3]
+        emitter = self._emitting.emitter
+        if emitter == None:
+            emitter = self._callerEmitter( inspect.currentframe().f_back.f_code.co_name, 'sendValue' )
+            if emitter == None:
+                return
+        self._sendEmitterValue(emitter, value)
+        
+    def _callerEmitter(self, callerName, call):
+        """slow path when not called from a wrapped output method, e.g. from a 
+        helper thread: the emitter is found by the name of the calling method"""
+        emitter = self._emitters.get(callerName)
+        if emitter == None and not callerName in self._unboundCallers:
+            self._unboundCallers.add(callerName)
+            logger.warning("{a:s}: {c:s}() called from '{m:s}', which is no output method; dropped".format(a=str(self.name), c=call, m=callerName))
+        return emitter
         
-        for ov in self.output_values:
-            if ov.name == callerName:
-                alias = ov.scratchNames[0]
-                topic = "scratch.output.value.{name:s}".format(name=alias)
-                if isinstance(value, str):
-                    publishSubscribe.Pub.publish( topic, { 'name':alias, 'value':value } )
-                elif isinstance(value, unicode):
-                    publishSubscribe.Pub.publish( topic , { 'name':alias, 'value':value } )
-                else:
-                    publishSubscribe.Pub.publish( topic , { 'name':alias, 'value':str(value) } )
-
     def sendValueByName(self, name,  value):
         """send a numeric or string value"""
-        callerName = name
-        
-        for ov in self.output_values:
-            if ov.name == callerName:
-                alias = ov.scratchNames[0]
-                topic = "scratch.output.value.{name:s}".format(name=alias)
-                if isinstance(value, str):
-                    publishSubscribe.Pub.publish( topic, { 'name':alias, 'value':value } )
-                elif isinstance(value, unicode):
-                    publishSubscribe.Pub.publish( topic, { 'name':alias, 'value':value } )
-                else:
-                    publishSubscribe.Pub.publish( topic, { 'name':alias, 'value':str(value) } )
+        emitter = self._emitters.get(name)
+        if emitter == None:
+            return
+        self._sendEmitterValue(emitter, value)
+
+    def _sendEmitterValue(self, emitter, value):
+        if not isinstance(value, _string_types):
+            value = str(value)
+        for topic, alias, valueFilter in emitter.values:
+            if valueFilter != None and not valueFilter.accept(value):
+                continue
+            publishSubscribe.Pub.publish( topic, { 'name':alias, 'value':value } )
 
     def resolveCommand(self, message):
         """events of the adapters entry point"""
         # print("Adapter, resolveCommand", adapter_name, message)
-        for x in self.scratchInputMethod:
-            if x['name'] == message['name']:
-                f = x['method']
+        methods = self.scratchInputMethod.get(message['name'])
+        if methods:
+            if metrics.enabled or tracing.enabled:
+                self._invokeMeasured(methods, ())
+                return
+            for f in methods:
                 f()
                 
     def resolveValue(self, message):
         """value events of the adapters entry point"""
         # print("Adapter, resolveValue", adapter_name, message, value)
-        
-        for x in self.scratchInputValueMethod:
-            if debug:
-                print("resolveValue", message, x)
-                
-            if x['name'] == message['name']:
-                f = x['method']
-                f( message['value'] )
+        if debug:
+            print("resolveValue", message)
+            
+        methods = self.scratchInputValueMethod.get(message['name'])
+        if methods:
+            value = message['value']
+            if metrics.enabled or tracing.enabled:
+                self._invokeMeasured(methods, (value, ))
+                return
+            for f in methods:
+                f( value )
+    
+    def _invokeMeasured(self, methods, args):
+        """call the input methods, with handler time metrics and tracing"""
+        measured = metrics.enabled
+        traced = tracing.enabled
+        t0 = metrics.clock()
+        for f in methods:
+            if traced:
+                t1 = tracing.clock()
+                f( *args )
+                tracing.complete(self.name + '.' + f.__name__, 'adapter', t1, { 'value': args[0] } if args else None)
+            else:
+                f( *args )
+        if measured:
+            metrics.observe('scratchclient_adapter_handler_seconds', (('adapter', self.name),), metrics.clock() - t0)
     
     def configureCommandResolver (self, commandResolver):
         for _input in self.inputs:
@@ -280,20 +665,52 @@ class Adapter (configuration.AdapterSetting):
                 publishSubscribe.Pub.subscribe('scratch.input.value.{name:s}'.format(name=command), self.resolveValue )
     
     def delay(self, t):
-        """delay a specific time. break it into time slots, so a stop of adapter almost 
-        immediately breaks these loops.
+        """delay a specific time, returns immediately when the adapter is stopped.
+        to be used inside adapter thread run method"""
+        stats = self.pollStatistics
+        if stats != None and t == stats.interval:
+            stats.tick()
+        if t > 0:
+            self._stopEvent.wait(t)
+            
+    def periodic(self, interval):
+        """iterate each interval seconds until the adapter is stopped:
+        
+            for _ in self.periodic(_del):
+                ...
+                
+        The deadlines are counted from the start, so the time spent in the loop 
+        does not add to the period. When a period is missed, the loop continues 
+        with the next deadline instead of catching up. An interval below 
+        MIN_PERIOD is raised to it.
         to be used inside adapter thread run method"""
-        t0 = 0
-        while t0 + 0.1 < t:
-            #print("t0=", t0, "t=", t)
+        stats = self.pollStatistics
+        if stats != None and interval != stats.interval:
+            stats = None
+        if interval < MIN_PERIOD:
+            logger.warning("{n:s}: interval {i:g} sec too short, using {m:g} sec".format(n=str(self.name), i=interval, m=MIN_PERIOD))
+            interval = MIN_PERIOD
+        deadline = clock() + interval
+        while True:
+            wait = deadline - clock()
+            if wait > 0:
+                self._stopEvent.wait(wait)
+            else:
+                deadline += interval * int( -wait / interval )
             if self.stopped():
                 return
-            time.sleep(0.1) 
-            t0 += 0.1
-        tx = t - t0
-        if tx > 0:
-            time.sleep(tx)
+            if stats != None:
+                stats.tick()
+            yield deadline
+            deadline += interval
             
+    def isInputValueRepeat(self):
+        """True when the adapter needs each value scratch sends, also when unchanged.
+           Set by class attribute inputValueRepeat or parameter 'input_value.repeat'"""
+        if 'input_value.repeat' in self.parameters:
+            return self.isTrue( self.parameters['input_value.repeat'] )
+        return self.inputValueRepeat
+    
     def isTrue(self, value):
         """ helper method to convert strings to true/false"""
         v = value.upper()
@@ -392,12 +809,43 @@ class GPIOAdapter (Adapter):
     """base functionality for GPIO based adapters"""
     gpios = None
     gpioManager = None
+    #
+    # input read on edges, see isEdgeInput()
+    edgeGpio = None
+    # default for parameter 'debounce.time' [sec]
+    debounceTime = '0.01'
     
     def __init__(self):
         Adapter.__init__(self)
         
         self.gpios = []
 
+    def isEdgeInput(self):
+        """inputs implementing inputLevel(level) are read on edges instead of 
+        being polled, when parameter 'poll.interval' is absent or 'event'"""
+        if not hasattr(self, 'inputLevel'):
+            return False
+        return self.parameters.get('poll.interval', 'event') == 'event'
+        
+    def start(self):
+        if self.isEdgeInput():
+            self._stopEvent.clear()
+            self.pollStart()
+            self.edgeGpio = self.gpios[0]
+            # initial: the level at start, same as first poll, is reported in 
+            # order with the edges
+            self.gpioManager.addEdgeCallback(self.edgeGpio, self.inputLevel, 
+                                             float(self.parameters.get('debounce.time', self.debounceTime)),
+                                             initial = True)
+            return
+        Adapter.start(self)
+        
+    def stop(self):
+        if self.edgeGpio != None:
+            self.gpioManager.removeEdgeCallback(self.edgeGpio)
+            self.edgeGpio = None
+        Adapter.stop(self)
+
     def setActive (self, active):
         """default implementation for setActive, needs to be overwritten in derived code
         if more complex operations are needed."""
@@ -487,9 +935,11 @@ class SPIAdapter (Adapter):
     int_spi_bus = 0 
     int_spi_device = 0 
 
-    def __init__(self):
+    def __init__(self, handlerType = None):
         
         Adapter.__init__(self)
+        if handlerType != None:
+            self.handlerType = handlerType
         
     def setActive (self, state):
         if debug:
@@ -501,15 +951,22 @@ class SPIAdapter (Adapter):
 
         if state == True:
             logger.debug("spi open bus:{bus:d} device:{device:d}".format(bus=self.int_spi_bus, device=self.int_spi_device))   
-                                  
-            self.spi = spidev.SpiDev()
-            self.spi.open(self.int_spi_bus, self.int_spi_device)
-            time.sleep(0.05)
+            
+            if self.spiManager != None:
+                # shared device, transfers serialized on the bus
+                self.spi = self.spiManager.open(self.int_spi_bus, self.int_spi_device, self.handlerType)
+            else:                      
+                self.spi = spidev.SpiDev()
+                self.spi.open(self.int_spi_bus, self.int_spi_device)
+                time.sleep(0.05)
             
             Adapter.setActive(self, state);
         else:
             Adapter.setActive(self, state);
-            self.spi.close()
+            if self.spiManager != None:
+                self.spiManager.close(self.int_spi_bus, self.int_spi_device)
+            else:
+                self.spi.close()
 
         
     def setSPIManager(self, spiManager):
@@ -548,7 +1005,7 @@ class I2CAdapter (Adapter):
             Adapter.setActive(self, state);
         else:
             Adapter.setActive(self, state);
-            self.i2cManager.close()
+            self.i2cManager.close(self.int_i2c_bus, self.int_i2c_address)
             self.bus = None
             
         
@@ -603,8 +1060,9 @@ class I2CAdapter (Adapter):
     def readU16(self, reg):
         "Reads an unsigned 16-bit value from the I2C device"
         try:
-            hibyte = self.bus.read_byte_data(self.int_i2c_address, reg)
-            result = (hibyte << 8) + self.bus.read_byte_data(self.int_i2c_address, reg+1)
+            # both bytes in one transfer
+            hibyte, lobyte = self.bus.read(reg, 2)
+            result = (hibyte << 8) + lobyte
             if debug:
                 print ("I2C: Device 0x%02X returned 0x%04X from reg 0x%02X" % (self.int_i2c_address, result & 0xFFFF, reg))
             return result
@@ -615,10 +1073,10 @@ class I2CAdapter (Adapter):
     def readS16(self, reg):
         "Reads a signed 16-bit value from the I2C device"
         try:
-            hibyte = self.bus.read_byte_data(self.int_i2c_address, reg)
+            hibyte, lobyte = self.bus.read(reg, 2)
             if (hibyte > 127):
                 hibyte -= 256
-            result = (hibyte << 8) + self.bus.read_byte_data(self.int_i2c_address, reg+1)
+            result = (hibyte << 8) + lobyte
             if debug:
                 print ("I2C: Device 0x%02X returned 0x%04X from reg 0x%02X" % (self.int_i2c_address, result & 0xFFFF, reg))
             return result
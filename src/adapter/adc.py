@@ -18,6 +18,9 @@
 import adapter.adapters
 from spi.manager import SPIManager
 
+import logging
+logger = logging.getLogger(__name__)
+
 debug = False
 
 
@@ -72,11 +75,7 @@ class IRDistanceInput (adapter.adapters.SPIAdapter):
             _filter = [lastDISTANCE,lastDISTANCE,lastDISTANCE,lastDISTANCE,lastDISTANCE]
         
         
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
             currentADC = self.getValue( self.spi, self.int_adc_channel )
 
@@ -197,11 +196,7 @@ class ADC_MCP3202_10_Input (adapter.adapters.SPIAdapter):
         last = self.getValue( self.spi, self.int_adc_channel )
         self.adc(last)   
              
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
             current = self.getValue( self.spi, self.int_adc_channel )
             
@@ -288,11 +283,7 @@ class ADC_MCP3202_12_Input (adapter.adapters.SPIAdapter):
         nFilter = 0
         
              
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
             current = self.getValue( self.spi, self.int_adc_channel )
             
@@ -370,11 +361,7 @@ class ADC_MCP3008_10_Input (adapter.adapters.SPIAdapter):
             
         last = self.getValue( self.spi, self.int_adc_channel )
         self.adc(last)     
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
             current = self.getValue( self.spi, self.int_adc_channel )
             
@@ -397,3 +384,113 @@ class ADC_MCP3008_10_Input (adapter.adapters.SPIAdapter):
         #Filter data bits from returned bits
         ret = ((r[1]&3) << 8) + r[2]
         return ret 
+
+
+class ADC_Scan_Input (adapter.adapters.Adapter):
+    """multi channel ADC, MCP3008 (channel 0..7), MCP3202_10 or MCP3202_12 
+    (channel 0..1) in parameter 'adc.type'. The channels configured as 
+    output_value adc_0 .. adc_7 are read with SPIManager.scan() in one pass
+    each poll.interval, so all values are sampled at about the same time 
+    and sent together. One adapter, one thread per chip; poll() can run on 
+    the scheduler."""
+    
+    mandatoryParameters = { 
+                           'poll.interval': '0.05', 
+                           'poll.band': '2', 
+                           'spi.bus' : '0', 
+                           'spi.device' :'0',
+                           'adc.type' : SPIManager.type_MCP3008 }
+    
+    channelCount = { SPIManager.type_MCP3008:      8, 
+                     SPIManager.type_MCP3202_10bit: 2, 
+                     SPIManager.type_MCP3202_12bit: 2 }
+    
+    spiManager = None
+    
+    def __init__(self):
+        adapter.adapters.Adapter.__init__(self)
+        # channels read, and their output methods
+        self.channels = []
+        self.channelOutputs = []
+        
+    def setSPIManager(self, spiManager):
+        if debug:
+            print("setSPIManager()", self.name, spiManager)
+        self.spiManager = spiManager
+        
+    def setActive (self, state):
+        if debug:
+            print(self.name, "setActive", state)
+        self.int_spi_bus =      int(self.parameters['spi.bus'])
+        self.int_spi_device =   int(self.parameters['spi.device']) 
+        
+        if state:
+            adcType = self.parameters['adc.type']
+            if not adcType in self.channelCount:
+                logger.error("{name:s}: adc.type '{t:s}' not supported".format(name=self.name, t=adcType))
+                return
+            self.channels = []
+            self.channelOutputs = []
+            for ov in self.output_values:
+                channel = int(ov.name[len('adc_'):])
+                if channel >= self.channelCount[adcType]:
+                    logger.error("{name:s}: {t:s} has no channel {c:d}".format(name=self.name, t=adcType, c=channel))
+                    continue
+                self.channels.append(channel)
+                self.channelOutputs.append( getattr(self, ov.name) )
+            
+            self.spiManager.open(self.int_spi_bus, self.int_spi_device, adcType)
+            adapter.adapters.Adapter.setActive(self, state)
+        else:
+            adapter.adapters.Adapter.setActive(self, state)
+            self.spiManager.close(self.int_spi_bus, self.int_spi_device)
+    
+    def run(self):
+        self.runPoll()
+        
+    def pollStart(self):
+        self.band = float(self.parameters['poll.band'])
+        self.last = [ None ] * len(self.channels)
+        
+    def poll(self):
+        values = self.spiManager.scan(self.int_spi_bus, self.int_spi_device, self.channels)
+        last = self.last
+        band = self.band
+        for i in range(len(values)):
+            current = values[i]
+            # plus/minus band is still 'identical'
+            if last[i] == None or not( last[i] - band < current < last[i] + band):
+                last[i] = current
+                self.channelOutputs[i](current)
+                
+    def adc_0(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
+    
+    def adc_1(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
+    
+    def adc_2(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
+    
+    def adc_3(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
+    
+    def adc_4(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
+    
+    def adc_5(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
+    
+    def adc_6(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
+    
+    def adc_7(self, value):
+        """output from adapter to scratch."""
+        self.sendValue(str(value))
@@ -115,11 +115,7 @@ class ADC_MCP3202_10_Zone_Input (adapter.adapters.SPIAdapter):
             
         last = None
              
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
             current = self.getValue( self.spi, self.int_adc_channel )
             
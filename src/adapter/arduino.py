@@ -39,6 +39,7 @@ import helper.logging
 logger = logging.getLogger(__name__)
 
 import errorManager
+import profiling
 
 import adapter
 #
@@ -249,6 +250,14 @@ class UNO_Adapter (adapter.adapters.Adapter):
         self.queue_command = helper.abstractQueue.PriorityQueue()
         self.stateMachine = UNO_Adapter.StateMachine(self)
         self.lastInputValue = {}
+        # serial connections established
+        self.connects = 0
+        
+    def getMetrics(self):
+        return adapter.adapters.Adapter.getMetrics(self) + ( 
+               ('scratchclient_queue_depth', (('queue', 'queue_data'),), self.queue_data.qsize() ),
+               ('scratchclient_queue_depth', (('queue', 'queue_command'),), self.queue_command.qsize() ),
+               ('scratchclient_connects_total', (('connection', 'serial'),), self.connects ) )
         
     def setActive(self, state):
         adapter.adapters.Adapter.setActive(self, state)
@@ -517,6 +526,7 @@ class UNO_Adapter (adapter.adapters.Adapter):
             if log == False:
                 with helper.logging.LoggingContext(logger, level=logging.DEBUG):
                     logger.info("{n:s}: connection established to arduino".format(n=self.name))
+            self.connects += 1
                 
         except serial.SerialException as e:
             if log:
@@ -561,6 +571,8 @@ class UNO_Adapter (adapter.adapters.Adapter):
     def _runReceive(self):
         logger.debug("_runReceive %s", "start")
         while not self._stopped:
+            if profiling.enabled:
+                profiling.checkpoint()
             try:
                 line = self.ser.readline()
             except serial.SerialException as e:
@@ -698,6 +710,8 @@ class UNO_Adapter (adapter.adapters.Adapter):
         t_r = time.time()
         
         while not self._stopped:
+            if profiling.enabled:
+                profiling.checkpoint()
             if self.state_arduinoConfigured == "undef":
                 foundData = False         
                 try:
@@ -799,11 +813,11 @@ class UNO_Adapter (adapter.adapters.Adapter):
         """  success
             fail """
         self._stopped = False
-        self.threadReceive = threading.Thread(target=self._runReceive)
+        self.threadReceive = threading.Thread(target=profiling.wrap(self._runReceive, self.name + "._runReceive"))
         self.threadReceive.setName("_runReceive")
         self.threadReceive.start()
     
-        self.threadSend = threading.Thread(target=self._runSend)
+        self.threadSend = threading.Thread(target=profiling.wrap(self._runSend, self.name + "._runSend"))
         self.threadSend.setName("_runSend")
         self.threadSend.start()
     
@@ -815,9 +829,9 @@ class UNO_Adapter (adapter.adapters.Adapter):
         self.threadReceive.join(0.2)
         self.threadSend.join(0.2)
         
-        if self.threadReceive.isAlive():
+        if self.threadReceive.is_alive():
             logger.error("receive thread not stopped !")
-        if self.threadSend.isAlive():
+        if self.threadSend.is_alive():
             logger.error("send thread not stopped !")
         return "success" 
     
@@ -1034,6 +1048,8 @@ class UNO_Adapter (adapter.adapters.Adapter):
         
         def run_stateQueueHandler(self):
             while not self.stopQueueHandler:
+                if profiling.enabled:
+                    profiling.checkpoint()
                 s = ""
                 try:
                     s = self.queue.get(block=True, timeout=0.1)
@@ -1053,14 +1069,14 @@ class UNO_Adapter (adapter.adapters.Adapter):
             self.queue = helper.abstractQueue.AbstractQueue()
             
             self.stopQueueHandler = False
-            self.thread1 = threading.Thread(target=self.run_stateQueueHandler)
+            self.thread1 = threading.Thread(target=profiling.wrap(self.run_stateQueueHandler, self.parent.name + ".run_stateQueueHandler"))
             self.thread1.setName("run_stateQueueHandler")
             self.thread1.start()
             
         def _stop(self):
             self.stopQueueHandler = True
             self.thread1.join(0.2)
-            if self.thread1.isAlive():
+            if self.thread1.is_alive():
                 logger.error("Error: thread {n:s}  not stopped".format(n=self.thread1.getName()))
                 
         def addEvent(self, event):
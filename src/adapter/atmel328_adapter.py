@@ -325,7 +325,7 @@ class Atmel328_ADC_Adapter (Atmel328_Adapter):
         
         if state == False:
             logger.debug("spi close bus:{bus:d} device:{device:d}".format(bus=self.int_spi_bus, device=self.int_spi_device))   
-            self.spiManager.close()
+            self.spiManager.close(self.int_spi_bus, self.int_spi_device)
               
                
 
@@ -549,7 +549,7 @@ class Atmel328_IRC_Adapter ( Atmel328_Adapter):
         
         if state == False:
             logger.debug("spi close bus:{bus:d} device:{device:d}".format(bus=self.int_spi_bus, device=self.int_spi_device))   
-            self.spiManager.close()
+            self.spiManager.close(self.int_spi_bus, self.int_spi_device)
               
                
 
@@ -842,7 +842,7 @@ class Atmel328_DHT22_Adapter (Atmel328_Adapter):
         
         if state == False:
             logger.debug("spi close bus:{bus:d} device:{device:d}".format(bus=self.int_spi_bus, device=self.int_spi_device))   
-            self.spiManager.close()
+            self.spiManager.close(self.int_spi_bus, self.int_spi_device)
               
                
 
@@ -1019,7 +1019,7 @@ class Atmel328_HCSR04_Adapter (Atmel328_Adapter):
         
         if state == False:
             logger.debug("spi close bus:{bus:d} device:{device:d}".format(bus=self.int_spi_bus, device=self.int_spi_device))   
-            self.spiManager.close()
+            self.spiManager.close(self.int_spi_bus, self.int_spi_device)
               
                
 
@@ -80,11 +80,7 @@ class TimeAdapter( adapter.adapters.Adapter):
         _year = None
         
         i = 0
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
             a = datetime.datetime.now()
             if debug:
                 print('second', a.second)
@@ -16,18 +16,40 @@
     # ---------------------------------------------------------------------------------------------
 
 import adapter
+import threading
 
 debug = False
 
+#
+# quadrature decoding, index is (previous state << 2) | state,
+# state is (p0 << 1) | p1. None: both inputs changed, direction unknown.
+#
+TRANSITIONS = (    0,   -1,    1, None,
+                   1,    0, None,   -1,
+                  -1, None,    0,    1,
+                None,    1,   -1,    0 )
+
 class GPIOEncoder(adapter.adapters.GPIOAdapter):
+    """quadrature encoder on inputs p0, p1. Decoded on edges, or polled when
+    parameter 'poll.interval' is given. The position is sent at most each 
+    0.02 sec, the last position is always sent (min.interval of output_value
+    'position' changes this)."""
     
     pos = 0
     sensorName = None
-    mandatoryParameters = { 'poll.interval': 0.005 }
+    mandatoryParameters = { }
     mandatoryAlias = [ 'p0', 'p1' ]
+    outputValueMinInterval = { 'position': 0.02 }
     
     def __init__(self):
         adapter.adapters.GPIOAdapter.__init__(self)
+        self._lock = threading.Lock()
+        self.levels = [0, 0]
+        self.state = 0
+        # decoded steps, transitions with both inputs changed
+        self.steps = 0
+        self.invalidTransitions = 0
+        self.edgeGpios = []
         
     def setActive (self, state):
         if debug:
@@ -41,6 +63,59 @@ class GPIOEncoder(adapter.adapters.GPIOAdapter):
             # initially send data
             self.position( '0')
             
+    def isEdgeInput(self):
+        return self.parameters.get('poll.interval', 'event') == 'event'
+    
+    def start(self):
+        gpio_0 = self.getChannelByAlias('p0')    
+        gpio_1 = self.getChannelByAlias('p1')    
+        self.levels = [ self.gpioManager.get(gpio_0), self.gpioManager.get(gpio_1) ]
+        self.state = self._state(self.levels[0], self.levels[1])
+        if not self.isEdgeInput():
+            adapter.adapters.GPIOAdapter.start(self)
+            return
+        self._stopEvent.clear()
+        self.edgeGpios = [gpio_0, gpio_1]
+        self.gpioManager.addEdgeCallback(gpio_0, self.input_0, 0)
+        self.gpioManager.addEdgeCallback(gpio_1, self.input_1, 0)
+        
+    def stop(self):
+        for gpio in self.edgeGpios:
+            self.gpioManager.removeEdgeCallback(gpio)
+        self.edgeGpios = []
+        adapter.adapters.GPIOAdapter.stop(self)
+        
+    def input_0(self, level):
+        with self._lock:
+            self.levels[0] = level
+            self.transition( self._state(level, self.levels[1]) )
+            
+    def input_1(self, level):
+        with self._lock:
+            self.levels[1] = level
+            self.transition( self._state(self.levels[0], level) )
+        
+    def _state(self, i0, i1):
+        state = 0
+        if i0:
+            state = 2
+        if i1:
+            state += 1
+        return state
+        
+    def transition(self, state):
+        delta = TRANSITIONS[ (self.state << 2) | state ]
+        self.state = state
+        if delta == None:
+            self.invalidTransitions += 1
+            if debug:
+                print(self.name, "invalid transition", state)
+            return
+        if delta == 0:
+            return
+        self.pos += delta
+        self.steps += 1
+        self.position(str(self.pos))
                
     def run(self):
         if debug:
@@ -49,72 +124,19 @@ class GPIOEncoder(adapter.adapters.GPIOAdapter):
         gpio_0 = self.getChannelByAlias('p0')    
         gpio_1 = self.getChannelByAlias('p1')    
         
-        if debug:
-            print ( gpio_0)
-        
         _del = float(self.parameters['poll.interval'])
         
-        i0_last = None
-        i1_last = None
-        
-        i = 0
-        while not self.stopped():
-            #
-            #
-            self.delay(_del)
-                       
+        for _ in self.periodic(_del):
             i0 =  self.gpioManager.get( gpio_0)
             i1 =  self.gpioManager.get( gpio_1)
+            with self._lock:
+                self.transition( self._state(i0, i1) )
 
-            if i0 != i0_last:
-                if i0 == 0 and i1 == 0:
-                    if debug:
-                        print(self.name, "neg 0", i0, i1)
-                    self.pos -= 1
-                if i0 == 1 and i1 == 1:
-                    if debug:
-                        print(self.name, "pos 1", i0, i1)
-                    self.pos -= 1
-
-                if i0 == 0 and i1 == 1:
-                    if debug:
-                        print(self.name, "neg 1", i0, i1)
-                    self.pos += 1
-                if i0 == 1 and i1 == 0:
-                    if debug:
-                        print(self.name, "pos 0", i0, i1)
-                    self.pos += 1
-
-                self.position(str(self.pos))
-                i0_last = i0
-
-            if i1 != i1_last:
-                if i0 == 0 and i1 == 0:
-                    if debug:
-                        print(self.name, "0 neg", i0, i1)
-                    self.pos += 1
-                if i0 == 1 and i1 == 1:
-                    if debug:
-                        print(self.name, "1 pos", i0, i1)
-                    self.pos += 1
-
-                if i0 == 0 and i1 == 1:
-                    if debug:
-                        print(self.name, "0 pos", i0, i1)
-                    self.pos -= 1
-                if i0 == 1 and i1 == 0:
-                    if debug:
-                        print(self.name, "1 neg", i0, i1)
-                    self.pos -= 1
-
-                self.position(str(self.pos))
-                i1_last = i1
-                
-#            if debug:
-#                print('encoder input i0 = {i0:s} i1 = {i1:s}'.format(i0=str(i0), i1 =str(i1)))
-
-            i += 1            
-
+    def getMetrics(self):
+        return tuple(adapter.adapters.GPIOAdapter.getMetrics(self)) + (
+                 ('scratchclient_encoder_steps_total', (), self.steps),
+                 ('scratchclient_encoder_invalid_transitions_total', (), self.invalidTransitions) )
+        
     def position(self, value):
         """output from adapter to scratch."""
         self.sendValue(value)
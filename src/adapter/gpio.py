@@ -466,11 +466,11 @@ class GpioOutputPWMServo (adapter.adapters.GPIOAdapter):
 # --------------------------------------------------------------------------------------
 
 class GpioInput(adapter.adapters.GPIOAdapter):
-    """if button pressed, send a '1'"""
+    """if button pressed, send a '1'.
+    Polled with 'poll.interval', read on edges when absent or 'event'"""
     
     sensorName = None
     mandatoryParameters = { 
-                           'poll.interval': '1', 
                            'value.inverse': 'false' }
     
     def __init__(self):
@@ -493,23 +493,21 @@ class GpioInput(adapter.adapters.GPIOAdapter):
                 self.button( '1')
                
     def run(self):
-        _del = float(self.parameters['poll.interval'])
-            
-        last = self.gpioManager.get(self.gpios[0])
+        self.runPoll()
         
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
-                           
-            current = self.gpioManager.get(self.gpios[0])
-            if current != last:
-                if current == 0:
-                    self.button ( '0')
-                else:
-                    self.button( '1')
-                last = current
+    def pollStart(self):
+        self.last = self.gpioManager.get(self.gpios[0])
+        
+    def poll(self):
+        self.inputLevel( self.gpioManager.get(self.gpios[0]) )
+        
+    def inputLevel(self, current):
+        if current != self.last:
+            if current == 0:
+                self.button ( '0')
+            else:
+                self.button( '1')
+            self.last = current
 
     def button(self, value):
         """output from adapter to scratch."""
@@ -525,11 +523,11 @@ class GpioInput(adapter.adapters.GPIOAdapter):
 # --------------------------------------------------------------------------------------
 
 class GpioValueInput(adapter.adapters.GPIOAdapter):
-    """send named values on low or high input values"""
+    """send named values on low or high input values.
+    Polled with 'poll.interval', read on edges when absent or 'event'"""
     
     sensorName = None
     mandatoryParameters = { 
-                           'poll.interval': '1', 
                            'value.inverse': 'true', 
                            'value.0': 'low' ,
                            'value.1': 'high' 
@@ -551,27 +549,25 @@ class GpioValueInput(adapter.adapters.GPIOAdapter):
         
                
     def run(self):
-        _del = float(self.parameters['poll.interval'])
-            
-        last = self.gpioManager.get(self.gpios[0])
-        if last == 0:
+        self.runPoll()
+        
+    def pollStart(self):
+        self.last = self.gpioManager.get(self.gpios[0])
+        if self.last == 0:
             self.value ( '0')
         else:
             self.value ( '1')
             
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
-                           
-            current = self.gpioManager.get(self.gpios[0])
-            if current != last:
-                if current == 0:
-                    self.value ( '0')
-                else:
-                    self.value ( '1')
-                last = current
+    def poll(self):
+        self.inputLevel( self.gpioManager.get(self.gpios[0]) )
+        
+    def inputLevel(self, current):
+        if current != self.last:
+            if current == 0:
+                self.value ( '0')
+            else:
+                self.value ( '1')
+            self.last = current
 
     def value(self, _value):
         """output from adapter to scratch."""
@@ -601,7 +597,6 @@ class GpioButtonInput(adapter.adapters.GPIOAdapter):
                 
     sensorName = None
     mandatoryParameters = { 
-                           'poll.interval': '1', 
                            'value.inverse': 'false' }
     value = None
     
@@ -615,30 +610,28 @@ class GpioButtonInput(adapter.adapters.GPIOAdapter):
 
                
     def run(self):
-        _del = float(self.parameters['poll.interval'])
+        self.runPoll()
+        
+    def pollStart(self):
         self.value = None
-        reverse =  self.isTrue( self.parameters['value.inverse'] ) 
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
-            
-            current = self.gpioManager.get(self.gpios[0])
-            if current != self.value:
-                if reverse:
-                    if current:
-                        self.button_released()
-                    else:
-                        self.button_pressed()
+        self.reverse = self.isTrue( self.parameters['value.inverse'] ) 
+        
+    def poll(self):
+        self.inputLevel( self.gpioManager.get(self.gpios[0]) )
+        
+    def inputLevel(self, current):
+        if current != self.value:
+            if self.reverse:
+                if current:
+                    self.button_released()
                 else:
-                    if current:
-                        self.button_pressed()
-                    else:
-                        self.button_released()
-                
-                    
-                self.value = current
+                    self.button_pressed()
+            else:
+                if current:
+                    self.button_pressed()
+                else:
+                    self.button_released()
+            self.value = current
 
     def button_pressed(self):
         """output command from adapter to scratch."""
@@ -649,11 +642,11 @@ class GpioButtonInput(adapter.adapters.GPIOAdapter):
         self.send()
         
 class GpioEventInput(adapter.adapters.GPIOAdapter):
-    """if button pressed, send a broadcast once."""
+    """if button pressed, send a broadcast once.
+    Polled with 'poll.interval', read on edges when absent or 'event'"""
     
     sensorName = None
     mandatoryParameters = { 
-                           'poll.interval': '1', 
                            'value.inverse': 'false' }
     value = None
     
@@ -670,30 +663,28 @@ class GpioEventInput(adapter.adapters.GPIOAdapter):
 
                
     def run(self):
-        _del = float(self.parameters['poll.interval'])
+        self.runPoll()
+        
+    def pollStart(self):
         self.value = None
-        reverse =  self.isTrue( self.parameters['value.inverse'] ) 
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
-            
-            current = self.gpioManager.get(self.gpios[0])
-            if current != self.value:
-                if reverse:
-                    if current:
-                        self.button_released()
-                    else:
-                        self.button_pressed()
+        self.reverse = self.isTrue( self.parameters['value.inverse'] ) 
+        
+    def poll(self):
+        self.inputLevel( self.gpioManager.get(self.gpios[0]) )
+        
+    def inputLevel(self, current):
+        if current != self.value:
+            if self.reverse:
+                if current:
+                    self.button_released()
                 else:
-                    if current:
-                        self.button_pressed()
-                    else:
-                        self.button_released()
-                
-                    
-                self.value = current
+                    self.button_pressed()
+            else:
+                if current:
+                    self.button_pressed()
+                else:
+                    self.button_released()
+            self.value = current
 
     def button_pressed(self):
         """output command from adapter to scratch."""
@@ -16,6 +16,7 @@
     # ---------------------------------------------------------------------------------------------
 
 import math
+import threading
 import time
 import adapter
 from i2c.manager import I2CManager
@@ -30,6 +31,9 @@ class ADC_ADS1015_Input (adapter.adapters.I2CAdapter):
     """ADC Interface for ADS1015"""
     
     int_adc_channel = 0
+    
+    # adapters for the channels of one chip share the conversion sequence
+    lockPWMAccess = threading.Lock()
 
     mandatoryParameters = { 'poll.interval': '0.2', 
                            'i2c.bus' : '0', 
@@ -54,22 +58,16 @@ class ADC_ADS1015_Input (adapter.adapters.I2CAdapter):
             print(self.name, "run()")
         _del = float(self.parameters['poll.interval'])
             
-        last = self.i2cManager.getValue(
-                                self.int_i2c_bus, 
-                                self.int_i2c_address, 
+        last = self.getValue(
+                                self.bus, 
                                 self.int_adc_channel
                                 )
         self.adc(last)   
              
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
-            current = self.i2cManager.getValue(
-                                self.int_i2c_bus, 
-                                self.int_i2c_address, 
+            current = self.getValue(
+                                self.bus, 
                                 self.int_adc_channel
                                 )
             
@@ -220,18 +218,20 @@ class ADC_ADS1015_Input (adapter.adapters.I2CAdapter):
         # Write config register to the ADC
         _bytes = [(config >> 8) & 0xFF, config & 0xFF]
         
-        i2cdata.i2cbus.write_i2c_block_data(i2cdata.address, self.__ADS1015_REG_POINTER_CONFIG, _bytes)
-
-        # Wait for the ADC conversion to complete
-        # The minimum delay depends on the sps: delay >= 1/sps
-        # We add 0.1ms to be sure
-        delay = 1.0/sps+0.0001
-        time.sleep(delay)
-
-        # Read the conversion results
-
-        result = i2cdata.i2cbus.read_i2c_block_data(i2cdata.address, self.__ADS1015_REG_POINTER_CONVERT, 2)
-        self.lockPWMAccess.release()
+        try:
+            i2cdata.write(self.__ADS1015_REG_POINTER_CONFIG, _bytes)
+    
+            # Wait for the ADC conversion to complete
+            # The minimum delay depends on the sps: delay >= 1/sps
+            # We add 0.1ms to be sure
+            delay = 1.0/sps+0.0001
+            time.sleep(delay)
+    
+            # Read the conversion results
+    
+            result = i2cdata.read(self.__ADS1015_REG_POINTER_CONVERT, 2)
+        finally:
+            self.lockPWMAccess.release()
             
         # Shift right 4 bits for the 12-bit ADS1015 and convert to mV
         return ( ((result[0] << 8) | (result[1] & 0xFF)) >> 4 )*pga/2048.0
@@ -271,11 +271,7 @@ class Luminosity_BH1750_Input (adapter.adapters.I2CAdapter):
         if last != None:
             self.luminosity(last)   
              
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
             current = self.getValue(
                                 self.int_i2c_address
@@ -345,11 +341,7 @@ class Pressure_BMP085_Input (adapter.adapters.I2CAdapter):
         self.pressure(last['pressure'])   
         self.temperature(last['temperature'])   
              
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
                            
             current = self.getValues()
             if current['pressure'] != last['pressure']:
@@ -456,9 +448,8 @@ class Pressure_BMP085_Input (adapter.adapters.I2CAdapter):
             time.sleep(0.026)
         else:
             time.sleep(0.008)
-        msb = self.readU8(self.BMP085_PRESSUREDATA)
-        lsb = self.readU8(self.BMP085_PRESSUREDATA+1)
-        xlsb = self.readU8(self.BMP085_PRESSUREDATA+2)
+        # one burst read, msb, lsb, xlsb
+        msb, lsb, xlsb = self.readList(self.BMP085_PRESSUREDATA, 3)
         raw = ((msb << 16) + (lsb << 8) + xlsb) >> (8 - self._mode)
         logger.debug('Raw pressure 0x{0:04X} ({1})'.format(raw & 0xFFFF, raw))
         return raw
@@ -470,7 +461,7 @@ class Pressure_BMP085_Input (adapter.adapters.I2CAdapter):
         #UT = 27898
         # Calculations below are taken straight from section 3.5 of the datasheet.
         X1 = ((UT - self.cal_AC6) * self.cal_AC5) >> 15
-        X2 = (self.cal_MC << 11) / (X1 + self.cal_MD)
+        X2 = (self.cal_MC << 11) // (X1 + self.cal_MD)
         B5 = X1 + X2
         
         logger.debug("X1 = {x:d}".format(x=X1))
@@ -491,7 +482,7 @@ class Pressure_BMP085_Input (adapter.adapters.I2CAdapter):
         # Calculations below are taken straight from section 3.5 of the datasheet.
         # Calculate true temperature coefficient B5.
         X1 = ((UT - self.cal_AC6) * self.cal_AC5) >> 15
-        X2 = (self.cal_MC << 11) / (X1 + self.cal_MD)
+        X2 = (self.cal_MC << 11) // (X1 + self.cal_MD)
         B5 = X1 + X2
         logger.debug('B5 = {0}'.format(B5))
         # Pressure Calculations
@@ -500,7 +491,7 @@ class Pressure_BMP085_Input (adapter.adapters.I2CAdapter):
         X1 = (self.cal_B2 * (B6 * B6) >> 12) >> 11
         X2 = (self.cal_AC2 * B6) >> 11
         X3 = X1 + X2
-        B3 = (((self.cal_AC1 * 4 + X3) << self._mode) + 2) / 4
+        B3 = (((self.cal_AC1 * 4 + X3) << self._mode) + 2) // 4
         logger.debug('B3 = {0}'.format(B3))
         X1 = (self.cal_AC3 * B6) >> 13
         X2 = (self.cal_B1 * ((B6 * B6) >> 12)) >> 16
@@ -510,9 +501,9 @@ class Pressure_BMP085_Input (adapter.adapters.I2CAdapter):
         B7 = (UP - B3) * (50000 >> self._mode)
         logger.debug('B7 = {0}'.format(B7))
         if B7 < 0x80000000:
-            p = (B7 * 2) / B4
+            p = (B7 * 2) // B4
         else:
-            p = (B7 / B4) * 2
+            p = (B7 // B4) * 2
         X1 = (p >> 8) * (p >> 8)
         X1 = (X1 * 3038) >> 16
         X2 = (-7357 * p) >> 16
@@ -621,7 +612,7 @@ class PWM_PCA9685 (adapter.adapters.I2CAdapter):
         if (debug):
             print( "Setting PWM frequency to %d Hz" % frequency )
             print ("Estimated pre-scale: %d" % prescaleval )
-            prescale = math.floor(prescaleval + 0.5)
+        prescale = math.floor(prescaleval + 0.5)
         if (debug):
             print ("Final pre-scale: %d" % prescale)
 
@@ -34,15 +34,14 @@ logger = logging.getLogger(__name__)
 # --------------------------------------------------------------------------------------
 
 class Linux_Adapter (adapter.adapters.Adapter):
-    """Interface to linux operation command line """
+    """Interface to linux operation command line.
+    The command runs in the executor, not in the listener thread. Optional 
+    parameter 'queue.duplicate' = 'drop' discards a trigger while the command 
+    is still waiting to run."""
     
     mandatoryParameters = { 'queue.max' : 30, 'os.command': 'ls -l' }
 
-    queue = None
-    
     def __init__(self):
-        self.queue = helper.abstractQueue.AbstractQueue()
-       
         adapter.adapters.Adapter.__init__(self)
 
     def setActive (self, state):
@@ -54,40 +53,27 @@ class Linux_Adapter (adapter.adapters.Adapter):
         adapter.adapters.Adapter.setActive(self, state);
 
 
-    def run(self):
+    def _call(self):
+        """executor job"""
         cmd = self.parameters['os.command']
-
-        while not(self.stopped()):
-            try:
-                #
-                # the queue is only used to receive events
-                #        
-                self.queue.get(True, 0.1)
-                
-                    
-                logger.info('{name:s}: call {r:s}'.format(name=self.name, r=str(cmd)))
-                    
-                return_code = subprocess.call( cmd, shell=True )
-                
-                logger.info('{name:s}: return code {r:s}'.format(name=self.name, r=str(return_code)))
-            except helper.abstractQueue.AbstractQueue.Empty:
-                pass
-            except Exception as e:
-                logger.warn(e)
+        logger.info('{name:s}: call {r:s}'.format(name=self.name, r=str(cmd)))
+            
+        return_code = subprocess.call( cmd, shell=True )
+        
+        logger.info('{name:s}: return code {r:s}'.format(name=self.name, r=str(return_code)))
                
     def trigger(self):
         if debug:
             print("trigger")
 
-        if self.queue.qsize() > int(self.parameters['queue.max']):
-            
-            logger.warn('{name:s}: queue is full, trigger discarded '.format(name=self.name))
-        else:
-            self.queue.put('trigger')
+        duplicate = self.parameters.get('queue.duplicate')
+        if not self.submit(self._call, key='trigger', duplicate=duplicate):
+            if duplicate == None:
+                logger.warn('{name:s}: queue is full, trigger discarded '.format(name=self.name))
         
 
 class Linux_APLAY_Adapter (adapter.adapters.Adapter):
-    """Interface to linux aplay-command line """
+    """Interface to linux aplay-command line, aplay runs in the executor """
     
     mandatoryParameters = { 'queue.max' : 30, 
                             'aplay.device': 'sysdefault:CARD=Device',
@@ -95,11 +81,7 @@ class Linux_APLAY_Adapter (adapter.adapters.Adapter):
                             'sound.dir': '/opt/sonic-pi/etc/samples' 
                           }
 
-    queue = None
-    
     def __init__(self):
-        self.queue = helper.abstractQueue.AbstractQueue()
-       
         adapter.adapters.Adapter.__init__(self)
 
     def setActive (self, state):
@@ -111,25 +93,12 @@ class Linux_APLAY_Adapter (adapter.adapters.Adapter):
         adapter.adapters.Adapter.setActive(self, state);
 
 
-    def run(self):
-        cmd = 'aplay -D ' + self.parameters['aplay.device']
-
-        while not(self.stopped()):
-            try:
-                #
-                # the queue is only used to receive events
-                #        
-                filepath = self.queue.get(True, 0.1)
-                
-                arec_cmd = ["aplay", "-D",  self.parameters['aplay.device'],  filepath ]  
-                logger.info('{name:s}: start {r:s}'.format(name=self.name, r=str(arec_cmd)))
-                popen = subprocess.Popen(arec_cmd )   
-                popen.wait()    
-          
-            except helper.abstractQueue.AbstractQueue.Empty:
-                pass
-            except Exception as e:
-                logger.warn(e)
+    def _play(self, filepath):
+        """executor job"""
+        arec_cmd = ["aplay", "-D",  self.parameters['aplay.device'],  filepath ]  
+        logger.info('{name:s}: start {r:s}'.format(name=self.name, r=str(arec_cmd)))
+        popen = subprocess.Popen(arec_cmd )   
+        popen.wait()    
                
     def sound(self, wav_file_name):
         if debug:
@@ -153,11 +122,8 @@ class Linux_APLAY_Adapter (adapter.adapters.Adapter):
             logger.warn('{name:s}: file {f:s} not found in dir {d:s}'.format(name=self.name, f=wav_file_name, d= self.parameters['sound.dir']))
             return
         
-        if self.queue.qsize() > int(self.parameters['queue.max']):
-            
+        if not self.submit(self._play, (fname, )):
             logger.warn('{name:s}: queue is full, sound discarded '.format(name=self.name))
-        else:
-            self.queue.put(fname)
         
 
 class Linux_ARECORD_Adapter (adapter.adapters.Adapter):
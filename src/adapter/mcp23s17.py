@@ -292,11 +292,7 @@ class MCP23S17_Adapter (adapter.adapters.SPIAdapter):
         lastA = None
         lastB = None
         
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
 
             if readA:
                 p = self.getPortA()
@@ -437,7 +433,7 @@ class MCP23S17_Adapter (adapter.adapters.SPIAdapter):
     def writeRawData(self, spi, data):
         self._lock.acquire()
         try:
-            self.spi.max_speed_hz = self.max_speed_hz
+            # speed is set by the handler
             r = self.spi.xfer2( list(data)  ) 
             return r
         finally:
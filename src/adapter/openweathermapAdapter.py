@@ -21,8 +21,6 @@
 import logging
 logger = logging.getLogger(__name__)
 
-import threading
-import helper.abstractQueue
 import pyowm
 
 import adapter.adapters
@@ -30,6 +28,8 @@ import adapter.adapters
 debug = False
            
 class Openweathermap_Adapter(adapter.adapters.Adapter):
+    """weather at a location. The api is called in the executor; a request
+    waiting there is replaced by a newer one."""
     
     # -----------------------------------------
     # fields for adapter
@@ -45,7 +45,6 @@ class Openweathermap_Adapter(adapter.adapters.Adapter):
     def __init__(self):
         # General Adapter
         adapter.adapters.Adapter.__init__(self)
-        self.queue = helper.abstractQueue.AbstractQueue()
         self._location = None
         
     def setActive (self, active):
@@ -55,18 +54,9 @@ class Openweathermap_Adapter(adapter.adapters.Adapter):
             self._location = self.parameters['location']
             
         adapter.adapters.Adapter.setActive(self, active)
-        if active:
-            self.thread2 = threading.Thread(target=self.run_queue)
-            self.thread2.start()
-        
-    def run_queue(self):
-        while not self.stopped():
-            try:
-                location = self.queue.get(block=True, timeout=0.1)
-            except:
-                continue
-            self._call_api(location)
         
+    def _request(self, location):
+        self.submit(self._call_api, (location, ), key='location', duplicate='merge')
 
     def _call_api(self, location):
         key = self.parameters['openweather.api_key']
@@ -165,9 +155,9 @@ class Openweathermap_Adapter(adapter.adapters.Adapter):
         except:
             pass
         
-        while not(self.stopped()):
-            self.queue.put( self._location )     
-            self.delay(pollrate)
+        self._request( self._location )
+        for _ in self.periodic(pollrate):
+            self._request( self._location )
 
         
     def owm_location(self, value):
@@ -183,7 +173,7 @@ class Openweathermap_Adapter(adapter.adapters.Adapter):
         if value == '':
             return
         self._location = value
-        self.queue.put(value)
+        self._request(value)
         
     def owm_weather_clouds(self, value):
         """output from adapter to scratch"""
@@ -18,12 +18,12 @@
 import adapter
 import errorManager
 import configuration 
+import protocol
 
 from types import MethodType
 import socket
 import time
 import inspect
-from  array import *
 import logging
 import re
 
@@ -132,11 +132,9 @@ class CommunicationAdapter (adapter.adapters.Adapter):
         self._input('01F')
    
     def _output(self):
-        callerName = inspect.stack()  
         """template for a adapter-->scratch send function"""
         if debug:
             print("_output")
-            print(callerName)
         self.send()
 
     def setXMLConfig(self, child):
@@ -246,9 +244,6 @@ class CommunicationAdapter (adapter.adapters.Adapter):
                 break
             
             if self.state == self.STATE_START:
-                # clean any available data
-                data = ""
-                #
                 self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 ip = self.parameters[ 'server' ] 
                 try:
@@ -273,6 +268,8 @@ class CommunicationAdapter (adapter.adapters.Adapter):
                     pass
                 
             if self.state == self.STATE_CONNECTED:
+                # clean any available data
+                reader = protocol.RecordReader(BUFFER_SIZE)
                 try:
                     cmd = 'group "{group:s}"'.format( group=self.parameters[ 'group' ] )
                     self.sock_send(cmd)
@@ -298,29 +295,18 @@ class CommunicationAdapter (adapter.adapters.Adapter):
 
             if self.state == self.STATE_OPERATIONAL:                
                 try:
-                    chunk = self.sock.recv(BUFFER_SIZE) # get the data from the socket
-                    if len(chunk) == 0:
+                    n = reader.recv(self.sock) # get the data from the socket
+                    if n == 0:
                         self.state = self.STATE_DISCONNECT
                         # lost connection, break
                         break
     
                     # there are multiple records possible in one 
                     # received buffer
-                    data += chunk
-                    while  len(data) >= 4:
-                        recordLen = (ord(data[0]) << 24) +     \
-                                    (ord(data[1]) << 16) +     \
-                                    (ord(data[2]) <<  8) +     \
-                                    (ord(data[3]) <<  0 )                
-                        
-                        if len(data) < 4+recordLen:
-                            break   
-                    
-                        dataraw = data[4: 4+recordLen]
+                    for record in reader.records():
+                        dataraw = protocol.decode(record)
                         logger.debug( 'data recvd from scratch-Length: %d, Data: %s' , len(dataraw), dataraw)
                         self.processRecord (dataraw)
-                    
-                        data = data[4+recordLen:]
                 except socket.timeout:
                     if logger.isEnabledFor(logging.DEBUG):
                         logger.debug( "No data received: socket timeout")
@@ -333,15 +319,8 @@ class CommunicationAdapter (adapter.adapters.Adapter):
 
     def sock_send(self, cmd):
         if self.state in [self.STATE_OPERATIONAL, self.STATE_CONNECTED]: 
-            n = len(cmd)
-            a = array('c')
-            a.append(chr((n >> 24) & 0xFF))
-            a.append(chr((n >> 16) & 0xFF))
-            a.append(chr((n >>  8) & 0xFF))
-            a.append(chr(n & 0xFF))
-    
             logger.debug("remote: send {group:s}".format(group=cmd ))
-            self.sock.send(a.tostring() + cmd)
+            self.sock.sendall(protocol.encode(cmd))
         else:
             logger.debug("discarded: send {group:s}".format(group=cmd ))
             
@@ -68,11 +68,7 @@ class SenseHat_Adapter (adapter.adapters.Adapter):
         #
         formatString = "{:.1f}"
         
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)   
+        for _ in self.periodic(_del):
 
             value = self.sense.get_temperature()
             sValue = formatString.format(value)
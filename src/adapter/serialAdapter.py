@@ -73,7 +73,7 @@ class SIM800_TimeoutState(SIM800_State):
         if self.timeoutThread != None:
             try:
                 self.timeoutThread.join(0.2)
-                if self.timeoutThread.isAlive():
+                if self.timeoutThread.is_alive():
                     logger.debug(self.name + " no timely join in adapter")
             except RuntimeError as e:
                 logger.error(e)
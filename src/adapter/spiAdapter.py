@@ -113,11 +113,7 @@ class MAX31855_Adapter (adapter.adapters.SPIAdapter):
         self.temp_intern(  last['temp_int']  )
         self.temp_error(  last['error']  )
    
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
 
             current = self.spiManager.getValue(
                                 self.int_spi_bus, 
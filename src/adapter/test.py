@@ -42,11 +42,7 @@ class TestAdapter( adapter.adapters.Adapter):
         floats = [18.8, 18.9, 19.000, 19.123, 19.2]
         
         i = 0
-        while not self.stopped():
-            #
-            # delay 5 sec, but break time in small junks to allow stopping fast
-            #
-            self.delay(_del)
+        for _ in self.periodic(_del):
             
             self.toggleValue(str(i%2))
             
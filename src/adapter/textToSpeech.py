@@ -21,7 +21,6 @@
 import adapter
 import subprocess
 import logging
-import helper.abstractQueue
 
 debug = False
 
@@ -30,14 +29,10 @@ logger = logging.getLogger(__name__)
 # --------------------------------------------------------------------------------------
 
 class Festival_Adapter (adapter.adapters.Adapter):
-    """Interface to Festival """
+    """Interface to Festival, festival runs in the executor """
     mandatoryParameters = { 'queue.max' : 30 }
 
-    queue = None
-    
     def __init__(self):
-        self.queue = helper.abstractQueue.AbstractQueue()
-       
         adapter.adapters.Adapter.__init__(self)
 
     def setActive (self, state):
@@ -49,42 +44,32 @@ class Festival_Adapter (adapter.adapters.Adapter):
         adapter.adapters.Adapter.setActive(self, state);
 
 
-    def run(self):
-        while not(self.stopped()):
-            try:        
-                value = self.queue.get(True, 0.1)
-                
-                # replace some characters to prevent security problems
-                
-                value = value.replace("'" ,  ' ')
-                value = value.replace("|" ,  ' ')
-                value = value.replace("$" ,  ' ')
-                value = value.replace("\\",  ' ')
-                value = value.replace("/" ,  ' ')
-                value = value.replace(">" ,  ' ')
-                value = value.replace("<" ,  ' ')
-                value = value.replace("&" ,  ' ')
-                value = value.replace("~" ,  ' ')
-                value = value.replace("*" ,  ' ')
-                
-                cmd = "echo '{val:s}' | festival --tts".format(val=value)
-                if debug:
-                    print ( cmd )
-                return_code = subprocess.call( cmd, shell=True )
-            except helper.abstractQueue.AbstractQueue.Empty:
-                pass
-            except Exception as e:
-                logger.warn(e)
+    def _speak(self, value):
+        """executor job"""
+        # replace some characters to prevent security problems
+        
+        value = value.replace("'" ,  ' ')
+        value = value.replace("|" ,  ' ')
+        value = value.replace("$" ,  ' ')
+        value = value.replace("\\",  ' ')
+        value = value.replace("/" ,  ' ')
+        value = value.replace(">" ,  ' ')
+        value = value.replace("<" ,  ' ')
+        value = value.replace("&" ,  ' ')
+        value = value.replace("~" ,  ' ')
+        value = value.replace("*" ,  ' ')
+        
+        cmd = "echo '{val:s}' | festival --tts".format(val=value)
+        if debug:
+            print ( cmd )
+        return_code = subprocess.call( cmd, shell=True )
                
     def speech(self, value):
         if debug:
             print("speech", value)
 
-        if self.queue.qsize() > int(self.parameters['queue.max']):
-            
+        if not self.submit(self._speak, (value, )):
             logger.warn('{name:s}: queue is full, value discarded {val}'.format(name=self.name, val=value))
-        else:
-            self.queue.put(value)
         
 
 # --------------------------------------------------------------------------------------
@@ -94,7 +79,7 @@ class Festival_Adapter (adapter.adapters.Adapter):
 
 
 class Pico2Wave_Adapter (adapter.adapters.Adapter):
-    """Interface to Pico2Wave """
+    """Interface to Pico2Wave, pico2wave and aplay run in the executor """
     # language en-US
     # language en-GB
     # language de-DE
@@ -104,11 +89,7 @@ class Pico2Wave_Adapter (adapter.adapters.Adapter):
  
     mandatoryParameters = { 'queue.max' : 30, 'tts.lang' : 'de-DE' }
 
-    queue = None
-    
     def __init__(self):
-        self.queue = helper.abstractQueue.AbstractQueue()
-       
         adapter.adapters.Adapter.__init__(self)
 
     def setActive (self, state):
@@ -120,44 +101,34 @@ class Pico2Wave_Adapter (adapter.adapters.Adapter):
         adapter.adapters.Adapter.setActive(self, state);
 
 
-    def run(self):
+    def _speak(self, value):
+        """executor job"""
         lang = self.parameters['tts.lang']
         if not lang in [ 'en-US', 'en-GB', 'de-DE', 'es-ES', 'fr-FR', 'it-IT' ]:
             lang = 'de-DE'
         
-        while not(self.stopped()):
-            try:        
-                value = self.queue.get(True, 0.1)
-                
-                # replace some characters to prevent security problems
-                
-                value = value.replace("'" ,  ' ')
-                value = value.replace("|" ,  ' ')
-                value = value.replace("$" ,  ' ')
-                value = value.replace("\\",  ' ')
-                value = value.replace("/" ,  ' ')
-                value = value.replace(">" ,  ' ')
-                value = value.replace("<" ,  ' ')
-                value = value.replace("&" ,  ' ')
-                value = value.replace("~" ,  ' ')
-                value = value.replace("*" ,  ' ')
-                
-                cmd = "tmp=`mktemp -t XXXXXX.wav` && chmod 666 $tmp && pico2wave -l '{lang:s}' -w $tmp '{val:s}' && aplay $tmp && rm $tmp".format(lang=lang, val=value)
-                if debug:
-                    print ( cmd )
-                return_code = subprocess.call( cmd, shell=True )
-            except helper.abstractQueue.AbstractQueue.Empty:
-                pass
-            except Exception as e:
-                logger.warn(e)
+        # replace some characters to prevent security problems
+        
+        value = value.replace("'" ,  ' ')
+        value = value.replace("|" ,  ' ')
+        value = value.replace("$" ,  ' ')
+        value = value.replace("\\",  ' ')
+        value = value.replace("/" ,  ' ')
+        value = value.replace(">" ,  ' ')
+        value = value.replace("<" ,  ' ')
+        value = value.replace("&" ,  ' ')
+        value = value.replace("~" ,  ' ')
+        value = value.replace("*" ,  ' ')
+        
+        cmd = "tmp=`mktemp -t XXXXXX.wav` && chmod 666 $tmp && pico2wave -l '{lang:s}' -w $tmp '{val:s}' && aplay $tmp && rm $tmp".format(lang=lang, val=value)
+        if debug:
+            print ( cmd )
+        return_code = subprocess.call( cmd, shell=True )
                
     def speech(self, value):
         if debug:
             print("speech", value)
 
-        if self.queue.qsize() > int(self.parameters['queue.max']):
-            
+        if not self.submit(self._speak, (value, )):
             logger.warn('{name:s}: queue is full, value discarded {val}'.format(name=self.name, val=value))
-        else:
-            self.queue.put(value)
         
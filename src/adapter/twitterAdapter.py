@@ -106,10 +106,14 @@ class Twitter_Properties:
 # -------------------------------------------------------
             
 class Twitter_Adapter(adapter.adapters.Adapter):
+    """twitter messages are read in the executor, the adapter thread only 
+    submits each twitter.pollrate seconds. A read still pending is not repeated."""
     
     # -----------------------------------------
     # fields for adapter
     queueThread = None
+    api = None
+    properties = None
     
     # -----------------------------------------
    
@@ -162,39 +166,53 @@ class Twitter_Adapter(adapter.adapters.Adapter):
             print("twitter_read_term", self.twitter_read_term )
         
         self.term = self.parameters['twitter.term']
-        self.api = twitter.Api(
+        self.api = None
+        self.properties = None
+        self._readState = 0
+        
+        self.submit(self._login)
+        self.submit(self._read, key='read', duplicate='drop')
+        for _ in self.periodic(self.twitter_pollrate):
+            self.submit(self._read, key='read', duplicate='drop')
+            
+    def _login(self):
+        """executor job"""
+        api = twitter.Api(
                           consumer_key=self.parameters['twitter.consumer_key'],
                           consumer_secret=self.parameters['twitter.consumer_secret'],
                           access_token_key=self.parameters['twitter.access_token_key'],
                           access_token_secret=self.parameters['twitter.access_token_secret'])
         
-        user = self.api.VerifyCredentials()
+        user = api.VerifyCredentials()
         screen_name = user.GetScreenName()
         
         modulePathHandler = ModulePathHandler()
         properties_file = modulePathHandler.getScratchClientBaseRelativePath(self.parameters['twitter.datafile'])
         
-        self.properties = Twitter_Properties(properties_file)
-        self.properties.setScreenName(screen_name)    
+        properties = Twitter_Properties(properties_file)
+        properties.setScreenName(screen_name)    
+        self.api = api
+        self.properties = properties
 
-        state = 0
-        while not(self.stopped()):
-            
-            if self.twitter_read_direct and self.twitter_read_term:
-                if state == 0:
-                    self._readDirect()
-                    state = 1
-                elif state == 1:
-                    self._readTerm()
-                    state = 0
-                    
-            elif self.twitter_read_direct:
+    def _read(self):
+        """executor job"""
+        if self.properties == None:
+            # login failed
+            return
+        
+        if self.twitter_read_direct and self.twitter_read_term:
+            if self._readState == 0:
                 self._readDirect()
-                
-            elif self.twitter_read_term:
+                self._readState = 1
+            elif self._readState == 1:
                 self._readTerm()
+                self._readState = 0
                 
-            self.delay(self.twitter_pollrate)
+        elif self.twitter_read_direct:
+            self._readDirect()
+            
+        elif self.twitter_read_term:
+            self._readTerm()
 
                     
     def _readTerm(self): 
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: all 8 channels of a MCP3008 sampled by 8 ADC_MCP3008_10_Input
+# adapters compared to one ADC_Scan_Input, poll.interval 0.05, on a stand in
+# spidev which records the time of each conversion.
+#
+# Reported are the threads, the conversions, the spread of the sample times
+# (for each sample of channel 0 the largest distance to the nearest sample of
+# the other channels), the transfers overlapping on the device, which on the
+# pi interleave on the bus, and the cpu time.
+#
+# usage, from src-directory:
+#   python -m benchmark.adc_scan
+#
+
+import bisect
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import configuration
+import publishSubscribe
+import adapter.adapters
+import adapter.adc
+import spi.manager
+
+CHANNELS = 8
+RUN_TIME = 3.0
+# duration of one 3 byte transfer, ioctl included
+TRANSFER = 0.0001
+
+xmlSingle = """
+    <adapter class='adapter.adc.ADC_MCP3008_10_Input' name='adc_{n:d}'>
+        <output_value name='adc'>
+            <sensor name='adc_{n:d}'/>
+        </output_value>
+    </adapter>
+"""
+
+xmlScan = """
+    <adapter class='adapter.adc.ADC_Scan_Input' name='adc'>
+{outputs:s}
+    </adapter>
+"""
+
+xmlScanOutput = """
+        <output_value name='adc_{n:d}'>
+            <sensor name='adc_{n:d}'/>
+        </output_value>
+"""
+
+class SpiDev:
+    """stand in for spidev.SpiDev, a MCP3008 on each device"""
+    lock = threading.Lock()
+    # channel --> sample times
+    samples = {}
+    active = 0
+    overlapping = 0
+    transfers = 0
+
+    def __init__(self):
+        self.max_speed_hz = 0
+
+    def open(self, bus, device):
+        pass
+
+    def close(self):
+        pass
+
+    def xfer2(self, data):
+        cls = SpiDev
+        channel = (data[1] >> 4) - 8
+        with cls.lock:
+            cls.transfers += 1
+            cls.active += 1
+            if cls.active > 1:
+                cls.overlapping += 1
+            cls.samples.setdefault(channel, []).append(time.time())
+        time.sleep(TRANSFER)
+        with cls.lock:
+            cls.active -= 1
+        value = 512 + channel * 50
+        return [0, value >> 8, value & 0xff]
+
+class spidev:
+    SpiDev = SpiDev
+
+def reset():
+    SpiDev.samples = {}
+    SpiDev.active = 0
+    SpiDev.overlapping = 0
+    SpiDev.transfers = 0
+
+def single():
+    adapters = []
+    for n in range(CHANNELS):
+        _adapter = adapter.adc.ADC_MCP3008_10_Input()
+        configManager = configuration.ConfigManager_1_0(None)
+        configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xmlSingle.format(n=n)))
+        _adapter.parameters.update( { 'poll.interval': '0.05', 'poll.band': '2', 'spi.bus': '0', 'spi.device': '0', 'adc.channel': str(n) } )
+        adapters.append(_adapter)
+    return adapters
+
+def scan():
+    _adapter = adapter.adc.ADC_Scan_Input()
+    configManager = configuration.ConfigManager_1_0(None)
+    outputs = ''.join( [ xmlScanOutput.format(n=n) for n in range(CHANNELS) ] )
+    configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xmlScan.format(outputs=outputs)))
+    _adapter.parameters.update( { 'poll.interval': '0.05', 'poll.band': '2', 'spi.bus': '0', 'spi.device': '0', 'adc.type': 'MCP3008' } )
+    _adapter.setSPIManager(spi.manager.SPIManager())
+    return [ _adapter ]
+
+def nearest(times, t):
+    """distance of t to the nearest of the sorted times"""
+    i = bisect.bisect_left(times, t)
+    return min( [ abs(times[j] - t) for j in (i - 1, i) if 0 <= j < len(times) ] )
+
+def received(message):
+    pass
+
+def measure(factory):
+    reset()
+    adapters = factory()
+    for n in range(CHANNELS):
+        publishSubscribe.Pub.subscribe("scratch.output.value.adc_{n:d}".format(n=n), received)
+    threadCount = threading.active_count()
+    for _adapter in adapters:
+        _adapter.setActive(True)
+    time.sleep(0.1)
+    threadCount = threading.active_count() - threadCount
+    cpu0 = time.process_time()
+    time.sleep(RUN_TIME)
+    cpu = time.process_time() - cpu0
+    for _adapter in adapters:
+        _adapter.setActive(False)
+    for n in range(CHANNELS):
+        publishSubscribe.Pub.unsubscribe("scratch.output.value.adc_{n:d}".format(n=n), received)
+
+    samples = SpiDev.samples
+    # the single adapters start one after the other
+    started = max( [ samples[n][0] for n in range(CHANNELS) ] )
+    spread = [ max( [ nearest(samples[n], t) for n in range(1, CHANNELS) ] ) for t in samples[0] if t >= started ]
+    return threadCount, SpiDev.transfers, sum(spread) / len(spread), max(spread), SpiDev.overlapping, cpu
+
+def run():
+    # spidev is not available off the pi
+    adapter.adapters.spidev = spidev
+    spi.manager.spidev = spidev
+    print("{c:d} channels, poll.interval 0.05, {r:g} sec".format(c=CHANNELS, r=RUN_TIME))
+    print("{c:>30s} {t:>8s} {x:>10s} {m:>12s} {s:>12s} {o:>10s} {p:>10s}".format(c='', t='threads', x='transfers', m='spread [ms]', s='max [ms]', o='overlap', p='cpu [ms]'))
+    for name, factory in ( ('8 x ADC_MCP3008_10_Input', single),
+                           ('ADC_Scan_Input',           scan) ):
+        threadCount, transfers, mean, maximum, overlapping, cpu = measure(factory)
+        print("{c:>30s} {t:8d} {x:10d} {m:12.3f} {s:12.3f} {o:10d} {p:10.1f}".format(c=name, t=threadCount, x=transfers, m=mean * 1000.0, s=maximum * 1000.0, o=overlapping, p=cpu * 1000.0))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: Adapter.delay in 0.1 sec slices compared to the wait on the stop
+# event, and the loop period of delay() compared to periodic().
+#
+# idle:   adapters with poll.interval 1 sec, like an adc or temperature
+#         sensor config; wakeups are the voluntary context switches of the
+#         process per second (linux).
+# period: poll.interval 0.02 sec with 5 msec work in the loop.
+#
+# usage, from src-directory:
+#   python -m benchmark.delay [seconds]
+#
+
+import glob
+import sys
+import time
+
+import adapter.adapters
+
+class LegacyAdapter(adapter.adapters.Adapter):
+    """Adapter with the former delay in 0.1 sec slices"""
+
+    def delay(self, t):
+        stats = self.pollStatistics
+        if stats != None and t == stats.interval:
+            stats.tick()
+        t0 = 0
+        while t0 + 0.1 < t:
+            if self.stopped():
+                return
+            time.sleep(0.1)
+            t0 += 0.1
+        tx = t - t0
+        if tx > 0:
+            time.sleep(tx)
+
+class DelayLoop:
+    """while not stopped: delay; work"""
+
+    def __init__(self, interval, work):
+        self.interval = interval
+        self.work = work
+
+    def __call__(self, _adapter):
+        while not _adapter.stopped():
+            _adapter.delay(self.interval)
+            self.work()
+
+class PeriodicLoop(DelayLoop):
+    """for _ in periodic(): work"""
+
+    def __call__(self, _adapter):
+        for _ in _adapter.periodic(self.interval):
+            self.work()
+
+def contextSwitches():
+    """voluntary context switches of all threads"""
+    n = 0
+    for task in glob.glob('/proc/self/task/*/status'):
+        try:
+            with open(task) as f:
+                for line in f:
+                    if line.startswith('voluntary_ctxt_switches:'):
+                        n += int(line.split()[1])
+        except IOError:
+            # thread terminated
+            pass
+    return n
+
+def measure(adapterClass, loop, n, duration):
+    adapters = []
+    for i in range(n):
+        _adapter = adapterClass()
+        _adapter.name = 'a{n:d}'.format(n=i)
+        _adapter.pollStatistics = adapter.adapters.PollStatistics(loop.interval)
+        _adapter.run = lambda _adapter=_adapter: loop(_adapter)
+        adapters.append(_adapter)
+
+    for _adapter in adapters:
+        _adapter.start()
+    time.sleep(0.5)
+    c0 = contextSwitches()
+    time.sleep(duration)
+    wakeups = (contextSwitches() - c0) / duration
+    t0 = time.time()
+    for _adapter in adapters:
+        _adapter.stop()
+    stopTime = time.time() - t0
+    periodMean = sum( [ a.pollStatistics.periodMean() or 0 for a in adapters ] ) / n
+    return wakeups, periodMean, stopTime
+
+def nothing():
+    pass
+
+def work():
+    t = time.time() + 0.005
+    while time.time() < t:
+        pass
+
+def run(duration = 5.0):
+    print("{c:>24s} {w:>14s} {p:>14s} {s:>10s}".format(c='', w='wakeups/sec', p='period [ms]', s='stop [ms]'))
+    cases = [ ('idle, 10 x 1s, legacy',   LegacyAdapter,            DelayLoop(1.0, nothing),    10),
+              ('idle, 10 x 1s, delay',    adapter.adapters.Adapter, DelayLoop(1.0, nothing),    10),
+              ('idle, 10 x 1s, periodic', adapter.adapters.Adapter, PeriodicLoop(1.0, nothing), 10),
+              ('20ms+5ms, legacy',        LegacyAdapter,            DelayLoop(0.02, work),      1),
+              ('20ms+5ms, delay',         adapter.adapters.Adapter, DelayLoop(0.02, work),      1),
+              ('20ms+5ms, periodic',      adapter.adapters.Adapter, PeriodicLoop(0.02, work),   1) ]
+    for name, adapterClass, loop, n in cases:
+        wakeups, periodMean, stopTime = measure(adapterClass, loop, n, duration)
+        print("{c:>24s} {w:14.1f} {p:14.2f} {s:10.1f}".format(c=name, w=wakeups, p=periodMean * 1000.0, s=stopTime * 1000.0))
+
+if __name__ == '__main__':
+    run( *[ float(x) for x in sys.argv[1:2] ] )
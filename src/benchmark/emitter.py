@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: throughput of GpioInput.button --> sendValue, with the output
+# emitters bound at configuration time compared to the former lookup of the
+# calling method by inspect.stack().
+#
+# usage, from src-directory:
+#   python -m benchmark.emitter
+#
+
+import inspect
+import timeit
+import xml.etree.ElementTree as ET
+
+import configuration
+import publishSubscribe
+import adapter.adapters
+import adapter.gpio
+
+xmlAdapter = """
+    <adapter class='adapter.gpio.GpioInput' name='button_s0'>
+        <output_value name='button'>
+            <sensor name='s0'/>
+        </output_value>
+        <parameter name='poll.interval' value='0.05' />
+        <parameter name='value.inverse' value='false' />
+    </adapter>
+"""
+
+class LegacyGpioInput(adapter.gpio.GpioInput):
+    """GpioInput with the former, stack inspecting sendValue"""
+    
+    def _bindEmitters(self):
+        pass
+    
+    def sendValue(self, value):
+        callerName = inspect.stack()[1][3]
+        
+        for ov in self.output_values:
+            if ov.name == callerName:
+                alias = ov.scratchNames[0]
+                topic = "scratch.output.value.{name:s}".format(name=alias)
+                publishSubscribe.Pub.publish( topic , { 'name':alias, 'value':str(value) } )
+
+def configure(_adapter):
+    configManager = configuration.ConfigManager_1_0(None)
+    configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xmlAdapter))
+    _adapter.value_inverse = False
+    return _adapter
+
+def run(number=2000):
+    received = []
+    publishSubscribe.Pub.subscribe("scratch.output.value.s0", received.append)
+    
+    print("{n:>10s} {t:>12s} {r:>14s}".format(n='sendValue', t='time [us]', r='events/s'))
+    results = {}
+    for name, _adapter in [ ('inspect', configure(LegacyGpioInput()) ),
+                            ('emitter', configure(adapter.gpio.GpioInput()) ) ]:
+        del received[:]
+        t = min( timeit.repeat(lambda: _adapter.button('1'), number=number, repeat=3) )
+        assert len(received) == 3 * number
+        results[name] = t
+        print("{n:>10s} {t:12.2f} {r:14.0f}".format(n=name, t=t / number * 1e6, r=number / t))
+        
+    print("factor {f:.1f}".format(f=results['inspect'] / results['emitter']))
+
+if __name__ == '__main__':
+    run()
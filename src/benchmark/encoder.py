@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: GPIOEncoder, the former polled decoder compared to the table
+# decoder, polled and on edges. Edge trains are played on TEST_GPIOManager
+# inputs: STEPS forward, then STEPS/2 backward, at several step rates.
+# Reported are the final position (expected STEPS/2), the invalid
+# transitions and the position values published.
+#
+# usage, from src-directory:
+#   python -m benchmark.encoder
+#
+
+import time
+import xml.etree.ElementTree as ET
+
+import configuration
+import publishSubscribe
+import adapter.adapters
+import adapter.encoder
+import gpio.TEST_GPIOManager
+
+STEPS = 2000
+PORTS = (4, 5)
+# (p0, p1) in forward direction
+GRAY = ( (0, 0), (1, 0), (1, 1), (0, 1) )
+
+xmlAdapter = """
+    <adapter class='adapter.encoder.GPIOEncoder' name='encoder'>
+        <output_value name='position'>
+            <sensor name='position'/>
+        </output_value>
+    </adapter>
+"""
+
+class LegacyGPIOEncoder(adapter.encoder.GPIOEncoder):
+    """GPIOEncoder with the former decoder, polled, each step sent"""
+
+    outputValueMinInterval = {}
+
+    def run(self):
+        gpio_0 = self.getChannelByAlias('p0')
+        gpio_1 = self.getChannelByAlias('p1')
+        _del = float(self.parameters['poll.interval'])
+        i0_last = None
+        i1_last = None
+        while not self.stopped():
+            self.delay(_del)
+            i0 =  self.gpioManager.get( gpio_0)
+            i1 =  self.gpioManager.get( gpio_1)
+            if i0 != i0_last:
+                if i0 == 0 and i1 == 0:
+                    self.pos -= 1
+                if i0 == 1 and i1 == 1:
+                    self.pos -= 1
+                if i0 == 0 and i1 == 1:
+                    self.pos += 1
+                if i0 == 1 and i1 == 0:
+                    self.pos += 1
+                self.position(str(self.pos))
+                i0_last = i0
+            if i1 != i1_last:
+                if i0 == 0 and i1 == 0:
+                    self.pos += 1
+                if i0 == 1 and i1 == 1:
+                    self.pos += 1
+                if i0 == 0 and i1 == 1:
+                    self.pos -= 1
+                if i0 == 1 and i1 == 0:
+                    self.pos -= 1
+                self.position(str(self.pos))
+                i1_last = i1
+
+def gpioConfiguration(port, alias):
+    gpioConfig = configuration.GpioConfiguration()
+    gpioConfig.port = 'GPIO{p:d}'.format(p=port)
+    gpioConfig.portNumber = port
+    gpioConfig.alias = alias
+    return gpioConfig
+
+def play(manager, rate):
+    """STEPS forward, STEPS/2 backward at rate steps/sec"""
+    sequence = [ GRAY[i % 4] for i in range(1, STEPS + 1) ]
+    sequence += [ GRAY[i % 4] for i in range(STEPS - 1, STEPS // 2 - 1, -1) ]
+    t0 = time.time()
+    for n, (p0, p1) in enumerate(sequence):
+        t = t0 + n / float(rate)
+        while time.time() < t:
+            pass
+        manager.setInput(PORTS[0], p0)
+        manager.setInput(PORTS[1], p1)
+
+def measure(encoderClass, parameters, rate):
+    gpio.TEST_GPIOManager.debug = False
+    manager = gpio.TEST_GPIOManager.GPIOManager()
+
+    encoder = encoderClass()
+    configManager = configuration.ConfigManager_1_0(None)
+    configManager.adapterConfig(encoder, "benchmark", ET.fromstring(xmlAdapter))
+    encoder.parameters.update(parameters)
+    encoder.gpios = [ gpioConfiguration(PORTS[0], 'p0'), gpioConfiguration(PORTS[1], 'p1') ]
+    encoder.setGpioManager(manager)
+    encoder.pos = 0
+
+    values = []
+    publishSubscribe.Pub.subscribe("scratch.output.value.position", values.append)
+    encoder.start()
+    time.sleep(0.05)
+    del values[:]
+    play(manager, rate)
+    time.sleep(0.1)
+    encoder.stop()
+    publishSubscribe.Pub.unsubscribe("scratch.output.value.position", values.append)
+    final = values[-1]['value'] if values else None
+    return final, encoder.invalidTransitions, len(values)
+
+def run():
+    print("{s:d} steps forward, {b:d} back, expected position {e:d}".format(s=STEPS, b=STEPS // 2, e=STEPS // 2))
+    print("{c:>22s} {r:>10s} {p:>10s} {i:>10s} {v:>10s}".format(c='', r='steps/s', p='position', i='invalid', v='published'))
+    for rate in (100, 1000, 10000):
+        for name, encoderClass, parameters in [ ('legacy, poll 0.005', LegacyGPIOEncoder,          { 'poll.interval': '0.005' } ),
+                                                ('table, poll 0.005',  adapter.encoder.GPIOEncoder, { 'poll.interval': '0.005' } ),
+                                                ('table, edges',       adapter.encoder.GPIOEncoder, { } ) ]:
+            final, invalid, published = measure(encoderClass, parameters, rate)
+            print("{c:>22s} {r:10d} {p:>10s} {i:10d} {v:10d}".format(c=name, r=rate, p=str(final), i=invalid, v=published))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: Linux_Adapter triggered from scratch broadcasts, the command
+# 'sleep 0.2'. Compared are the command called in the input method, the
+# former thread and queue per adapter, and the executor with and without
+# queue.duplicate drop.
+#
+# ADAPTERS adapters get a burst of TRIGGERS broadcasts each, as the listener
+# thread delivers them. Reported are the time the listener is blocked per
+# broadcast (mean, max), the threads, the commands run and the total time
+# until all commands have finished.
+#
+# usage, from src-directory:
+#   python -m benchmark.executor
+#
+
+import subprocess
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import configuration
+import publishSubscribe
+import adapter.adapters
+import adapter.linux
+import executor
+import helper.abstractQueue
+
+ADAPTERS = 4
+TRIGGERS = 5
+COMMAND = 'sleep 0.2'
+
+xmlAdapter = """
+    <adapter class='adapter.linux.Linux_Adapter' name='linux_{n:d}'>
+        <input name='trigger'>
+            <broadcast name='trigger_{n:d}'/>
+        </input>
+    </adapter>
+"""
+
+# end time of each command
+calls = []
+
+class InlineLinux_Adapter(adapter.linux.Linux_Adapter):
+    """command called in the input method"""
+
+    def trigger(self):
+        self._call()
+
+class QueueLinux_Adapter(adapter.linux.Linux_Adapter):
+    """the former implementation, own thread and queue"""
+
+    def __init__(self):
+        adapter.linux.Linux_Adapter.__init__(self)
+        self.queue = helper.abstractQueue.AbstractQueue()
+
+    def run(self):
+        while not(self.stopped()):
+            try:
+                self.queue.get(True, 0.1)
+                self._call()
+            except helper.abstractQueue.AbstractQueue.Empty:
+                pass
+
+    def trigger(self):
+        if self.queue.qsize() > int(self.parameters['queue.max']):
+            pass
+        else:
+            self.queue.put('trigger')
+
+def call():
+    subprocess.call(COMMAND, shell=True)
+    calls.append(time.time())
+
+def measure(adapterClass, parameters, threads):
+    del calls[:]
+    _executor = None
+    if threads > 0:
+        _executor = executor.Executor(threads = threads)
+        _executor.setActive(True)
+
+    adapters = []
+    for i in range(ADAPTERS):
+        _adapter = adapterClass()
+        configManager = configuration.ConfigManager_1_0(None)
+        configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xmlAdapter.format(n=i)))
+        _adapter.parameters.update( { 'queue.max': '30', 'os.command': COMMAND } )
+        _adapter.parameters.update(parameters)
+        _adapter._call = call
+        if _executor != None:
+            _adapter.setExecutor(_executor)
+        _adapter.setActive(True)
+        adapters.append(_adapter)
+
+    time.sleep(0.1)
+    threadCount = threading.active_count()
+    blocked = []
+    t0 = time.time()
+    for n in range(TRIGGERS):
+        for i in range(ADAPTERS):
+            t = time.time()
+            publishSubscribe.Pub.publish("scratch.input.command.trigger_{n:d}".format(n=i), { 'name': 'trigger_{n:d}'.format(n=i) })
+            blocked.append(time.time() - t)
+        threadCount = max(threadCount, threading.active_count())
+
+    # wait until no command finished for two command durations
+    n = -1
+    while n != len(calls):
+        n = len(calls)
+        threadCount = max(threadCount, threading.active_count())
+        time.sleep(0.4)
+    total = max(calls) - t0
+
+    for _adapter in adapters:
+        _adapter.setActive(False)
+        for i in range(ADAPTERS):
+            publishSubscribe.Pub.unsubscribe("scratch.input.command.trigger_{n:d}".format(n=i), _adapter.resolveCommand)
+    if _executor != None:
+        _executor.setActive(False)
+    return sum(blocked) / len(blocked), max(blocked), threadCount, len(calls), total
+
+def run():
+    print("{a:d} adapters, {t:d} broadcasts each, '{c:s}'".format(a=ADAPTERS, t=TRIGGERS, c=COMMAND))
+    print("{c:>26s} {m:>14s} {x:>14s} {t:>8s} {r:>8s} {s:>10s}".format(c='', m='blocked [ms]', x='max [ms]', t='threads', r='calls', s='total [s]'))
+    cases = [ ('input method',              InlineLinux_Adapter,         {},                               0),
+              ('thread and queue',          QueueLinux_Adapter,          {},                               0),
+              ('executor 2',                adapter.linux.Linux_Adapter, {},                               2),
+              ('executor 8, concurrency 2', adapter.linux.Linux_Adapter, { 'executor.concurrency': '2' },  8),
+              ('executor 2, drop',          adapter.linux.Linux_Adapter, { 'queue.duplicate': 'drop' },    2) ]
+    for name, adapterClass, parameters, threads in cases:
+        mean, maximum, threadCount, n, total = measure(adapterClass, parameters, threads)
+        print("{c:>26s} {m:14.3f} {x:14.3f} {t:8d} {r:8d} {s:10.2f}".format(c=name, m=mean * 1000.0, x=maximum * 1000.0, t=threadCount, r=n, s=total))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: GpioEventInput polled with poll.interval 0.02 compared to edge
+# callbacks, inputs played by TEST_GPIOManager.script().
+#
+# Each press is a 15 msec pulse with 1 msec of contact bounce at both edges,
+# one press each 67 msec. Reported are the presses detected, the
+# broadcasts sent and the cpu time while idle (no edges).
+#
+# usage, from src-directory:
+#   python -m benchmark.gpio_edges [presses]
+#
+
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+import configuration
+import publishSubscribe
+import adapter.adapters
+import adapter.gpio
+import gpio.TEST_GPIOManager
+
+PORT = 27
+PULSE = 0.015
+PERIOD = 0.067
+BOUNCE = [ 0.0, 0.0005, 0.001 ]
+
+xmlAdapter = """
+    <adapter class='adapter.gpio.GpioEventInput' name='button'>
+        <output name='button_pressed'>
+            <broadcast name='pressed'/>
+        </output>
+        <output name='button_released'>
+            <broadcast name='released'/>
+        </output>
+    </adapter>
+"""
+
+def pressScript(presses):
+    """(time, level) of bouncing presses"""
+    edges = []
+    for i in range(presses):
+        t = 0.1 + i * PERIOD
+        for n, dt in enumerate(BOUNCE):
+            edges.append( (t + dt, 1 - n % 2) )
+        for n, dt in enumerate(BOUNCE):
+            edges.append( (t + PULSE + dt, n % 2) )
+    return edges
+
+def gpioConfiguration():
+    setting = configuration.GpioSetting()
+    setting.dir = 'IN'
+    setting.pull = 'PUD_UP'
+    gpioConfig = configuration.GpioConfiguration()
+    gpioConfig.port = 'GPIO{p:d}'.format(p=PORT)
+    gpioConfig.portNumber = PORT
+    gpioConfig.default_setting = setting
+    gpioConfig.active_setting = setting
+    return gpioConfig
+
+def measure(parameters, presses):
+    gpio.TEST_GPIOManager.debug = False
+    manager = gpio.TEST_GPIOManager.GPIOManager()
+
+    _adapter = adapter.gpio.GpioEventInput()
+    configManager = configuration.ConfigManager_1_0(None)
+    configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xmlAdapter))
+    _adapter.parameters['value.inverse'] = 'false'
+    _adapter.parameters.update(parameters)
+    _adapter.gpios = [ gpioConfiguration() ]
+    _adapter.setGpioManager(manager)
+
+    counts = { 'pressed': 0, 'released': 0 }
+    def pressed(message):
+        counts['pressed'] += 1
+    def released(message):
+        counts['released'] += 1
+    publishSubscribe.Pub.subscribe("scratch.output.command.pressed", pressed)
+    publishSubscribe.Pub.subscribe("scratch.output.command.released", released)
+
+    _adapter.setActive(True)
+    # idle cpu
+    cpu0 = time.process_time()
+    time.sleep(1.0)
+    idleCpu = time.process_time() - cpu0
+
+    counts['pressed'] = 0
+    counts['released'] = 0
+    manager.script(PORT, pressScript(presses)).join()
+    time.sleep(0.1)
+    _adapter.setActive(False)
+    publishSubscribe.Pub.unsubscribe("scratch.output.command.pressed", pressed)
+    publishSubscribe.Pub.unsubscribe("scratch.output.command.released", released)
+    return counts['pressed'], counts['released'], idleCpu
+
+def run(presses = 200):
+    print("{p:d} presses of {w:g} msec with bounce".format(p=presses, w=PULSE * 1000))
+    print("{c:>28s} {p:>10s} {r:>10s} {i:>14s}".format(c='', p='pressed', r='released', i='idle cpu [ms/s]'))
+    for name, parameters in [ ('poll.interval 0.02',            { 'poll.interval': '0.02' } ),
+                              ('event, no debounce',            { 'debounce.time': '0' } ),
+                              ('event, debounce.time 0.005',    { 'debounce.time': '0.005' } ),
+                              ('event, debounce.time default',  { } ) ]:
+        pressed, released, idleCpu = measure(parameters, presses)
+        print("{c:>28s} {p:10d} {r:10d} {i:14.2f}".format(c=name, p=pressed, r=released, i=idleCpu * 1000.0))
+
+if __name__ == '__main__':
+    run( *[ int(x) for x in sys.argv[1:2] ] )
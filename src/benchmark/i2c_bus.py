@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2014  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: adapters sharing i2c bus 1 on i2c.TEST_i2c. A Pressure_BMP085_Input
+# and a Luminosity_BH1750_Input, poll.interval 0.01, and a PWM_PCA9685 getting 
+# a channel update each 5 msec. Compared are the former manager, one smbus
+# handle per address and 16 bit values read byte by byte, and the shared bus
+# with I2C_RDWR block transfers.
+#
+# Each transfer (one syscall on the pi) takes TRANSFER seconds. Reported are 
+# the bus handles, the transfers, the transfers overlapping on the bus, the
+# BMP085 readings and the mean time for one reading (calibration, temperature
+# and pressure, with 18 msec of conversion time).
+#
+# usage, from src-directory:
+#   python -m benchmark.i2c_bus
+#
+
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import configuration
+import adapter.adapters
+import adapter.i2cAdapter
+import i2c.manager
+import i2c.TEST_i2c
+
+RUN_TIME = 2.0
+TRANSFER = 0.0002
+
+xmlBMP085 = """
+    <adapter class='adapter.i2cAdapter.Pressure_BMP085_Input' name='bmp085'>
+        <output_value name='pressure'>
+            <sensor name='pressure'/>
+        </output_value>
+        <output_value name='temperature'>
+            <sensor name='temperature'/>
+        </output_value>
+    </adapter>
+"""
+
+xmlBH1750 = """
+    <adapter class='adapter.i2cAdapter.Luminosity_BH1750_Input' name='bh1750'>
+        <output_value name='luminosity'>
+            <sensor name='luminosity'/>
+        </output_value>
+    </adapter>
+"""
+
+xmlPCA9685 = """
+    <adapter class='adapter.i2cAdapter.PWM_PCA9685' name='pca9685'>
+        <input_value name='channel_0'>
+            <variable name='pwm_0'/>
+        </input_value>
+    </adapter>
+"""
+
+# data sheet example: calibration, UT and UP
+BMP085_REGISTERS = { 0xAA: 0x01, 0xAB: 0x98, 0xAC: 0xFF, 0xAD: 0xB8, 0xAE: 0xC7, 0xAF: 0xD1,
+                     0xB0: 0x7F, 0xB1: 0xE5, 0xB2: 0x7F, 0xB3: 0xF5, 0xB4: 0x5A, 0xB5: 0x71,
+                     0xB6: 0x18, 0xB7: 0x2E, 0xB8: 0x00, 0xB9: 0x04, 0xBA: 0x80, 0xBB: 0x00,
+                     0xBC: 0xDD, 0xBD: 0xF9, 0xBE: 0x0B, 0xBF: 0x34,
+                     0xF6: 0x6C, 0xF7: 0xFA, 0xF8: 0x00 }
+
+class LegacySMBus:
+    """smbus.SMBus, one handle per address, a transfer per call"""
+    
+    def __init__(self, bus):
+        self.i2cBus = i2c.TEST_i2c.I2CBus(bus)
+        
+    def write_byte_data(self, address, reg, value):
+        self.i2cBus.transfer(address, [reg, value], 0)
+        
+    def read_byte_data(self, address, reg):
+        return self.i2cBus.transfer(address, [reg], 1)[0]
+        
+    def write_i2c_block_data(self, address, reg, data):
+        self.i2cBus.transfer(address, [reg] + list(data), 0)
+        
+    def read_i2c_block_data(self, address, reg, length = 32):
+        return self.i2cBus.transfer(address, [reg], length)
+        
+class LegacyI2CManager:
+    """the former I2CManager.open()"""
+    
+    def __init__(self):
+        self.handles = 0
+        
+    def open(self, bus, address):
+        self.handles += 1
+        return LegacySMBus(bus)
+    
+    def close(self, bus = None, address = None):
+        pass
+    
+class LegacyPressure_BMP085_Input(adapter.i2cAdapter.Pressure_BMP085_Input):
+    """16 bit values and pressure read byte by byte"""
+    
+    def readU16(self, reg):
+        hibyte = self.bus.read_byte_data(self.int_i2c_address, reg)
+        return (hibyte << 8) + self.bus.read_byte_data(self.int_i2c_address, reg+1)
+    
+    def readS16(self, reg):
+        hibyte = self.bus.read_byte_data(self.int_i2c_address, reg)
+        if (hibyte > 127):
+            hibyte -= 256
+        return (hibyte << 8) + self.bus.read_byte_data(self.int_i2c_address, reg+1)
+    
+    def read_raw_pressure(self):
+        self.write8(self.BMP085_CONTROL, self.BMP085_READPRESSURECMD + (self._mode << 6))
+        time.sleep(0.008)
+        msb = self.readU8(self.BMP085_PRESSUREDATA)
+        lsb = self.readU8(self.BMP085_PRESSUREDATA+1)
+        xlsb = self.readU8(self.BMP085_PRESSUREDATA+2)
+        return ((msb << 16) + (lsb << 8) + xlsb) >> (8 - self._mode)
+
+def timed(_adapter, readings):
+    """record the duration of getValues()"""
+    getValues = _adapter.getValues
+    def f():
+        t = time.time()
+        r = getValues()
+        readings.append(time.time() - t)
+        return r
+    _adapter.getValues = f
+
+def configure(_adapter, xml, parameters):
+    configManager = configuration.ConfigManager_1_0(None)
+    configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xml))
+    _adapter.parameters.update(parameters)
+    return _adapter
+
+def measure(legacy):
+    i2c.TEST_i2c.reset()
+    i2c.TEST_i2c.transferTime = TRANSFER
+    i2c.TEST_i2c.addDevice(1, 0x77, i2c.TEST_i2c.RegisterDevice(BMP085_REGISTERS))
+    i2c.TEST_i2c.addDevice(1, 0x23, i2c.TEST_i2c.RegisterDevice())
+    i2c.TEST_i2c.addDevice(1, 0x40, i2c.TEST_i2c.RegisterDevice())
+    
+    if legacy:
+        i2cManager = LegacyI2CManager()
+        bmp085 = LegacyPressure_BMP085_Input()
+    else:
+        i2cManager = i2c.manager.I2CManager(busClass = i2c.TEST_i2c.I2CBus)
+        bmp085 = adapter.i2cAdapter.Pressure_BMP085_Input()
+    adapters = [ configure(bmp085, xmlBMP085, { 'poll.interval': '0.01', 'i2c.bus': '1', 'i2c.address': '0x77' }),
+                 configure(adapter.i2cAdapter.Luminosity_BH1750_Input(), xmlBH1750, { 'poll.interval': '0.01', 'i2c.bus': '1', 'i2c.address': '0x23' }),
+                 configure(adapter.i2cAdapter.PWM_PCA9685(), xmlPCA9685, { 'i2c.bus': '1', 'i2c.address': '0x40', 'frequency': '50' }) ]
+    readings = []
+    timed(bmp085, readings)
+    
+    # bus transfers, also of the legacy handles
+    transfers = []
+    transfer = i2c.TEST_i2c.I2CBus.transfer
+    def counting(self, address, data, readLength):
+        transfers.append(address)
+        return transfer(self, address, data, readLength)
+    i2c.TEST_i2c.I2CBus.transfer = counting
+    
+    for _adapter in adapters:
+        _adapter.setI2CManager(i2cManager)
+        _adapter.setActive(True)
+    
+    pwm = adapters[2]
+    t = time.time() + RUN_TIME
+    n = 0
+    while time.time() < t:
+        pwm.channel_0(str(n % 100))
+        n += 1
+        time.sleep(0.005)
+    
+    for _adapter in adapters:
+        _adapter.setActive(False)
+    i2c.TEST_i2c.I2CBus.transfer = transfer
+    
+    if legacy:
+        handles = i2cManager.handles
+    else:
+        handles = 1
+    return handles, len(transfers), i2c.TEST_i2c.overlaps, len(readings), sum(readings) / len(readings)
+
+def run():
+    adapter.i2cAdapter.debug = False
+    # 'Topic not found' of the sensor values is not part of the measurement
+    logging.getLogger("Pub").setLevel(logging.CRITICAL)
+    print("BMP085 and BH1750 poll.interval 0.01, PCA9685 update each 5 msec, transfer {t:g} msec, {r:g} sec".format(t=TRANSFER * 1000.0, r=RUN_TIME))
+    print("{c:>26s} {h:>8s} {t:>10s} {o:>10s} {n:>10s} {m:>14s}".format(c='', h='handles', t='transfers', o='overlaps', n='readings', m='reading [ms]'))
+    for name, legacy in ( ('smbus per address', True),
+                          ('shared bus, I2C_RDWR', False) ):
+        handles, transfers, overlaps, readings, mean = measure(legacy)
+        print("{c:>26s} {h:8d} {t:10d} {o:10d} {n:10d} {m:14.2f}".format(c=name, h=handles, t=transfers, o=overlaps, n=readings, m=mean * 1000.0))
+
+if __name__ == '__main__':
+    run()
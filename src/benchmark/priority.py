@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: latency of broadcasts while adapter threads stream analog
+# values, ScratchSender with one queue compared to -priority.
+#
+# VALUE_THREADS threads send values of 16 variables each every 5 msec, like
+# adc loops; one thread sends a broadcast each 20 msec. Scratch reads through
+# small socket buffers, with a delay after each read when slow; then the
+# values queue up. Reported is the time from queueing a broadcast till
+# scratch reads it, for the broadcasts arriving within the run time.
+#
+# usage, from src-directory:
+#   python -m benchmark.priority
+#
+
+from __future__ import print_function
+
+import logging
+import socket
+import threading
+import time
+
+import protocol
+import scratchClient
+
+VALUE_THREADS = 4
+VARIABLES = 16
+VALUE_INTERVAL = 0.005
+BROADCASTS = 100
+BROADCAST_INTERVAL = 0.02
+# broadcasts arriving later are not counted
+RUN_TIME = BROADCASTS * BROADCAST_INTERVAL + 1.0
+
+class Receiver(threading.Thread):
+    """time of arrival of each broadcast"""
+
+    def __init__(self, sock, readDelay):
+        threading.Thread.__init__(self)
+        self.sock = sock
+        self.readDelay = readDelay
+        self.arrived = {}
+        self.values = 0
+
+    def run(self):
+        reader = protocol.RecordReader(1024)
+        deadline = time.time() + RUN_TIME
+        while len(self.arrived) < BROADCASTS and time.time() < deadline and reader.recv(self.sock):
+            now = time.time()
+            for record in reader.records():
+                record = protocol.decode(record)
+                if record.startswith('broadcast'):
+                    self.arrived[ record.split('"')[1] ] = now
+                else:
+                    self.values += 1
+            if self.readDelay:
+                time.sleep(self.readDelay)
+
+def measure(priority, readDelay):
+    a, b = socket.socketpair()
+    a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    b.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    receiver = Receiver(b, readDelay)
+    receiver.start()
+
+    sender = scratchClient.ScratchSender(priority = priority)
+    sender.setSocket(a)
+    sender.start()
+
+    done = threading.Event()
+    def values(t):
+        i = 0
+        while not done.is_set():
+            for v in range(VARIABLES):
+                sender.sendValue( { 'name': 'adc_{t:d}_{v:d}'.format(t=t, v=v), 'value': str(i) } )
+            i += 1
+            time.sleep(VALUE_INTERVAL)
+    producers = [ threading.Thread(target=values, args=(t,)) for t in range(VALUE_THREADS) ]
+    for p in producers:
+        p.start()
+
+    queued = {}
+    for n in range(BROADCASTS):
+        name = 'b{n:d}'.format(n=n)
+        queued[name] = time.time()
+        sender.sendCommand( { 'name': name } )
+        time.sleep(BROADCAST_INTERVAL)
+
+    receiver.join()
+    done.set()
+    for p in producers:
+        p.join()
+    sender.stop()
+    # a sender blocked by the backlog fails now
+    b.close()
+    sender.join()
+    a.close()
+
+    latencies = sorted( [ receiver.arrived[name] - queued[name] for name in receiver.arrived ] )
+    if not latencies:
+        return 0, 0, 0, 0, receiver.values
+    return len(latencies), sum(latencies) / len(latencies), latencies[ len(latencies) * 95 // 100 - 1 ], latencies[-1], receiver.values
+
+def run():
+    # scratchClient sets its logger in __main__ only
+    scratchClient.logger = logging.getLogger(scratchClient.__name__)
+    logging.getLogger(protocol.__name__).setLevel(logging.ERROR)
+
+    print("{m:>26s} {n:>10s} {a:>10s} {p:>10s} {x:>10s} {v:>8s}".format(m='', n='received', a='mean [ms]', p='p95 [ms]', x='max [ms]', v='records'))
+    for name, priority, readDelay in ( ('fifo',                     False, 0),
+                                       ('priority',                 True,  0),
+                                       ('slow scratch, fifo',       False, 0.05),
+                                       ('slow scratch, priority',   True,  0.05) ):
+        n, mean, p95, maximum, values = measure(priority, readDelay)
+        print("{m:>26s} {n:10d} {a:10.2f} {p:10.2f} {x:10.2f} {v:8d}".format(m=name, n=n, a=mean * 1000.0, p=p95 * 1000.0, x=maximum * 1000.0, v=values))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# microbenchmark: cost of publishSubscribe.Pub.publish compared to the
+# former list scan over [topic, receiver]-pairs.
+#
+# usage, from src-directory:
+#   python -m benchmark.pubsub
+#
+
+import logging
+import timeit
+
+import publishSubscribe
+
+class ListPub:
+    """the former implementation, a linear scan on each publish"""
+    
+    def __init__(self):
+        self.topics = []
+        
+    def subscribe(self, topic, receiver):
+        for t in self.topics:
+            if t[0] == topic and t[1] == receiver:
+                return
+        self.topics.append( [topic, receiver] )
+        
+    def publish(self, topic, message):
+        found = False
+        for t in self.topics:
+            if t[0] == topic:
+                receiver = t[1]
+                receiver(message)
+                found = True
+        return found
+
+def receiver(message):
+    pass
+
+def run(sizes=(10, 100, 1000), number=20000):
+    # 'Topic not found' is not part of the measurement
+    logging.getLogger("Pub").setLevel(logging.CRITICAL)
+    
+    print("{n:>6s} {l:>14s} {d:>14s} {f:>8s}".format(n='topics', l='list [us]', d='dict [us]', f='factor'))
+    for n in sizes:
+        listPub = ListPub()
+        publishSubscribe.Pub.registry = {}
+        publishSubscribe.Pub.wildcards = ()
+        
+        topics = [ "scratch.input.value.v{i:d}".format(i=i) for i in range(n) ]
+        for topic in topics:
+            listPub.subscribe(topic, receiver)
+            publishSubscribe.Pub.subscribe(topic, receiver)
+        #
+        # publish to a topic in the middle of the list
+        #
+        topic = topics[n // 2]
+        message = { 'name': 'v', 'value': '0' }
+        
+        tList = min( timeit.repeat(lambda: listPub.publish(topic, message), number=number, repeat=3) )
+        tDict = min( timeit.repeat(lambda: publishSubscribe.Pub.publish(topic, message), number=number, repeat=3) )
+        
+        print("{n:6d} {l:14.3f} {d:14.3f} {f:8.1f}".format(n=n, 
+                                                          l=tList / number * 1e6, 
+                                                          d=tDict / number * 1e6, 
+                                                          f=tList / tDict))
+
+if __name__ == '__main__':
+    run()
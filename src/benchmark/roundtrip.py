@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# benchmark: round trip latency and throughput of the remote sensor protocol.
+#
+# A stand-in scratch server is started, and scratchClient is run against it 
+# with config/config_pingpong.xml (adapter.test.TestPingPongAdapter answers 
+# broadcast 'ping' with 'pong', variable 'a' with sensor 'b' = a+1).
+# For each rate, broadcasts and sensor-updates are sent for some seconds.
+# Latency is measured from sending to receiving the answer; a rate is 
+# sustained when all answers arrived and p99 is below the limit.
+# Results are printed and written as json.
+#
+# usage, from src-directory:
+#   python -m benchmark.roundtrip 
+#   python -m benchmark.roundtrip -rates 100,1000,5000 -duration 3 -o roundtrip.json -- -sendWindow 0 -asyncio
+#
+# Arguments after '--' are passed to scratchClient.
+# With -external, no scratchClient is started; connect one to the printed port.
+#
+
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import protocol
+
+class StandInScratch(threading.Thread):
+    """plays the scratch side: accepts one connection, records the arrival
+       time of each 'pong' and each value of sensor 'b'"""
+    
+    def __init__(self, port=0):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('127.0.0.1', port))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        
+        self.connection = None
+        self.connected = threading.Event()
+        self._lock = threading.Lock()
+        self.pongs = []
+        self.values = {}
+        
+    def run(self):
+        self.connection, _ = self.server.accept()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connected.set()
+        
+        reader = protocol.RecordReader()
+        while reader.recv(self.connection):
+            t = time.time()
+            for record in reader.records():
+                record = protocol.decode(record)
+                if record.startswith('broadcast'):
+                    if protocol.BroadcastParser(record[len('broadcast'):]).parse() == 'pong':
+                        with self._lock:
+                            self.pongs.append(t)
+                elif record.startswith('sensor-update'):
+                    for name, value in protocol.NameValueParser(record[len('sensor-update'):]).parse():
+                        if name == 'b':
+                            self.values[int(value)] = t
+                            
+    def send(self, record):
+        self.connection.sendall( protocol.encode(record) )
+        
+    def pongCount(self):
+        with self._lock:
+            return len(self.pongs)
+
+def percentile(values, p):
+    if len(values) == 0:
+        return None
+    values = sorted(values)
+    return values[ min(len(values) - 1, int(len(values) * p / 100.0)) ]
+
+def measureRate(scratch, rate, duration, settle, firstValue):
+    """send ping and a-updates alternating at rate messages/sec"""
+    count = int(rate * duration)
+    pongsBefore = scratch.pongCount()
+    pingTimes = []
+    valueTimes = {}
+    
+    start = time.time()
+    for i in range(count):
+        due = start + float(i) / rate
+        now = time.time()
+        if due > now:
+            time.sleep(due - now)
+        if i % 2 == 0:
+            pingTimes.append(time.time())
+            scratch.send('broadcast "ping"')
+        else:
+            value = firstValue + i
+            valueTimes[value] = time.time()
+            scratch.send('sensor-update "a" {v:d}'.format(v=value))
+    sendTime = time.time() - start
+    
+    # wait for the last answers
+    deadline = time.time() + settle
+    while time.time() < deadline:
+        if scratch.pongCount() - pongsBefore >= len(pingTimes) and all( (v + 1) in scratch.values for v in valueTimes ):
+            break
+        time.sleep(0.01)
+    
+    latencies = []
+    with scratch._lock:
+        pongs = scratch.pongs[pongsBefore:pongsBefore + len(pingTimes)]
+    # pongs carry no id, assign in order
+    for sent, received in zip(pingTimes, pongs):
+        latencies.append(received - sent)
+    received = len(pongs)
+    for value, sent in valueTimes.items():
+        if (value + 1) in scratch.values:
+            latencies.append(scratch.values[value + 1] - sent)
+            received += 1
+    
+    return { 'rate': rate,
+             'sent': count,
+             'received': received,
+             'achieved_rate': count / sendTime if sendTime > 0 else None,
+             'p50_ms': percentile(latencies, 50) * 1000.0 if latencies else None,
+             'p99_ms': percentile(latencies, 99) * 1000.0 if latencies else None,
+             'max_ms': max(latencies) * 1000.0 if latencies else None,
+            }, firstValue + count + 1
+
+def startScratchClient(port, clientArgs):
+    src = os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) )
+    config = os.path.join( src, '..', 'config', 'config_pingpong.xml' )
+    args = [ sys.executable, os.path.join(src, 'scratchClient.py'), 
+             '-nogui', '-singletonNONE', 
+             '-host', '127.0.0.1', '-port', str(port), 
+             '-C', config ] + clientArgs
+    devnull = open(os.devnull, 'w')
+    return subprocess.Popen(args, cwd=src, stdout=devnull, stderr=subprocess.STDOUT)
+
+def run():
+    argv = sys.argv[1:]
+    clientArgs = []
+    if '--' in argv:
+        clientArgs = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+        
+    parser = argparse.ArgumentParser(prog='python -m benchmark.roundtrip', description='remote sensor protocol round trip benchmark')
+    parser.add_argument('-rates', default='50,100,200,500,1000,2000,5000', help='messages per second, comma separated')
+    parser.add_argument('-duration', type=float, default=2.0, help='seconds per rate')
+    parser.add_argument('-settle', type=float, default=2.0, help='seconds to wait for late answers')
+    parser.add_argument('-limit', type=float, default=100.0, help='p99 limit [ms] for a sustained rate')
+    parser.add_argument('-port', type=int, default=0, help='port of the stand-in scratch, default any free port')
+    parser.add_argument('-external', action='store_true', help='do not start scratchClient')
+    parser.add_argument('-o', dest='output', default=None, help='json result file')
+    options = parser.parse_args(argv)
+    
+    # unquoted value at end of record is logged as warning
+    logging.getLogger(protocol.__name__).setLevel(logging.ERROR)
+    
+    scratch = StandInScratch(options.port)
+    scratch.start()
+    
+    client = None
+    if options.external:
+        print("stand-in scratch waiting on port", scratch.port)
+    else:
+        client = startScratchClient(scratch.port, clientArgs)
+    try:
+        if not scratch.connected.wait(30):
+            print("scratchClient did not connect")
+            return 1
+        # adapters are activated after connect
+        time.sleep(1.0)
+        
+        results = []
+        value = 0
+        print("{r:>8s} {a:>10s} {s:>8s} {c:>8s} {p50:>9s} {p99:>9s} {m:>9s}".format(r='rate', a='achieved', s='sent', c='received', p50='p50 [ms]', p99='p99 [ms]', m='max [ms]'))
+        for rate in [ float(r) for r in options.rates.split(',') ]:
+            result, value = measureRate(scratch, rate, options.duration, options.settle, value)
+            result['sustained'] = result['received'] == result['sent'] and result['p99_ms'] != None and result['p99_ms'] <= options.limit
+            results.append(result)
+            print("{r:8.0f} {a:10.1f} {s:8d} {c:8d} {p50:9.2f} {p99:9.2f} {m:9.2f} {x:s}".format(
+                r=rate, a=result['achieved_rate'], s=result['sent'], c=result['received'], 
+                p50=result['p50_ms'] or 0, p99=result['p99_ms'] or 0, m=result['max_ms'] or 0,
+                x='' if result['sustained'] else 'not sustained'))
+        
+        sustained = [ r['achieved_rate'] for r in results if r['sustained'] ]
+        summary = { 'benchmark': 'roundtrip',
+                    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'scratchClient_args': clientArgs,
+                    'p99_limit_ms': options.limit,
+                    'max_sustained_rate': max(sustained) if sustained else None,
+                    'results': results }
+        print("max sustained messages/sec:", summary['max_sustained_rate'])
+        if options.output != None:
+            with open(options.output, 'w') as f:
+                json.dump(summary, f, indent=2)
+        return 0
+    finally:
+        if client != None:
+            client.terminate()
+            for _ in range(50):
+                if client.poll() != None:
+                    break
+                time.sleep(0.1)
+            else:
+                client.kill()
+
+if __name__ == '__main__':
+    sys.exit( run() )
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# benchmark: throughput of protocol.RecordReader compared to the former 
+# framing in ScratchListener.run (data += chunk, data = data[4+recordLen:])
+# for a stream of 1kB and 64kB records.
+# Both readers get the same stream through a local socket, including some
+# junk bytes, and must return the same records.
+#
+# usage, from src-directory:
+#   python -m benchmark.rsp_framing
+#
+
+from __future__ import print_function
+
+import logging
+import socket
+import threading
+import time
+
+import protocol
+
+def legacyRecords(sock, bufferSize=240):
+    """the former framing loop of ScratchListener.run"""
+    records = []
+    data = b''
+    while True:
+        chunk = sock.recv(bufferSize)
+        if len(chunk) == 0:
+            return records
+        data += chunk
+        while len(data) >= 4:
+            if bytearray(data[0:2]) != bytearray(2):
+                while len(data) > 2:
+                    if bytearray(data[0:2]) == bytearray(2):
+                        break
+                    else:
+                        data = data[1:]
+                if not (len(data) >= 4 ):
+                    break
+            d = bytearray(data[0:4])
+            recordLen = (d[0] << 24) + (d[1] << 16) + (d[2] << 8) + d[3]
+            if len(data) < 4+recordLen:
+                break
+            records.append( data[4: 4+recordLen].decode('utf-8') )
+            data = data[4+recordLen:]
+
+def readerRecords(sock, bufferSize=protocol.BUFFER_SIZE):
+    records = []
+    reader = protocol.RecordReader(bufferSize)
+    while reader.recv(sock):
+        for record in reader.records():
+            records.append( protocol.decode(record) )
+    return records
+    
+def stream(recordSize, count):
+    record = 'sensor-update "v" "' + 'x' * (recordSize - 23) + '"'
+    data = protocol.encode(record) * count
+    # resync after junk, as scratch 1.4 sends on utf-8 length errors
+    return b'junk' + data + b'\x01\x02' + data, 2 * count
+
+def measure(f, data, bufferSize):
+    """data is sent by a thread through a local socket pair"""
+    a, b = socket.socketpair()
+    def send():
+        a.sendall(data)
+        a.shutdown(socket.SHUT_WR)
+    sender = threading.Thread(target=send)
+    
+    t = time.time()
+    sender.start()
+    records = f(b, bufferSize)
+    t = time.time() - t
+    
+    sender.join()
+    a.close()
+    b.close()
+    return t, records
+
+def run():
+    # resync is logged as error
+    logging.getLogger(protocol.__name__).setLevel(logging.CRITICAL)
+    
+    print("{r:>8s} {b:>7s} {l:>13s} {n:>13s} {f:>8s}".format(r='record', b='buffer', l='legacy [MB/s]', n='reader [MB/s]', f='factor'))
+    for recordSize, count in ((1024, 5000), (65536, 100)):
+        data, n = stream(recordSize, count)
+        for bufferSize in (240, 4096, 65536):
+            tLegacy, legacy = min( measure(legacyRecords, data, bufferSize) for _ in range(3) )
+            tReader, reader = min( measure(readerRecords, data, bufferSize) for _ in range(3) )
+            if legacy != reader or len(reader) != n:
+                raise AssertionError("records differ")
+            
+            mb = len(data) / 1e6
+            print("{r:8d} {b:7d} {l:13.1f} {n:13.1f} {f:8.1f}".format(r=recordSize, b=bufferSize, 
+                                                                       l=mb / tLegacy, n=mb / tReader, 
+                                                                       f=tLegacy / tReader))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# benchmark: protocol.NameValueParser compared to the former per-character
+# state machine (benchmark.legacy_protocol) on sensor-update records with
+# 50..500 name-value-pairs.
+# Before timing, both parsers are checked for identical results on random
+# input built from the protocol's special chars. Run the check after each
+# change of the parsers in protocol.py; the exit code is 1 when they differ.
+#
+# usage, from src-directory:
+#   python -m benchmark.rsp_parser
+#   python -m benchmark.rsp_parser -check     equivalence check only
+#
+
+import logging
+import random
+import sys
+import timeit
+
+import protocol
+import benchmark.legacy_protocol as legacy_protocol
+
+def record(n):
+    """a sensor-update as scratch 1.4 sends it, global variables mixed with
+       numeric values, strings and quotes in names and values"""
+    pairs = []
+    for i in range(n):
+        if i % 4 == 0:
+            pairs.append( '"var{i:d}" "text value {i:d}"'.format(i=i) )
+        elif i % 4 == 1:
+            pairs.append( '"sensor ""{i:d}""" "say ""hello"""'.format(i=i) )
+        elif i % 4 == 2:
+            pairs.append( '"x{i:d}" -{i:d}.25'.format(i=i) )
+        else:
+            pairs.append( '"count{i:d}" {i:d}'.format(i=i) )
+    return ' '.join(pairs)
+
+def fuzz(count=200000, seed=4711):
+    """random strings over the chars the parsers distinguish; returns the 
+       differences found"""
+    rnd = random.Random(seed)
+    alphabet = '"" "a1'
+    differences = []
+    for _ in range(count):
+        s = ''.join( rnd.choice(alphabet) for _ in range(rnd.randint(0, 14)) )
+        if legacy_protocol.NameValueParser(s).parse() != protocol.NameValueParser(s).parse():
+            differences.append("NameValueParser differs for '{s:s}'".format(s=s))
+        if legacy_protocol.BroadcastParser(s).parse() != protocol.BroadcastParser(s).parse():
+            differences.append("BroadcastParser differs for '{s:s}'".format(s=s))
+    for n in (1, 50, 500):
+        s = record(n)
+        if legacy_protocol.NameValueParser(s).parse() != protocol.NameValueParser(s).parse():
+            differences.append("NameValueParser differs for record({n:d})".format(n=n))
+    return differences
+
+def check(count=200000):
+    """equivalence of the parsers, exits with code 1 when they differ"""
+    # error and warning logs are expected for the random input
+    logging.getLogger(protocol.__name__).setLevel(logging.CRITICAL)
+    logging.getLogger(legacy_protocol.__name__).setLevel(logging.CRITICAL)
+    
+    differences = fuzz(count)
+    if len(differences) > 0:
+        for d in differences[:20]:
+            print(d)
+        print("equivalence: {d:d} differences in {c:d} random inputs".format(d=len(differences), c=count))
+        sys.exit(1)
+    print("equivalence: {c:d} random inputs ok".format(c=count))
+
+def run(sizes=(50, 100, 200, 500), number=200):
+    check()
+    
+    print("{n:>6s} {l:>14s} {r:>14s} {f:>8s}".format(n='pairs', l='legacy [us]', r='regex [us]', f='factor'))
+    for n in sizes:
+        s = record(n)
+        tLegacy = min( timeit.repeat(lambda: legacy_protocol.NameValueParser(s).parse(), number=number, repeat=3) )
+        tRegex = min( timeit.repeat(lambda: protocol.NameValueParser(s).parse(), number=number, repeat=3) )
+        
+        print("{n:6d} {l:14.1f} {r:14.1f} {f:8.1f}".format(n=n, 
+                                                          l=tLegacy / number * 1e6, 
+                                                          r=tRegex / number * 1e6, 
+                                                          f=tLegacy / tRegex))
+
+if __name__ == '__main__':
+    if '-check' in sys.argv[1:]:
+        check()
+    else:
+        run()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: 50 GpioEventInput adapters polling every 20ms, each in an own
+# thread compared to the scheduler (-scheduler 1, -scheduler 2).
+# Reports threads, resident memory, cpu time and the poll period statistics.
+#
+# usage, from src-directory:
+#   python -m benchmark.scheduler [adapters] [seconds]
+#
+# Memory is process wide, so each mode runs in a fresh interpreter.
+#
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import configuration
+import publishSubscribe
+import adapter.adapters
+import adapter.gpio
+import scheduler
+
+INTERVAL = 0.02
+
+xmlAdapter = """
+    <adapter class='adapter.gpio.GpioEventInput' name='button_{n:d}'>
+        <output name='button_pressed'>
+            <broadcast name='pressed_{n:d}'/>
+        </output>
+        <output name='button_released'>
+            <broadcast name='released_{n:d}'/>
+        </output>
+        <parameter name='poll.interval' value='{i:f}' />
+        <parameter name='value.inverse' value='false' />
+    </adapter>
+"""
+
+class InputLevels:
+    """gpio manager for the benchmark, one per adapter, input toggles every 10th read"""
+
+    def __init__(self):
+        self.reads = 0
+
+    def get(self, gpio):
+        self.reads += 1
+        return (self.reads // 10) % 2
+
+def memory(key = 'VmRSS'):
+    """resident (VmRSS) or virtual (VmSize) memory in kB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(key + ':'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def measure(n, duration, threads):
+    levels = []
+    received = []
+    _scheduler = None
+    if threads > 0:
+        _scheduler = scheduler.Scheduler(threads = threads)
+        _scheduler.setActive(True)
+
+    adapters = []
+    for i in range(n):
+        _adapter = adapter.gpio.GpioEventInput()
+        configManager = configuration.ConfigManager_1_0(None)
+        configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xmlAdapter.format(n=i, i=INTERVAL)))
+        _adapter.gpios = [None]
+        levels.append( InputLevels() )
+        _adapter.setGpioManager(levels[-1])
+        if _scheduler != None:
+            _adapter.setScheduler(_scheduler)
+        publishSubscribe.Pub.subscribe("scratch.output.command.pressed_{n:d}".format(n=i), received.append)
+        publishSubscribe.Pub.subscribe("scratch.output.command.released_{n:d}".format(n=i), received.append)
+        adapters.append(_adapter)
+
+    rss0 = memory()
+    vm0 = memory('VmSize')
+    cpu0 = time.process_time()
+    for _adapter in adapters:
+        _adapter.start()
+    time.sleep(duration)
+    cpu = time.process_time() - cpu0
+    rss1 = memory()
+    vm1 = memory('VmSize')
+    threadCount = threading.active_count()
+    reads = sum( [ l.reads for l in levels ] )
+    for _adapter in adapters:
+        _adapter.stop()
+    if _scheduler != None:
+        _scheduler.setActive(False)
+
+    loops = sum( [ a.pollStatistics.loops for a in adapters ] )
+    periodSum = sum( [ a.pollStatistics.periodSum for a in adapters ] )
+    return { 'threads': threadCount,
+             'rss_kb': rss1,
+             'rss_adapters_kb': rss1 - rss0,
+             'vm_adapters_kb': vm1 - vm0,
+             'cpu_percent': cpu / duration * 100.0,
+             'polls_per_sec': reads / duration,
+             'period_mean_ms': periodSum / loops * 1000.0,
+             'period_max_ms': max( [ a.pollStatistics.periodMax for a in adapters ] ) * 1000.0,
+             'overruns': sum( [ a.pollStatistics.overruns for a in adapters ] ),
+             'broadcasts': len(received) }
+
+def run(n = 50, duration = 10.0):
+    columns = ['threads', 'rss_kb', 'rss_adapters_kb', 'vm_adapters_kb', 'cpu_percent', 'polls_per_sec',
+               'period_mean_ms', 'period_max_ms', 'overruns', 'broadcasts']
+    print("{n:d} adapters, poll.interval {i:g}s, {d:g}s".format(n=n, i=INTERVAL, d=duration))
+    print("{m:>12s}".format(m='mode') + ''.join( [ "{c:>16s}".format(c=c) for c in columns ] ))
+    for mode, threads in [ ('thread', 0), ('scheduler-1', 1), ('scheduler-2', 2) ]:
+        output = subprocess.check_output( [ sys.executable, '-m', 'benchmark.scheduler', '-measure',
+                                            str(n), str(duration), str(threads) ],
+                                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))) )
+        result = json.loads( output.decode('utf-8').strip().splitlines()[-1] )
+        print("{m:>12s}".format(m=mode) + ''.join( [ "{v:16.1f}".format(v=float(result[c])) for c in columns ] ))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '-measure':
+        print( json.dumps( measure( int(sys.argv[2]), float(sys.argv[3]), int(sys.argv[4]) ) ) )
+    else:
+        args = [ float(x) for x in sys.argv[1:3] ]
+        if args:
+            args[0] = int(args[0])
+        run(*args)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# benchmark: several adapter threads stream values to scratch. Compares 
+# one record per value (former ScratchSender.send_scratch per update) with 
+# the queued ScratchSender merging updates per send window.
+# A slow scratch reads with delays through small socket buffers; then the 
+# queue can coalesce values per variable.
+# Reported are the records and values scratch receives, the time the adapter
+# threads need for their loops and the lag till scratch has the last values.
+#
+# usage, from src-directory:
+#   python -m benchmark.sender
+#
+
+from __future__ import print_function
+
+import logging
+import socket
+import threading
+import time
+
+import protocol
+import scratchClient
+
+class Receiver(threading.Thread):
+    """counts records and pairs on the scratch side of the socket till the
+       last value of each variable arrived. A slow scratch waits after 
+       each read."""
+    
+    def __init__(self, sock, names, last, readDelay):
+        threading.Thread.__init__(self)
+        self.sock = sock
+        self.waiting = set(names)
+        self.last = last
+        self.readDelay = readDelay
+        self.records = 0
+        self.pairs = 0
+        self.done = None
+        
+    def run(self):
+        reader = protocol.RecordReader(1024)
+        while self.waiting and reader.recv(self.sock):
+            for record in reader.records():
+                self.records += 1
+                for name, value in protocol.NameValueParser( protocol.decode(record)[len('sensor-update'):] ).parse():
+                    self.pairs += 1
+                    if value == self.last:
+                        self.waiting.discard(name)
+            if self.readDelay:
+                time.sleep(self.readDelay)
+        self.done = time.time()
+
+def stream(sender, direct, names, count):
+    def produce(name):
+        for i in range(count):
+            message = { 'name': name, 'value': str(i) }
+            if direct:
+                sender.send_scratch('sensor-update "' + message['name'] + '" ' + message['value'])
+            else:
+                sender.sendValue(message)
+            # an adapter polls its hardware
+            time.sleep(0.0005)
+    producers = [ threading.Thread(target=produce, args=(name,)) for name in names ]
+    for p in producers:
+        p.start()
+    for p in producers:
+        p.join()
+
+def measure(direct, sendWindow, coalesce, readDelay, threads=8, count=500):
+    a, b = socket.socketpair()
+    if readDelay:
+        # small socket buffers, so a slow scratch blocks the sender
+        a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        b.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    names = [ 'v{t:d}'.format(t=t) for t in range(threads) ]
+    receiver = Receiver(b, names, str(count-1), readDelay)
+    receiver.start()
+    
+    sender = scratchClient.ScratchSender(sendWindow = sendWindow, coalesce = coalesce)
+    sender.setSocket(a)
+    sender.start()
+    
+    t = time.time()
+    stream(sender, direct, names, count)
+    produced = time.time()
+    receiver.join()
+    
+    sender.stop()
+    sender.join()
+    a.close()
+    b.close()
+    return produced - t, receiver.done - produced, receiver.records, receiver.pairs, sender.coalesced
+
+def run():
+    # scratchClient sets its logger in __main__ only
+    scratchClient.logger = logging.getLogger(scratchClient.__name__)
+    # unquoted value at end of record is logged as warning
+    logging.getLogger(protocol.__name__).setLevel(logging.ERROR)
+    
+    print("{m:>28s} {r:>8s} {p:>8s} {c:>9s} {t:>12s} {l:>8s}".format(m='mode', r='records', p='values', c='coalesced', t='adapters [s]', l='lag [s]'))
+    for name, direct, sendWindow, coalesce, readDelay in (
+                                     ('record per value', True, 0, False, 0), 
+                                     ('queue, window 0ms', False, 0, False, 0), 
+                                     ('queue, window 5ms', False, 0.005, False, 0),
+                                     ('slow scratch, record/value', True, 0, False, 0.02),
+                                     ('slow scratch, queue', False, 0.005, False, 0.02),
+                                     ('slow scratch, coalesce', False, 0.005, True, 0.02),
+                                     ):
+        t, lag, records, pairs, coalesced = measure(direct, sendWindow, coalesce, readDelay)
+        print("{m:>28s} {r:8d} {p:8d} {c:9d} {t:12.3f} {l:8.3f}".format(m=name, r=records, p=pairs, c=coalesced, t=t, l=lag))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+
+#
+# benchmark: adapters sharing spi bus 0 on spi.TEST_spidev. 8 adapters 
+# ADC_MCP3008_10_Input on device 0, poll.interval 0.01, and a WS2801_Adapter
+# on device 1 getting a 25 led update each 10 msec. Compared are each adapter
+# with an own spidev (no SPIManager) and the devices shared through the
+# SPIManager bus arbiter.
+#
+# Reported are the transfers, the transfers overlapping on the bus, the mode
+# and speed writes (an ioctl each on the pi) and the SPIManager metrics per
+# device.
+#
+# usage, from src-directory:
+#   python -m benchmark.spi_bus
+#
+
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import configuration
+import adapter.adapters
+import adapter.adc
+import adapter.spiAdapter
+import spi.manager
+import spi.TEST_spidev
+
+ADCS = 8
+RUN_TIME = 2.0
+LEDS = 25
+
+xmlADC = """
+    <adapter class='adapter.adc.ADC_MCP3008_10_Input' name='adc_{n:d}'>
+        <output_value name='adc'>
+            <sensor name='adc_{n:d}'/>
+        </output_value>
+    </adapter>
+"""
+
+xmlLED = """
+    <adapter class='adapter.spiAdapter.WS2801_Adapter' name='leds'>
+        <input_value name='led'>
+            <variable name='leds'/>
+        </input_value>
+    </adapter>
+"""
+
+class CountingSpiDev(spi.TEST_spidev.SpiDev):
+    """all spidev objects, for the counts"""
+    created = []
+    
+    def __init__(self):
+        spi.TEST_spidev.SpiDev.__init__(self)
+        CountingSpiDev.created.append(self)
+
+class spidev:
+    SpiDev = CountingSpiDev
+
+def mcp3008(data):
+    channel = (data[1] >> 4) - 8
+    value = 512 + channel * 50
+    return [0, value >> 8, value & 0xff]
+
+def configure(_adapter, xml, parameters):
+    configManager = configuration.ConfigManager_1_0(None)
+    configManager.adapterConfig(_adapter, "benchmark", ET.fromstring(xml))
+    _adapter.parameters.update(parameters)
+    return _adapter
+
+def measure(shared):
+    spi.TEST_spidev.reset()
+    spi.TEST_spidev.transferTime = 0.0001
+    spi.TEST_spidev.setResponder(0, 0, mcp3008)
+    CountingSpiDev.created = []
+    
+    spiManager = None
+    if shared:
+        spiManager = spi.manager.SPIManager(spidevModule = spidev)
+        
+    adapters = []
+    for n in range(ADCS):
+        adapters.append( configure(adapter.adc.ADC_MCP3008_10_Input(), xmlADC.format(n=n),
+                                   { 'poll.interval': '0.01', 'poll.band': '2', 'spi.bus': '0', 'spi.device': '0', 'adc.channel': str(n) } ) )
+    leds = configure(adapter.spiAdapter.WS2801_Adapter(), xmlLED, { 'led.length': str(LEDS), 'spi.bus': '0', 'spi.device': '1' } )
+    adapters.append(leds)
+    for _adapter in adapters:
+        if spiManager != None:
+            _adapter.setSPIManager(spiManager)
+        _adapter.setActive(True)
+        
+    value = ' '.join( [ 'red' ] * LEDS )
+    t = time.time() + RUN_TIME
+    while time.time() < t:
+        leds.led(value)
+        time.sleep(0.01)
+        
+    samples = []
+    if spiManager != None:
+        samples = list(spiManager.getMetrics())
+    for _adapter in adapters:
+        _adapter.setActive(False)
+        
+    transfers = sum( [ s.transfers for s in CountingSpiDev.created ] )
+    settings = sum( [ s.settings for s in CountingSpiDev.created ] )
+    return len(CountingSpiDev.created), transfers, spi.TEST_spidev.overlaps, settings, samples
+
+def run():
+    # 'Topic not found' of the adc values is not part of the measurement
+    logging.getLogger("Pub").setLevel(logging.CRITICAL)
+    # adapters without SPIManager use spidev directly
+    adapter.adapters.spidev = spidev
+    print("{a:d} x ADC_MCP3008_10_Input, WS2801_Adapter {l:d} leds, {r:g} sec".format(a=ADCS, l=LEDS, r=RUN_TIME))
+    print("{c:>22s} {d:>8s} {t:>10s} {o:>10s} {s:>10s}".format(c='', d='spidev', t='transfers', o='overlaps', s='settings'))
+    for name, shared in ( ('own spidev', False),
+                          ('SPIManager arbiter', True) ):
+        devices, transfers, overlaps, settings, samples = measure(shared)
+        print("{c:>22s} {d:8d} {t:10d} {o:10d} {s:10d}".format(c=name, d=devices, t=transfers, o=overlaps, s=settings))
+        for metric, labels, value in samples:
+            print("{c:>22s}   {m:s}{{{l:s}}} {v:g}".format(c='', m=metric, l=','.join( [ '{k:s}="{v:s}"'.format(k=k, v=v) for k, v in labels ] ), v=value))
+
+if __name__ == '__main__':
+    run()
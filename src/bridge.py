@@ -3,10 +3,19 @@
 # library. If you want to make a suggestion or fix something you can contact-me
 # at voorloop_at_gmail.com
 # Distributed over IDC(I Don't Care) license
+#
+# Records are forwarded unchanged, and are printed as text when a record is 
+# complete.
+# For a log with timestamps and a replay of the session, see rspCapture.py
+#
+from __future__ import print_function
+
 import socket
 import select
 import time
 import sys
+
+import protocol
  
 # Changing the buffer_size and delay, you can improve the speed and bandwidth.
 # But when buffer get to high or delay go too down, you can broke things
@@ -22,13 +31,15 @@ class Forward:
         try:
             self.forward.connect((host, port))
             return self.forward
-        except Exception, e:
-            print e
+        except Exception as e:
+            print(e)
             return False
  
 class TheServer:
     input_list = []
     channel = {}
+    # socket --> protocol.RecordReader
+    reader = {}
  
     def __init__(self, host, port):
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -58,18 +69,20 @@ class TheServer:
         forward = Forward().start(forward_to[0], forward_to[1])
         clientsock, clientaddr = self.server.accept()
         if forward:
-            print clientaddr, "has connected"
+            print(clientaddr, "has connected")
             self.input_list.append(clientsock)
             self.input_list.append(forward)
             self.channel[clientsock] = forward
             self.channel[forward] = clientsock
+            self.reader[clientsock] = protocol.RecordReader(buffer_size)
+            self.reader[forward] = protocol.RecordReader(buffer_size)
         else:
-            print "Can't establish connection with remote server.",
-            print "Closing connection with client side", clientaddr
+            print("Can't establish connection with remote server.", end=' ')
+            print("Closing connection with client side", clientaddr)
             clientsock.close()
  
     def on_close(self):
-        print self.s.getpeername(), "has disconnected"
+        print(self.s.getpeername(), "has disconnected")
         #remove objects from input_list
         self.input_list.remove(self.s)
         self.input_list.remove(self.channel[self.s])
@@ -81,17 +94,25 @@ class TheServer:
         # delete both objects from channel dict
         del self.channel[out]
         del self.channel[self.s]
+        del self.reader[out]
+        del self.reader[self.s]
  
     def on_recv(self):
         data = self.data
         # here we can parse and/or modify the data before send forward
-        print data
-        self.channel[self.s].send(data)
+        reader = self.reader[self.s]
+        reader.feed(data)
+        for record in reader.records():
+            try:
+                print(protocol.decode(record))
+            except UnicodeDecodeError:
+                print(record.tobytes())
+        self.channel[self.s].sendall(data)
  
 if __name__ == '__main__':
         server = TheServer('', 42000)
         try:
             server.main_loop()
         except KeyboardInterrupt:
-            print "Ctrl C - Stopping server"
+            print("Ctrl C - Stopping server")
             sys.exit(1)
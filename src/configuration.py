@@ -24,6 +24,7 @@ import sys
 
 import errorManager
 import publishSubscribe
+import tracing
 
 import logging
 logger = logging.getLogger(__name__)
@@ -99,6 +100,12 @@ class InputSetting:
 class OutputSetting:
     name = None
     scratchNames = None
+    # optional value filter of output_value, seconds resp. value difference
+    minInterval = None
+    deadband = None
+    dedupe = False
+    # optional 'high' or 'normal', default is high for broadcasts, normal for values
+    priority = None
     
     def __init__(self, name):
         self.name = name
@@ -168,9 +175,19 @@ class GPIOManager:
         self.delegateGPIOManager.setGPIOActive(gpioConfiguration, state)
         
     def low(self, gpio):
+        if tracing.enabled:
+            t0 = tracing.clock()
+            self.delegateGPIOManager.low(gpio)
+            tracing.complete('GPIOManager.low', 'manager', t0, { 'port': gpio.port })
+            return
         self.delegateGPIOManager.low(gpio)    
 
     def high(self, gpio):
+        if tracing.enabled:
+            t0 = tracing.clock()
+            self.delegateGPIOManager.high(gpio)
+            tracing.complete('GPIOManager.high', 'manager', t0, { 'port': gpio.port })
+            return
         self.delegateGPIOManager.high(gpio)
     
     def direction_in(self, gpio):
@@ -180,12 +197,29 @@ class GPIOManager:
         self.delegateGPIOManager.direction_out(gpio)
     
     def get(self, gpio):
+        if tracing.enabled:
+            t0 = tracing.clock()
+            value = self.delegateGPIOManager.get(gpio)
+            tracing.complete('GPIOManager.get', 'manager', t0, { 'port': gpio.port, 'value': value })
+            return value
         return self.delegateGPIOManager.get(gpio)
 
+    def addEdgeCallback(self, gpio, callback, bouncetime=0, initial=False):
+        """callback(level) on debounced level changes of an input, see gpio/edge.py"""
+        self.delegateGPIOManager.addEdgeCallback(gpio, callback, bouncetime, initial)
+        
+    def removeEdgeCallback(self, gpio):
+        self.delegateGPIOManager.removeEdgeCallback(gpio)
+        
     def startPWM(self, gpio, frequency, value):
         self.delegateGPIOManager.startPWM(gpio, frequency, value)
                 
     def setPWMDutyCycle(self, gpio, value):
+        if tracing.enabled:
+            t0 = tracing.clock()
+            self.delegateGPIOManager.setPWMDutyCycle(gpio, value)
+            tracing.complete('GPIOManager.setPWMDutyCycle', 'manager', t0, { 'port': gpio.port, 'value': value })
+            return
         self.delegateGPIOManager.setPWMDutyCycle(gpio, value)
 
     def resetPWM(self, gpio):
@@ -387,12 +421,18 @@ class ConfigManager_1_0:
     def configureCommandResolver (self, scratchSender):
         for adapter in self.adapters:
             for _outputs in adapter.outputs:
+                sendCommand = scratchSender.sendCommand
+                if _outputs.priority == 'normal':
+                    sendCommand = scratchSender.sendNormalCommand
                 for command in _outputs.scratchNames:
-                    publishSubscribe.Pub.subscribe("scratch.output.command.{name:s}".format(name=command), scratchSender.sendCommand)
+                    publishSubscribe.Pub.subscribe("scratch.output.command.{name:s}".format(name=command), sendCommand)
                     
             for _outputs in adapter.output_values:
+                sendValue = scratchSender.sendValue
+                if _outputs.priority == 'high':
+                    sendValue = scratchSender.sendHighValue
                 for command in _outputs.scratchNames:
-                    publishSubscribe.Pub.subscribe("scratch.output.value.{name:s}".format(name=command), scratchSender.sendValue)
+                    publishSubscribe.Pub.subscribe("scratch.output.value.{name:s}".format(name=command), sendValue)
 
     # def configureGuiServer (self, guiServer):
     #     for adapter in self.adapters:
@@ -541,6 +581,56 @@ class ConfigManager_1_0:
             
         return gpio
 
+    def outputValueFilterConfig(self, loggingContext, tle, setting):
+        """optional attributes of output_value, reducing the value updates:
+           min.interval [sec], max.rate [1/sec], deadband, dedupe (true|false)"""
+        
+        def number(attribute):
+            if not attribute in tle.attrib:
+                return None
+            try:
+                v = float(tle.attrib[attribute])
+            except ValueError:
+                errorManager.append("{lc:s}: output_value '{n:s}', {a:s} is not a number: '{v:s}'".format(lc=loggingContext, n=setting.name, a=attribute, v=tle.attrib[attribute]))
+                return None
+            if v < 0:
+                errorManager.append("{lc:s}: output_value '{n:s}', {a:s} is negative".format(lc=loggingContext, n=setting.name, a=attribute))
+                return None
+            return v
+        
+        minInterval = number('min.interval')
+        maxRate = number('max.rate')
+        if maxRate != None:
+            if maxRate == 0:
+                errorManager.append("{lc:s}: output_value '{n:s}', max.rate is zero".format(lc=loggingContext, n=setting.name))
+            elif minInterval == None or 1.0 / maxRate > minInterval:
+                minInterval = 1.0 / maxRate
+        # 0 is kept, it switches off a default interval of the adapter
+        if minInterval != None:
+            setting.minInterval = minInterval
+            
+        setting.deadband = number('deadband')
+        
+        if 'dedupe' in tle.attrib:
+            dedupe = tle.attrib['dedupe'].lower()
+            if dedupe in ['true', '1']:
+                setting.dedupe = True
+            elif dedupe in ['false', '0']:
+                setting.dedupe = False
+            else:
+                errorManager.append("{lc:s}: output_value '{n:s}', dedupe is true or false: '{v:s}'".format(lc=loggingContext, n=setting.name, v=tle.attrib['dedupe']))
+        
+    def outputPriorityConfig(self, loggingContext, tle, setting):
+        """optional attribute priority (high|normal) of output and output_value, 
+           used with switch -priority"""
+        if not 'priority' in tle.attrib:
+            return
+        priority = tle.attrib['priority'].lower()
+        if priority in ['high', 'normal']:
+            setting.priority = priority
+        else:
+            errorManager.append("{lc:s}: {t:s} '{n:s}', priority is high or normal: '{v:s}'".format(lc=loggingContext, t=tle.tag, n=setting.name, v=tle.attrib['priority']))
+        
     def adapterConfig(self, adapter, loggingContext, child):
         
         if debug:
@@ -652,6 +742,7 @@ class ConfigManager_1_0:
                 
                 if moduleMethods.hasMethod(methodName):
                     out = OutputSetting(methodName)
+                    self.outputPriorityConfig(loggingContext, tle, out)
                     foundBroadcast = False
                     for comm in tle:
                         if comm.tag == 'broadcast':
@@ -699,6 +790,8 @@ class ConfigManager_1_0:
                 if moduleMethods.hasMethod(methodName):
                     value = OutputSetting(methodName)
                     adapter_output_values.append(value)
+                    self.outputValueFilterConfig(loggingContext, tle, value)
+                    self.outputPriorityConfig(loggingContext, tle, value)
                     for comm in tle:
                         if comm.tag == 'sensor':
                             n = comm.attrib['name']
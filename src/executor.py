@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# shared worker pool for blocking adapter actions, switch -executor <threads>
+#
+# Adapters submit slow work (subprocess calls, network requests) with
+# Adapter.submit() instead of running it in the input method, which is called
+# from the listener thread, or keeping an own thread with a queue.
+#
+# Each adapter has a lane with a limit of concurrently running jobs (default
+# 1, so the jobs of an adapter run in submission order) and of pending jobs.
+# A job submitted to a full lane is dropped. Jobs with a key can be
+# - 'drop':  dropped when a job with the same key is pending already,
+# - 'merge': replace the pending job with the same key, at its position.
+# Worker threads are started on demand up to the configured number.
+#
+
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+debug = False
+
+DROP = 'drop'
+MERGE = 'merge'
+
+try:
+    clock = time.monotonic
+except AttributeError:
+    clock = time.time
+
+class Job:
+    def __init__(self, lane, callback, args, key):
+        self.lane = lane
+        self.callback = callback
+        self.args = args
+        self.key = key
+        self.submitted = clock()
+
+class Lane:
+    """jobs of one adapter"""
+
+    def __init__(self, name, concurrency, maxPending):
+        self.name = name
+        self.concurrency = concurrency
+        self.maxPending = maxPending
+        self.pending = collections.deque()
+        self.running = 0
+        # in Executor._ready
+        self.ready = False
+        # counters, reported as metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.merged = 0
+        self.cancelled = 0
+        self.pendingMax = 0
+        self.waitMax = 0.0
+
+    def findPending(self, key):
+        for job in self.pending:
+            if job.key == key:
+                return job
+        return None
+
+    def getMetrics(self):
+        labels = (('adapter', self.name),)
+        yield 'scratchclient_executor_pending', labels, len(self.pending)
+        yield 'scratchclient_executor_pending_max', labels, self.pendingMax
+        yield 'scratchclient_executor_running', labels, self.running
+        yield 'scratchclient_executor_wait_max_seconds', labels, self.waitMax
+        for result, value in ( ('completed', self.completed),
+                               ('failed',    self.failed),
+                               ('dropped',   self.dropped),
+                               ('merged',    self.merged),
+                               ('cancelled', self.cancelled) ):
+            yield 'scratchclient_executor_jobs_total', labels + (('result', result),), value
+
+class Executor:
+    """bounded pool of worker threads. Used like the hardware managers:
+       setActive(True) accepts jobs, setActive(False) stops the workers."""
+
+    def __init__(self, threads = 2):
+        self.threads = threads
+        self._condition = threading.Condition(threading.Lock())
+        # name --> Lane
+        self._lanes = {}
+        # lanes with pending jobs and less than concurrency running
+        self._ready = collections.deque()
+        self._workers = []
+        self._idle = 0
+        self._stopped = True
+
+    def setActive(self, state):
+        if state:
+            self.start()
+        else:
+            self.stop()
+
+    def start(self):
+        with self._condition:
+            self._stopped = False
+
+    def stop(self):
+        """pending jobs are discarded, running jobs are waited for 1 sec"""
+        with self._condition:
+            self._stopped = True
+            for lane in self._lanes.values():
+                lane.cancelled += len(lane.pending)
+                lane.pending.clear()
+                lane.ready = False
+            self._ready.clear()
+            self._condition.notify_all()
+            workers = self._workers
+            self._workers = []
+        for worker in workers:
+            worker.join(1)
+
+    def lane(self, name, concurrency = 1, maxPending = 30):
+        """the lane of an adapter; the limits are updated when given again"""
+        with self._condition:
+            return self._lane(name, concurrency, maxPending)
+
+    def _lane(self, name, concurrency, maxPending):
+        lane = self._lanes.get(name)
+        if lane == None:
+            lane = Lane(name, concurrency, maxPending)
+            self._lanes[name] = lane
+        else:
+            lane.concurrency = concurrency
+            lane.maxPending = maxPending
+        return lane
+
+    def submit(self, name, callback, args = (), key = None, duplicate = None, concurrency = 1, maxPending = 30):
+        """queue callback(*args) in the lane 'name'. Does not block.
+           returns False when the job was dropped"""
+        with self._condition:
+            lane = self._lane(name, concurrency, maxPending)
+            lane.submitted += 1
+            if self._stopped:
+                lane.dropped += 1
+                return False
+
+            if key != None and duplicate != None:
+                job = lane.findPending(key)
+                if job != None:
+                    if duplicate == MERGE:
+                        job.callback = callback
+                        job.args = args
+                        lane.merged += 1
+                        return True
+                    lane.dropped += 1
+                    if debug:
+                        print(name, "duplicate dropped", key)
+                    return False
+
+            if len(lane.pending) >= lane.maxPending:
+                lane.dropped += 1
+                return False
+
+            lane.pending.append( Job(lane, callback, args, key) )
+            if len(lane.pending) > lane.pendingMax:
+                lane.pendingMax = len(lane.pending)
+            self._makeReady(lane)
+        return True
+
+    def cancel(self, name):
+        """discard the pending jobs of a lane, running jobs continue"""
+        with self._condition:
+            lane = self._lanes.get(name)
+            if lane == None:
+                return
+            lane.cancelled += len(lane.pending)
+            lane.pending.clear()
+
+    def _makeReady(self, lane):
+        """called with the lock held"""
+        if lane.ready or not lane.pending or lane.running >= lane.concurrency:
+            return
+        lane.ready = True
+        self._ready.append(lane)
+        if self._idle > 0:
+            self._condition.notify()
+        elif len(self._workers) < self.threads:
+            worker = threading.Thread(target=self._run, name='executor-{n:d}'.format(n=len(self._workers)))
+            worker.daemon = True
+            self._workers.append(worker)
+            worker.start()
+
+    def _next(self):
+        """next job, called with the lock held. None when stopped"""
+        while not self._stopped:
+            while self._ready:
+                lane = self._ready.popleft()
+                lane.ready = False
+                if not lane.pending:
+                    # cancelled
+                    continue
+                job = lane.pending.popleft()
+                lane.running += 1
+                self._makeReady(lane)
+                return job
+            self._idle += 1
+            self._condition.wait()
+            self._idle -= 1
+        return None
+
+    def _run(self):
+        logger.debug("%s thread started", threading.current_thread().name)
+        condition = self._condition
+        condition.acquire()
+        try:
+            while True:
+                job = self._next()
+                if job == None:
+                    break
+                lane = job.lane
+                wait = clock() - job.submitted
+                if wait > lane.waitMax:
+                    lane.waitMax = wait
+                condition.release()
+                ok = False
+                try:
+                    try:
+                        job.callback(*job.args)
+                        ok = True
+                    except Exception as e:
+                        logger.error("%s: %s", lane.name, e)
+                finally:
+                    condition.acquire()
+                    lane.running -= 1
+                    if ok:
+                        lane.completed += 1
+                    else:
+                        lane.failed += 1
+                    self._makeReady(lane)
+        finally:
+            condition.release()
+        logger.debug("%s thread terminated", threading.current_thread().name)
+
+    def getMetrics(self):
+        """metrics collector, called on scrape"""
+        with self._condition:
+            lanes = list(self._lanes.values())
+            threads = len(self._workers)
+        yield 'scratchclient_executor_threads', (), threads
+        for lane in lanes:
+            for sample in lane.getMetrics():
+                yield sample
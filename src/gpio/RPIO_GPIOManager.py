@@ -25,6 +25,8 @@ import threading
 import logging
 logger = logging.getLogger(__name__)
 
+from gpio.edge import EdgeCallback
+
 #simulationFlag = False
 
 try:
@@ -95,10 +97,15 @@ class GPIOManager:
     
     pwmRegistry = None
     usageCount = 0
+    # port --> EdgeCallback
+    edgeCallbacks = None
+    # RPIO thread waiting for interrupts is running
+    waitingForInterrupts = False
     
     def __init__(self):
         RPIO.PWM.setup()
         self.usageCount = 0
+        self.edgeCallbacks = {}
         
         if logger.isEnabledFor(logging.DEBUG):
             RPIO.PWM.set_loglevel(RPIO.PWM.LOG_LEVEL_DEBUG)
@@ -124,6 +131,8 @@ class GPIOManager:
         else:
             self.usageCount -= 1
             if self.usageCount == 0:
+                for port in list(self.edgeCallbacks.keys()):
+                    self._removeEdgeCallback(port)
                 RPIO.cleanup()
             
     def low(self, gpio):
@@ -225,6 +234,34 @@ class GPIOManager:
         RPIO.PWM.clear_channel(pwm.dmaChannel)
         self.pwmRegistry.remove(gpio)    
     
+    def addEdgeCallback(self, gpio, callback, bouncetime=0, initial=False):
+        """callback(level) on debounced changes of an input, bouncetime [sec];
+        initial reports the current level first"""
+        port = gpio.getPort()
+        if port in self.edgeCallbacks:
+            self._removeEdgeCallback(port)
+        edge = EdgeCallback(callback, lambda: RPIO.input(port), bouncetime, initial)
+        self.edgeCallbacks[port] = edge
+        # RPIO sets the pull mode again, keep the one from active setting
+        RPIO.add_interrupt_callback(port, lambda gpio_id, value: edge.edge(value), 
+                                    edge='both', pull_up_down=self._pull(gpio.active_setting))
+        if not self.waitingForInterrupts:
+            RPIO.wait_for_interrupts(threaded=True)
+            self.waitingForInterrupts = True
+        
+    def removeEdgeCallback(self, gpio):
+        self._removeEdgeCallback(gpio.getPort())
+        
+    def _removeEdgeCallback(self, port):
+        edge = self.edgeCallbacks.pop(port, None)
+        if edge == None:
+            return
+        RPIO.del_interrupt_callback(port)
+        edge.cancel()
+        if len(self.edgeCallbacks) == 0 and self.waitingForInterrupts:
+            RPIO.stop_waiting_for_interrupts()
+            self.waitingForInterrupts = False
+    
     def setGPIOActive(self, gpioConfiguration, state):
         logger.debug("RPIO, setGPIOActive %s, %s", 'state', str(state))
         if state:
@@ -240,15 +277,7 @@ class GPIOManager:
             if debug:
                 logger.debug("gpio reserved, do not touch")
         
-        gPull = RPIO.PUD_OFF
-        if setting.pull == None or setting.pull == 'PUD_OFF':    
-            pass
-        elif setting.pull == 'PUD_UP':
-            gPull = RPIO.PUD_UP;
-        elif setting.pull == 'PUD_DOWN':
-            gPull = RPIO.PUD_DOWN;
-        else:
-            pass
+        gPull = self._pull(setting)
         
         if setting.dir == 'OUT':
             if debug:
@@ -266,3 +295,15 @@ class GPIOManager:
                 self.high( gpioConfiguration)
             else:
                 pass
+            
+    def _pull(self, setting):
+        gPull = RPIO.PUD_OFF
+        if setting.pull == None or setting.pull == 'PUD_OFF':    
+            pass
+        elif setting.pull == 'PUD_UP':
+            gPull = RPIO.PUD_UP;
+        elif setting.pull == 'PUD_DOWN':
+            gPull = RPIO.PUD_DOWN;
+        else:
+            pass
+        return gPull
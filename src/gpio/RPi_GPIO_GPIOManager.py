@@ -21,6 +21,8 @@
 import logging
 logger = logging.getLogger(__name__)
 
+from gpio.edge import EdgeCallback
+
 #simulationFlag = False
 debug = False
 
@@ -57,11 +59,14 @@ class GPIOManager:
     
     pwms = None
     usageCount = 0
+    # port --> EdgeCallback
+    edgeCallbacks = None
     
     def __init__(self):
         GPIO.setmode(GPIO.BCM)
         self.pwms = PWMRegistry()
         self.usageCount = 0
+        self.edgeCallbacks = {}
         pass
     
     #def getSimulation(self):
@@ -77,6 +82,8 @@ class GPIOManager:
         else:
             self.usageCount -= 1
             if self.usageCount == 0:
+                for port in list(self.edgeCallbacks.keys()):
+                    self._removeEdgeCallback(port)
                 GPIO.cleanup()
             
     def low(self, gpio):
@@ -94,6 +101,26 @@ class GPIOManager:
     def get(self, gpio):
         return GPIO.input(gpio.getPort())    
 
+    def addEdgeCallback(self, gpio, callback, bouncetime=0, initial=False):
+        """callback(level) on debounced changes of an input, bouncetime [sec];
+        initial reports the current level first"""
+        port = gpio.getPort()
+        if port in self.edgeCallbacks:
+            self._removeEdgeCallback(port)
+        edge = EdgeCallback(callback, lambda: GPIO.input(port), bouncetime, initial)
+        self.edgeCallbacks[port] = edge
+        # debounce is done in EdgeCallback, RPi.GPIO bouncetime would drop edges
+        GPIO.add_event_detect(port, GPIO.BOTH, callback=lambda channel: edge.edge())
+        
+    def removeEdgeCallback(self, gpio):
+        self._removeEdgeCallback(gpio.getPort())
+        
+    def _removeEdgeCallback(self, port):
+        edge = self.edgeCallbacks.pop(port, None)
+        if edge != None:
+            GPIO.remove_event_detect(port)
+            edge.cancel()
+
     def direction_in(self, gpio):
         if debug: 
             logger.debug("direction_in %s", gpio)
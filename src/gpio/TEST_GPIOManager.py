@@ -15,14 +15,22 @@
     # MA 02110, USA
     # ---------------------------------------------------------------------------------------------
 
+import threading
+import time
+
+from gpio.edge import EdgeCallback
+
 import logging
 logger = logging.getLogger(__name__)
 
 # 
 # GPIO-Manager for test purposes. Does not need any external library 
 #
+# Inputs are low unless set by setInput(port, level) or played from a 
+# script(port, edges), which call the edge callbacks.
+#
 
-debug = True
+debug = False
 
         
 class GPIOManager:
@@ -30,9 +38,14 @@ class GPIOManager:
     
     pwms = None
     name = 'TESTManager'
+    # port --> level
+    levels = None
+    # port --> EdgeCallback
+    edgeCallbacks = None
         
     def __init__(self):
-        pass
+        self.levels = {}
+        self.edgeCallbacks = {}
 
     #def getSimulation(self):
     #    return False
@@ -61,8 +74,44 @@ class GPIOManager:
         print( self.name, "direction_out()", gpio )
 
     def get(self, gpio):
-        print(self.name, "get", gpio.getPort())
-        return False    
+        if debug:
+            print(self.name, "get", gpio.getPort())
+        return self.levels.get(gpio.getPort(), False)
+
+    def setInput(self, port, level):
+        """simulated input level, a change is an edge"""
+        if self.levels.get(port, False) == level:
+            return
+        self.levels[port] = level
+        edge = self.edgeCallbacks.get(port)
+        if edge != None:
+            edge.edge(level)
+            
+    def script(self, port, edges):
+        """play edges on an input in a thread. edges is a list of 
+        (time [sec] after start, level). Returns the thread."""
+        def play():
+            t0 = time.time()
+            for t, level in edges:
+                wait = t0 + t - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+                self.setInput(port, level)
+        thread = threading.Thread(target=play, name='{n:s}-script-{p:d}'.format(n=self.name, p=port))
+        thread.daemon = True
+        thread.start()
+        return thread
+        
+    def addEdgeCallback(self, gpio, callback, bouncetime=0, initial=False):
+        port = gpio.getPort()
+        if debug:
+            print(self.name, "addEdgeCallback", port, bouncetime)
+        self.edgeCallbacks[port] = EdgeCallback(callback, lambda: self.levels.get(port, False), bouncetime, initial)
+        
+    def removeEdgeCallback(self, gpio):
+        edge = self.edgeCallbacks.pop(gpio.getPort(), None)
+        if edge != None:
+            edge.cancel()
 
     def startPWM(self, gpio, frequency=20.0, rate=50.0):
         pass
@@ -4,3 +4,5 @@
 # the module names are Library name, replaced by underscore.
 # The class is GPIOManager.
 #
+# edge.py: edge callbacks with debounce, used by the managers.
+#
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# edge callbacks for the GPIO managers, addEdgeCallback(gpio, callback, bouncetime)
+#
+# The libraries call edge() on each edge of an input. The level is reported to
+# callback(level) when it changed and was stable for bouncetime seconds; an
+# edge during this time restarts it. The software debounce keeps the last
+# level, other than the debounce of RPi.GPIO which drops the edges after an
+# accepted one. The level is taken at the edge, so a late check does not lose
+# a short pulse: the next edge reports it, when it was stable long enough.
+# The check after bouncetime is a one-shot task of scheduler.shared(), not a
+# thread per edge.
+#
+# Without bouncetime each edge is reported at once. An edge found at the level
+# reported last was a pulse too short to be read; it is reported as two
+# changes.
+#
+# The callback runs adapter code and is called outside the lock, in the
+# order of the reports: a thread finding a delivery running only queues its
+# levels. With initial=True the level read at registration is reported first.
+#
+import threading
+import time
+
+import scheduler
+
+import logging
+logger = logging.getLogger(__name__)
+
+debug = False
+
+try:
+    clock = time.monotonic
+except AttributeError:
+    clock = time.time
+
+class EdgeCallback:
+    """debounced level changes of one input"""
+
+    def __init__(self, callback, read, bouncetime = 0, initial = False):
+        self.callback = callback
+        self.read = read
+        self.bouncetime = bouncetime
+        self.level = self._level( read() )
+        # edges seen, level changes reported
+        self.edges = 0
+        self.changes = 0
+        self.active = True
+        self._lock = threading.Lock()
+        self._task = None
+        self._deadline = 0
+        # level after the last edge and its time
+        self._pending = self.level
+        self._edgeTime = 0
+        # levels reported, not yet passed to callback
+        self._reports = []
+        self._delivering = False
+        if initial:
+            with self._lock:
+                self._reports.append(self.level)
+                deliver = self._claim()
+            if deliver:
+                self._deliver()
+
+    def _level(self, level):
+        if level:
+            return 1
+        return 0
+
+    def edge(self, level = None):
+        """called by the library on an edge, with the level when known"""
+        self.edges += 1
+        if level == None:
+            level = self.read()
+        level = self._level(level)
+        if self.bouncetime <= 0:
+            with self._lock:
+                if not self.active:
+                    return
+                if level == self.level:
+                    self._report( 1 - level )
+                self._report( level )
+                deliver = self._claim()
+            if deliver:
+                self._deliver()
+            return
+
+        now = clock()
+        with self._lock:
+            if not self.active:
+                return
+            if self._pending != self.level and now - self._edgeTime >= self.bouncetime:
+                # the check was late
+                self._report(self._pending)
+            self._pending = level
+            self._edgeTime = now
+            self._deadline = now + self.bouncetime
+            if self._task == None:
+                self._schedule(self.bouncetime)
+            deliver = self._claim()
+        if deliver:
+            self._deliver()
+
+    def _schedule(self, t):
+        self._task = scheduler.shared().schedule(None, self._settled, 'edge', t)
+
+    def _settled(self):
+        with self._lock:
+            if not self.active:
+                self._task = None
+                return
+            remaining = self._deadline - clock()
+            if remaining > 0:
+                self._schedule(remaining)
+                return
+            self._task = None
+            if self._pending != self.level:
+                self._report(self._pending)
+            deliver = self._claim()
+        if deliver:
+            self._deliver()
+
+    def _report(self, level):
+        """with lock held; the callback is called by _deliver()"""
+        self.level = level
+        self.changes += 1
+        self._reports.append(level)
+
+    def _claim(self):
+        """with lock held, True when the caller has to call _deliver()"""
+        if self._delivering or len(self._reports) == 0:
+            return False
+        self._delivering = True
+        return True
+
+    def _deliver(self):
+        """pass the reported levels to callback, also those queued meanwhile"""
+        while True:
+            with self._lock:
+                if not self.active or len(self._reports) == 0:
+                    del self._reports[:]
+                    self._delivering = False
+                    return
+                level = self._reports.pop(0)
+            if debug:
+                print("edge", level)
+            try:
+                self.callback(level)
+            except Exception as e:
+                logger.error("edge callback: %s", e)
+
+    def cancel(self):
+        """no more callbacks after return, except one already running"""
+        with self._lock:
+            self.active = False
+            task = self._task
+            self._task = None
+        if task != None:
+            task.cancel()
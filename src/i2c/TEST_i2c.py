@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 
+# i2c bus for test purposes, used off the pi with 
+#   I2CManager(busClass = i2c.TEST_i2c.I2CBus)
+#
+# Devices are added with addDevice(bus, address, device). RegisterDevice
+# has 256 registers with an address pointer, incremented on each byte like
+# most sensors. A transfer to an address without device fails with an
+# IOError like the kernel driver. A transfer takes transferTime seconds.
+# Transfers overlapping on a bus are counted in 'overlaps'.
+#
+
+debug = False
+
+# (bus, address) --> device
+devices = {}
+transferTime = 0.0
+overlaps = 0
+
+_lock = threading.Lock()
+# bus --> transfers running
+_active = {}
+
+def addDevice(bus, address, device):
+    devices[(bus, address)] = device
+    return device
+
+def reset():
+    global overlaps
+    devices.clear()
+    _active.clear()
+    overlaps = 0
+
+class RegisterDevice:
+    """registers with auto increment. The first byte written is the
+    register address"""
+    
+    def __init__(self, registers = None):
+        self.registers = [0] * 256
+        if registers != None:
+            for reg, value in registers.items():
+                self.registers[reg] = value
+        self.pointer = 0
+        self.transfers = 0
+        
+    def write(self, data):
+        if len(data) == 0:
+            return
+        self.pointer = data[0]
+        for value in data[1:]:
+            self.registers[self.pointer] = value & 0xff
+            self.pointer = (self.pointer + 1) & 0xff
+        
+    def read(self, length):
+        r = []
+        for _ in range(length):
+            r.append(self.registers[self.pointer])
+            self.pointer = (self.pointer + 1) & 0xff
+        return r
+
+class I2CBus:
+    """i2c.manager._I2CBus"""
+    
+    def __init__(self, bus):
+        if debug:
+            print("I2CBus()", bus)
+        self.bus = bus
+        self.transfers = 0
+        self.closed = False
+        
+    def transfer(self, address, data, readLength):
+        global overlaps
+        with _lock:
+            n = _active.get(self.bus, 0)
+            if n > 0:
+                overlaps += 1
+            _active[self.bus] = n + 1
+        try:
+            self.transfers += 1
+            if transferTime > 0:
+                time.sleep(transferTime)
+            device = devices.get((self.bus, address))
+            if device == None:
+                raise IOError(121, "Remote I/O error")
+            device.transfers += 1
+            if len(data) > 0:
+                device.write(list(data))
+            if readLength > 0:
+                return device.read(readLength)
+            return []
+        finally:
+            with _lock:
+                _active[self.bus] -= 1
+        
+    def close(self):
+        if debug:
+            print("I2CBus.close()", self.bus)
+        self.closed = True
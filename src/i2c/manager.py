@@ -19,11 +19,23 @@
 # For this adapter, there are additional libraries needed.
 #
 # 
-# sudo apt-get python-smbus
 # sudo modprobe i2c-bcm2708
 # sudo modprobe i2c-dev
 #
+# Each bus /dev/i2c-<n> is opened once, all devices on the bus share the 
+# file handle. A lock on the bus serializes the transactions of the adapter
+# threads. Transfers use the I2C_RDWR ioctl: a register read is the write of
+# the register address and the read of the data with a repeated start, in 
+# one call for any length. The messages and buffers are allocated once per bus.
+# Per device, transactions, bytes, time on the bus, time waited for the bus 
+# and errors are counted and reported as metrics.
 #
+# smbus is not needed any more; the devices offer the smbus methods used by 
+# the adapters (write_byte_data, read_i2c_block_data, ...).
+#
+import contextlib
+import ctypes
+import os
 import time
 import threading
 
@@ -31,27 +43,177 @@ import logging
 logger = logging.getLogger(__name__)
 
 try:
-    import smbus
+    import fcntl
 except ImportError as e:
+    fcntl = None
     logger.warn(e)        
 
-debug=True
+debug=False
+
+try:
+    clock = time.monotonic
+except AttributeError:
+    clock = time.time
+
+# linux/i2c-dev.h, linux/i2c.h
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+
+# longest transfer, register address included
+MAX_LENGTH = 256
+
+class _i2c_msg(ctypes.Structure):
+    _fields_ = [ ('addr',  ctypes.c_uint16),
+                 ('flags', ctypes.c_uint16),
+                 ('len',   ctypes.c_uint16),
+                 ('buf',   ctypes.POINTER(ctypes.c_uint8)) ]
+
+class _i2c_rdwr_ioctl_data(ctypes.Structure):
+    _fields_ = [ ('msgs',  ctypes.POINTER(_i2c_msg)),
+                 ('nmsgs', ctypes.c_uint32) ]
+
+class _I2CBus:
+    """a bus /dev/i2c-<n>, transfers with I2C_RDWR"""
+    
+    def __init__(self, bus):
+        self.bus = bus
+        self.fd = os.open('/dev/i2c-{bus:d}'.format(bus=bus), os.O_RDWR)
+        # preallocated, used with the bus lock held
+        self._writeBuffer = (ctypes.c_uint8 * MAX_LENGTH)()
+        self._readBuffer = (ctypes.c_uint8 * MAX_LENGTH)()
+        self._msgs = (_i2c_msg * 2)()
+        self._msgs[0].flags = 0
+        self._msgs[0].buf = ctypes.cast(self._writeBuffer, ctypes.POINTER(ctypes.c_uint8))
+        self._msgs[1].flags = I2C_M_RD
+        self._msgs[1].buf = ctypes.cast(self._readBuffer, ctypes.POINTER(ctypes.c_uint8))
+        self._rdwr = _i2c_rdwr_ioctl_data()
+        self._rdwr.msgs = ctypes.cast(self._msgs, ctypes.POINTER(_i2c_msg))
+        # the read alone
+        self._rdwrRead = _i2c_rdwr_ioctl_data()
+        self._rdwrRead.msgs = ctypes.pointer(self._msgs[1])
+        self._rdwrRead.nmsgs = 1
+        
+    def transfer(self, address, data, readLength):
+        """write data, then read readLength bytes with a repeated start.
+        Either may be empty. Returns the bytes read as list"""
+        n = len(data)
+        if n > MAX_LENGTH or readLength > MAX_LENGTH:
+            raise IOError("i2c transfer longer than {m:d} bytes".format(m=MAX_LENGTH))
+        if n > 0:
+            msg = self._msgs[0]
+            msg.addr = address
+            msg.len = n
+            self._writeBuffer[0:n] = data
+        if readLength > 0:
+            msg = self._msgs[1]
+            msg.addr = address
+            msg.len = readLength
+        
+        if n > 0 and readLength > 0:
+            self._rdwr.nmsgs = 2
+            fcntl.ioctl(self.fd, I2C_RDWR, self._rdwr)
+        elif n > 0:
+            self._rdwr.nmsgs = 1
+            fcntl.ioctl(self.fd, I2C_RDWR, self._rdwr)
+        elif readLength > 0:
+            fcntl.ioctl(self.fd, I2C_RDWR, self._rdwrRead)
+        return self._readBuffer[0:readLength]
+    
+    def close(self):
+        os.close(self.fd)
 
-class _I2CData:
-    i2cbus = None
-    address = None
+class _I2CDevice:
+    """a device on a bus. Offers the smbus methods used by the adapters, the
+    address argument of these is ignored. read() and write() are block 
+    transfers from and to a register."""
+    
     i2cHandler = None
-     
-    def __init__(self, i2cbus, address):
-        self.i2cbus = i2cbus
+    
+    def __init__(self, i2cBus, lock, address):
+        self.i2cBus = i2cBus
+        self.bus = i2cBus.bus
+        self.lock = lock
         self.address = address
+        # adapters using the device
+        self.users = 0
+        # nesting of transaction(), bus lock held when > 0
+        self._depth = 0
+        self._start = 0.0
+        # statistics
+        self.transactions = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.waitSeconds = 0.0
+        self.errors = 0
+        
+    @contextlib.contextmanager
+    def transaction(self):
+        """holds the bus, for sequences which need to be atomic"""
+        t = clock()
+        self.lock.acquire()
+        try:
+            self._depth += 1
+            if self._depth == 1:
+                self._start = clock()
+                self.waitSeconds += self._start - t
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.transactions += 1
+                self.seconds += clock() - self._start
+            self.lock.release()
+            
+    def transfer(self, data, readLength):
+        with self.transaction():
+            try:
+                r = self.i2cBus.transfer(self.address, data, readLength)
+            except (IOError, OSError):
+                self.errors += 1
+                raise
+            self.bytes += len(data) + readLength
+            return r
         
+    def write(self, reg, data):
+        self.transfer([reg] + list(data), 0)
+        
+    def read(self, reg, length):
+        return self.transfer([reg], length)
+        
+    # smbus methods
+    def write_byte(self, address, value):
+        self.transfer([value], 0)
+    
+    def read_byte(self, address):
+        return self.transfer([], 1)[0]
+    
+    def write_byte_data(self, address, reg, value):
+        self.transfer([reg, value], 0)
+        
+    def read_byte_data(self, address, reg):
+        return self.transfer([reg], 1)[0]
+        
+    def write_i2c_block_data(self, address, reg, data):
+        self.write(reg, data)
+        
+    def read_i2c_block_data(self, address, reg, length = 32):
+        return self.read(reg, length)
+    
+    def getMetrics(self):
+        labels = (('bus', str(self.bus)), ('address', '0x{a:02x}'.format(a=self.address)))
+        yield 'scratchclient_i2c_transactions_total', labels, self.transactions
+        yield 'scratchclient_i2c_bytes_total', labels, self.bytes
+        yield 'scratchclient_i2c_seconds_total', labels, self.seconds
+        yield 'scratchclient_i2c_wait_seconds_total', labels, self.waitSeconds
+        yield 'scratchclient_i2c_errors_total', labels, self.errors
          
 class _I2CRegistry:
     spiBusDeviceHandler = None
     
     def __init__(self):
         self.spiBusDeviceHandler = {}
+        # bus --> [ _I2CBus, lock, devices open ]
+        self.buses = {}
      
     def getBusDeviceHandler(self, bus, address):
         k = str(bus) + '$' + str(address)
@@ -60,14 +222,40 @@ class _I2CRegistry:
         except:
             return None
     
-    def addBusDeviceHandler(self, bus, address, i2cbus):
+    def addBusDeviceHandler(self, bus, address, i2cBus):
         k = str(bus) + '$' + str(address)
-        self.spiBusDeviceHandler[k] = _I2CData(i2cbus, address)
+        entry = self.buses.get(bus)
+        if entry == None:
+            entry = [ i2cBus, threading.RLock(), 0 ]
+            self.buses[bus] = entry
+        entry[2] += 1
+        i2cDevice = _I2CDevice(entry[0], entry[1], address)
+        self.spiBusDeviceHandler[k] = i2cDevice
+        return i2cDevice
+    
+    def getBus(self, bus):
+        entry = self.buses.get(bus)
+        if entry == None:
+            return None
+        return entry[0]
+    
+    def removeBusDeviceHandler(self, bus, address):
+        """the bus is closed with its last device"""
+        k = str(bus) + '$' + str(address)
+        del self.spiBusDeviceHandler[k]
+        entry = self.buses[bus]
+        entry[2] -= 1
+        if entry[2] == 0:
+            entry[0].close()
+            del self.buses[bus]
+            
+    def getDevices(self):
+        return list(self.spiBusDeviceHandler.values())
          
     def closeAll(self):
-        for k in self.spiBusDeviceHandler.keys():
-            i2cData = self.spiBusDeviceHandler[k]
-            i2cData.i2cbus.close()
+        for entry in self.buses.values():
+            entry[0].close()
+        self.buses = {}
         self.spiBusDeviceHandler = {}
  
  
@@ -77,28 +265,40 @@ class I2CManager:
     
     i2cRegistry = None
 
-    def __init__(self):
+    def __init__(self, busClass = None):
+        """busClass replaces the /dev/i2c-<n> access, e.g. i2c.TEST_i2c.I2CBus"""
         self.i2cRegistry = _I2CRegistry()
+        self.busClass = busClass
+        if self.busClass == None:
+            self.busClass = _I2CBus
+        self._lock = threading.Lock()
 
     def setActive(self, state):
-        """called from main module, but has no function for this manager"""
-        pass
+        """devices still open are closed on shutdown"""
+        if not state:
+            with self._lock:
+                self.i2cRegistry.closeAll()
 
     def open(self, bus, address ):
-        i2cbus = self.i2cRegistry.getBusDeviceHandler(bus, address)
-        if i2cbus == None:
-
-            try:
-                i2cbus = smbus.SMBus( bus)
-            except IOError as e:
-                print("error", bus, e)
-                logger.error("i2c manager open, error %s bus %d", e, bus)
-            
-            self.i2cRegistry.addBusDeviceHandler(
-                                                 bus,
-                                                 address,
-                                                 i2cbus )
-        return i2cbus
+        """the device on a bus, the bus is opened once for all its devices"""
+        with self._lock:
+            i2cDevice = self.i2cRegistry.getBusDeviceHandler(bus, address)
+            if i2cDevice == None:
+                i2cBus = self.i2cRegistry.getBus(bus)
+                if i2cBus == None:
+                    try:
+                        i2cBus = self.busClass( bus)
+                    except (IOError, OSError) as e:
+                        print("error", bus, e)
+                        logger.error("i2c manager open, error %s bus %d", e, bus)
+                        return None
+                
+                i2cDevice = self.i2cRegistry.addBusDeviceHandler(
+                                                     bus,
+                                                     address,
+                                                     i2cBus )
+            i2cDevice.users += 1
+            return i2cDevice
     
     def getValue(self, bus, address, channel):
         i2cData = self.i2cRegistry.getBusDeviceHandler(bus, address)
@@ -113,7 +313,24 @@ class I2CManager:
         i2cData = self.i2cRegistry.getBusDeviceHandler(bus, address)
         return i2cData.i2cHandler.writeValue(i2cData, channel, data)
 
-    def close(self):
-        """closes all connections, selective shutdowns are not implemented"""
-        self.i2cRegistry.closeAll()
-        
\ No newline at end of file
+    def close(self, bus = None, address = None):
+        """a device is closed when the last adapter using it closes it.
+        Without bus, address all connections are closed"""
+        with self._lock:
+            if bus == None:
+                self.i2cRegistry.closeAll()
+                return
+            i2cDevice = self.i2cRegistry.getBusDeviceHandler(bus, address)
+            if i2cDevice == None:
+                return
+            i2cDevice.users -= 1
+            if i2cDevice.users <= 0:
+                self.i2cRegistry.removeBusDeviceHandler(bus, address)
+        
+    def getMetrics(self):
+        """metrics collector, called on scrape"""
+        with self._lock:
+            devices = self.i2cRegistry.getDevices()
+        for i2cDevice in devices:
+            for sample in i2cDevice.getMetrics():
+                yield sample
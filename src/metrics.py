@@ -0,0 +1,249 @@
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+#
+# runtime metrics, served by the web server on /metrics (prometheus text format)
+# and /metrics.json
+#
+# There are two kinds of sources:
+# - collectors, registered callables which are asked for their values on a
+#   scrape only. Plain counters kept as attributes (bytes, records, connects)
+#   and queue depths are reported this way, at no cost in between.
+# - counters and histograms maintained here with inc() and observe(). These
+#   are per message (publish per topic, adapter handler time), so the callers
+#   check 'metrics.enabled' first. The flag is set by a scrape and cleared
+#   when there was no scrape for IDLE_TIMEOUT seconds.
+#
+# Labels are tuples of (key, value)-pairs.
+#
+
+import bisect
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+debug = False
+
+# set on scrape, checked by the callers of inc() and observe()
+enabled = False
+# seconds without scrape until collection is switched off again
+IDLE_TIMEOUT = 300.0
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# upper bounds of the histogram buckets, seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+# name --> (kind, help)
+descriptions = {
+    'scratchclient_records_received_total' : (COUNTER,   'records received from scratch'),
+    'scratchclient_records_sent_total'     : (COUNTER,   'records sent to scratch'),
+    'scratchclient_bytes_received_total'   : (COUNTER,   'bytes received on the scratch socket'),
+    'scratchclient_bytes_sent_total'       : (COUNTER,   'bytes sent on the scratch socket'),
+    'scratchclient_connects_total'         : (COUNTER,   'connections established, more than one means reconnects'),
+    'scratchclient_values_coalesced_total' : (COUNTER,   'value updates replaced by a newer one before sending'),
+    'scratchclient_updates_preferred_total': (COUNTER,   'high priority updates sent ahead of queued bulk values'),
+    'scratchclient_updates_dropped_total'  : (COUNTER,   'updates not sent because the connection was lost'),
+    'scratchclient_values_unchanged_total' : (COUNTER,   'values from scratch not published as unchanged'),
+    'scratchclient_values_unknown_total'   : (COUNTER,   'values and broadcasts from scratch without receiver'),
+    'scratchclient_queue_depth'            : (GAUGE,     'entries waiting in a queue'),
+    'scratchclient_publish_total'          : (COUNTER,   'messages published per topic, while scraped'),
+    'scratchclient_adapter_handler_seconds': (HISTOGRAM, 'time spent in adapter input handlers, while scraped'),
+    'scratchclient_poll_interval_seconds'  : (GAUGE,     'configured poll.interval of a polling adapter'),
+    'scratchclient_poll_period_max_seconds': (GAUGE,     'longest loop period of a polling adapter'),
+    'scratchclient_poll_overruns_total'    : (COUNTER,   'loop periods longer than 1.5 * poll.interval'),
+    'scratchclient_poll_jitter_seconds'    : (HISTOGRAM, 'loop period minus poll.interval'),
+    'scratchclient_encoder_steps_total'    : (COUNTER,   'steps decoded by a quadrature encoder'),
+    'scratchclient_encoder_invalid_transitions_total': (COUNTER, 'encoder transitions with both inputs changed, not counted'),
+    'scratchclient_executor_threads'       : (GAUGE,     'worker threads of the executor'),
+    'scratchclient_executor_pending'       : (GAUGE,     'executor jobs of an adapter waiting for a worker'),
+    'scratchclient_executor_pending_max'   : (GAUGE,     'most executor jobs of an adapter waiting at a time'),
+    'scratchclient_executor_running'       : (GAUGE,     'executor jobs of an adapter running'),
+    'scratchclient_executor_wait_max_seconds': (GAUGE,   'longest wait of an executor job for a worker'),
+    'scratchclient_executor_jobs_total'    : (COUNTER,   'executor jobs by result: completed, failed, dropped, merged, cancelled'),
+    'scratchclient_spi_transactions_total' : (COUNTER,   'transactions on a spi device'),
+    'scratchclient_spi_bytes_total'        : (COUNTER,   'bytes transferred with a spi device'),
+    'scratchclient_spi_seconds_total'      : (COUNTER,   'time a spi device held its bus'),
+    'scratchclient_spi_wait_seconds_total' : (COUNTER,   'time waited for the bus before transactions of a spi device'),
+    'scratchclient_spi_settings_total'     : (COUNTER,   'mode and speed changes written to a spi device'),
+    'scratchclient_i2c_transactions_total' : (COUNTER,   'transactions with an i2c device'),
+    'scratchclient_i2c_bytes_total'        : (COUNTER,   'bytes written to and read from an i2c device'),
+    'scratchclient_i2c_seconds_total'      : (COUNTER,   'time an i2c device held its bus'),
+    'scratchclient_i2c_wait_seconds_total' : (COUNTER,   'time waited for the bus before transactions of an i2c device'),
+    'scratchclient_i2c_errors_total'       : (COUNTER,   'failed transfers with an i2c device'),
+}
+
+_lock = threading.Lock()
+# (name, labels) --> value
+_counters = {}
+# (name, labels) --> [ count per bucket, ..., count above last bucket, sum ]
+_histograms = {}
+_collectors = []
+
+_lastScrape = 0
+_idleTimer = None
+
+def describe(name, kind, text):
+    descriptions[name] = (kind, text)
+
+def register(collector):
+    """collector() returns an iterable of (name, labels, value)"""
+    with _lock:
+        if not collector in _collectors:
+            _collectors.append(collector)
+
+def unregister(collector):
+    with _lock:
+        if collector in _collectors:
+            _collectors.remove(collector)
+
+def inc(name, labels = (), n = 1):
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+def observe(name, labels, value):
+    key = (name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h == None:
+            h = [0] * (len(BUCKETS) + 2)
+            _histograms[key] = h
+        h[ bisect.bisect_left(BUCKETS, value) ] += 1
+        h[-1] += value
+
+def reset():
+    global enabled
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+    enabled = False
+
+def _idle():
+    global enabled, _idleTimer
+    with _lock:
+        remaining = _lastScrape + IDLE_TIMEOUT - time.time()
+        if remaining > 0:
+            _idleTimer = _startTimer(remaining)
+            return
+        _idleTimer = None
+        enabled = False
+    logger.info("metrics: no scrape for %d sec, collection stopped", IDLE_TIMEOUT)
+
+def _startTimer(t):
+    timer = threading.Timer(t, _idle)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+def scrape():
+    """current values, sorted by name. Enables collection of per message metrics.
+       returns list of (name, kind, help, samples), samples are (labels, value);
+       value of a histogram is (cumulative bucket counts, count, sum)"""
+    global enabled, _lastScrape, _idleTimer
+
+    samples = {}
+    for collector in list(_collectors):
+        try:
+            for name, labels, value in collector():
+                samples.setdefault(name, []).append( (labels, value) )
+        except Exception as e:
+            logger.warn("metrics: collector %s: %s", collector, e)
+
+    with _lock:
+        _lastScrape = time.time()
+        if not enabled:
+            logger.info("metrics: scraped, collection started")
+            enabled = True
+        if _idleTimer == None:
+            _idleTimer = _startTimer(IDLE_TIMEOUT)
+
+        for (name, labels), value in _counters.items():
+            samples.setdefault(name, []).append( (labels, value) )
+        for (name, labels), h in _histograms.items():
+            cumulative = []
+            count = 0
+            for c in h[:-1]:
+                count += c
+                cumulative.append(count)
+            samples.setdefault(name, []).append( (labels, (cumulative, count, h[-1]) ) )
+
+    result = []
+    for name in sorted(samples.keys()):
+        kind, text = descriptions.get(name, ('untyped', ''))
+        result.append( (name, kind, text, sorted(samples[name], key=lambda sample: sample[0])) )
+    return result
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels, extra = ()):
+    labels = tuple(labels) + tuple(extra)
+    if not labels:
+        return ''
+    return '{' + ','.join( [ '{k:s}="{v:s}"'.format(k=k, v=_escape(v)) for k, v in labels ] ) + '}'
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def prometheusText():
+    lines = []
+    for name, kind, text, samples in scrape():
+        if text:
+            lines.append( '# HELP {n:s} {t:s}'.format(n=name, t=text) )
+        lines.append( '# TYPE {n:s} {k:s}'.format(n=name, k=kind) )
+        for labels, value in samples:
+            if kind == HISTOGRAM:
+                cumulative, count, total = value
+                for bound, c in zip(BUCKETS, cumulative):
+                    lines.append( '{n:s}_bucket{l:s} {c:d}'.format(n=name, l=_labels(labels, (('le', repr(bound)),)), c=c) )
+                lines.append( '{n:s}_bucket{l:s} {c:d}'.format(n=name, l=_labels(labels, (('le', '+Inf'),)), c=count) )
+                lines.append( '{n:s}_count{l:s} {c:d}'.format(n=name, l=_labels(labels), c=count) )
+                lines.append( '{n:s}_sum{l:s} {s:s}'.format(n=name, l=_labels(labels), s=_number(total)) )
+            else:
+                lines.append( '{n:s}{l:s} {v:s}'.format(n=name, l=_labels(labels), v=_number(value)) )
+    lines.append('')
+    return '\n'.join(lines)
+
+def jsonText():
+    result = {}
+    for name, kind, text, samples in scrape():
+        entries = []
+        for labels, value in samples:
+            entry = { 'labels': dict(labels) }
+            if kind == HISTOGRAM:
+                cumulative, count, total = value
+                buckets = [ [bound, c] for bound, c in zip(BUCKETS, cumulative) ]
+                buckets.append( ['+Inf', count] )
+                entry.update( { 'buckets': buckets, 'count': count, 'sum': total } )
+            else:
+                entry['value'] = value
+            entries.append(entry)
+        result[name] = { 'type': kind, 'help': text, 'samples': entries }
+    return json.dumps(result, sort_keys=True)
@@ -0,0 +1,197 @@
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+#
+# per thread profiling, switch -profile <file>
+#
+# cProfile only sees the thread which enabled it. So the threads started by
+# ThreadManager, Adapter.start and the arduino adapters run their target
+# through wrap(), which gives each thread its own profiler. Start, stop and
+# write requests from the web gui are picked up by the threads themselves
+# in checkpoint(), called from their loops (stopped(), delay()).
+#
+# Stats are written per thread name to <file>.<thread>.prof when the thread
+# terminates and on a write request; read them with pstats or snakeviz.
+# Without -profile, wrap() returns the target unchanged and the call sites
+# only check 'profiling.enabled'.
+# Since python 3.12 only one cProfile profiler can be enabled at a time, but
+# it sees all threads. There, one profiler for the process is enabled by
+# configure() and written to <file>.all.prof at exit and on a write request;
+# wrap() and checkpoint() have nothing to do. When another profiler is
+# already enabled, configure() raises ValueError.
+#
+
+import atexit
+import cProfile
+import logging
+import re
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+debug = False
+
+# -profile given, threads get a profiler
+enabled = False
+# profilers are collecting
+active = False
+fileName = None
+
+# incremented by write(), each thread writes its stats on next checkpoint
+_writeRequest = 0
+
+_lock = threading.Lock()
+# thread name --> _ThreadProfile
+_profiles = {}
+_local = threading.local()
+
+# python 3.12+: one profiler for all threads
+processWide = sys.version_info >= (3, 12)
+_process = None
+
+class _ThreadProfile:
+    """profiler for the threads of one name. A restarted thread continues
+       the same profiler"""
+
+    def __init__(self, name):
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.running = False
+        self.written = _writeRequest
+        # a thread is running with this profiler
+        self.inUse = False
+
+    def follow(self):
+        """called in the profiled thread"""
+        if active != self.running:
+            if active:
+                self.profile.enable()
+                self.running = True
+            else:
+                self.profile.disable()
+                self.running = False
+        if self.written != _writeRequest:
+            self.written = _writeRequest
+            self.write()
+
+    def finish(self):
+        """called in the profiled thread at its end"""
+        if self.running:
+            self.profile.disable()
+            self.running = False
+        self.write()
+        self.inUse = False
+
+    def write(self):
+        running = self.running
+        if running:
+            self.profile.disable()
+        name = fileName + '.' + re.sub(r'[^A-Za-z0-9_.-]', '_', self.name) + '.prof'
+        try:
+            self.profile.dump_stats(name)
+            logger.info("profile written to %s", name)
+        except (IOError, OSError) as e:
+            logger.error("profile not written to %s: %s", name, e)
+        if running:
+            self.profile.enable()
+
+def configure(_fileName):
+    """enable profiling from start, stats are written to _fileName.<thread>.prof,
+       with python 3.12+ to _fileName.all.prof"""
+    global enabled, active, fileName, _process
+    fileName = _fileName
+    if processWide:
+        tp = _ThreadProfile('all')
+        # ValueError when another profiler is enabled
+        tp.profile.enable()
+        tp.running = True
+        _process = tp
+        atexit.register(_writeProcess)
+    enabled = True
+    active = True
+
+def _writeProcess():
+    with _lock:
+        _process.write()
+
+def _getProfile(name):
+    with _lock:
+        n = 1
+        key = name
+        while key in _profiles and _profiles[key].inUse:
+            # same name in parallel threads
+            n += 1
+            key = '{name:s}-{n:d}'.format(name=name, n=n)
+        tp = _profiles.get(key)
+        if tp == None:
+            tp = _ThreadProfile(key)
+            _profiles[key] = tp
+        tp.inUse = True
+        return tp
+
+def wrap(target, name = None):
+    """target, profiled in the thread which runs it"""
+    if not enabled or processWide:
+        return target
+
+    def profiled(*args, **kwargs):
+        tp = _getProfile( name or threading.current_thread().name )
+        _local.profile = tp
+        tp.follow()
+        try:
+            return target(*args, **kwargs)
+        finally:
+            tp.finish()
+            _local.profile = None
+    return profiled
+
+def attach(thread):
+    """profile a thread object, when not yet started"""
+    if enabled and not processWide and thread.ident == None:
+        thread.run = wrap(thread.run, thread.name)
+
+def checkpoint():
+    """follow start, stop and write requests; called in the thread loops"""
+    tp = getattr(_local, 'profile', None)
+    if tp != None:
+        tp.follow()
+
+def start():
+    global active
+    logger.info("profiling started")
+    active = True
+    if _process != None:
+        with _lock:
+            if not _process.running:
+                _process.profile.enable()
+                _process.running = True
+
+def stop():
+    global active
+    logger.info("profiling stopped")
+    active = False
+    if _process != None:
+        with _lock:
+            if _process.running:
+                _process.profile.disable()
+                _process.running = False
+
+def write():
+    global _writeRequest
+    if _process != None:
+        _writeProcess()
+        return
+    _writeRequest += 1
@@ -16,262 +16,252 @@
     # ---------------------------------------------------------------------------------------------
 
 #
-# a simple name-Value-parser for scratch sensor-data
+# remote sensor protocol: record framing and a simple name-Value-parser for 
+# scratch sensor-data
+#
+# The parsers must give the results of the former per-character parser in
+# benchmark/legacy_protocol.py. Check after each change, from src-directory:
+#   python -m benchmark.rsp_parser -check
+# exits with code 1 and lists the inputs when they differ.
 #
 
 import logging
+import re
+import struct
+import sys
+
 logger = logging.getLogger(__name__)
 
+#
+# name: quoted, a quote in a name is doubled. Chars after a closing quote 
+# up to the next quote or blank are ignored; so '"a"x"b"' is 'a"b'.
+#
+_NAME = r'"([^"]*(?:"[^" ]*"[^"]*)*)'
+_NAME_JUNK = re.compile(r'"[^" ]*"')
+#
+# value: quoted with doubled quotes, terminated by blank or end of input;
+# or unquoted up to the next blank.
+#
+_PAIR = re.compile(r' *' + _NAME + r'"[^" ]* +(?:"([^"]*(?:""[^"]*)*)"(?= |\Z)|([^ "][^ ]*))')
+_BLANKS = re.compile(r' *\Z')
+_BROADCAST = re.compile(r' *' + _NAME + r'(?:"[^" ]*( |\Z))?')
 
-class NVToken:
-    CHAR = 0
-    EOL = 1
-    
-    def __init__(self, _type, char):
-        self.type = _type
-        self.char = char
-    
-    def __str__(self):
-        if self.type == self.CHAR:
-            return "NVToken[CHAR, " + self.char + "]"
-        if self.type == self.EOL:
-            return "NVToken[EOL]"
+def _name(raw):
+    if '"' in raw:
+        return _NAME_JUNK.sub('"', raw)
+    return raw
 
-class SParser:
-    def __init__(self, _input):
-        self._input = _input
-        self.pos = 0
-        
-    # instead of having new tokens each time, prepare one and reuse
-    tchar = NVToken(NVToken.CHAR, 'x')
-    teol = NVToken(NVToken.EOL, ' ')
-    
-    def getToken(self):
-        if self.pos < len(self._input):
-        
-            self.tchar.char = self._input[self.pos]
-            # t = NVToken(NVToken.CHAR, self._input[self.pos])
-            self.pos += 1
-            #return t
-            return self.tchar
-        return self.teol
-    
-           
-class NameValueParser (SParser) :
+class NameValueParser:
     """parsing name value pairs for scratch remote sensor protocol
        input is without the trailing 'sensor-update'
        example: "a" 1 
        example: "a" 1 "c" "c-value" 
        example: "a" 1 "c" "c-value" "d""d" "d-val""ue" 
        
+       On a syntax error, the pairs parsed so far are returned.
     """
     def __init__(self, _input):
-        SParser.__init__(self, _input)
+        self._input = _input
         
     def parse(self):
         result = []
-        state = 0
-        name = ''
-        value = ''
+        _input = self._input
+        end = len(_input)
+        pos = 0
         
+        match = _PAIR.match
         while True:
-
-            c = self.getToken()
-            # logger.debug("state = " + str(state) + " " + str(c) + " @" + str(self.pos))
-            if state == 0:
-                #
-                # expect namevalue, at least one
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == ' ':
-                        pass
-                    elif c.char == '"':
-                        state = 1
-                    else:
-                        logger.error("%d: failure in parsing input, unexpected char %s at %d (%s)", state, c.char, self.pos, self._input )
-                        break;
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break;  
-            elif state == 1000:
-                #
-                # expect namevalue or empty input
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == ' ':
-                        pass
-                    elif c.char == '"':
-                        state = 1
-                    else:
-                        logger.error("%d: failure in parsing input, unexpected char %s at %d (%s)", state, c.char, self.pos, self._input )
-                        break;
-                elif c.type == NVToken.EOL:
-                    break;  
-            elif state == 1:
-                #
-                # a quoted name has started, wait for closing '"'
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == '"':
-                        state = 20
-                    else:
-                        name += c.char  
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break;  
-            elif state == 20:
-                #
-                # closing quote, or a quote in a name ?
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == '"':
-                        name += c.char 
-                        state = 1
-                    elif c.char == ' ' :
-                        state = 2  
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break;  
-            elif state == 2:
-                #
-                # name is complete, wait for value
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == ' ':
-                        pass
-                    elif c.char == '"':
-                        state = 100
-                    else:
-                        value = c.char
-                        state = 200
-                         
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break;  
-            elif state == 100:
-                #
-                # quoted value
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == ' ':
-                        value += c.char
-                    elif c.char == '"':
-                        state = 110
-                    else:
-                        value += c.char
-                         
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break;  
-            elif state == 110:
-                #
-                # quoted value, end quote received. When now again a quote is received
-                # it is a quote as char
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == ' ':
-                        
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug("%d: name value =  %s, %s", state, name, value)
-                        
-                        result.append(list([name, value]))
-                        name = ''
-                        value = ''
-                        state = 1000
-                    elif c.char == '"':
-                        value += '"'
-                        state = 100
-                    else:
-                        logger.error("%d: failure in parsing input, unexpected char %c at %d (%s)", state, c.char, self.pos, self._input)
-                        break 
-                elif c.type == NVToken.EOL:
-                    
-                    if logger.isEnabledFor(logging.DEBUG):
-                        logger.debug("%d: name value =  %s, %s", state, name, value)
-                    
-                    result.append(list([name, value]))
-                    break;  
-            elif state == 200:
-                #
-                # unquoted value
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == ' ':
-                        
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug("%d: name value = %s, %s", state, name, value)
-                        
-                        result.append([name, value])
-                        name = ''
-                        value = ''
-                        state = 1000
-                    else:
-                        value += c.char
-                         
-                elif c.type == NVToken.EOL:
-                    result.append([name, value])
-                    logger.warning("%d: unexpected EOL, but sequence is complete", state)
-                    break;  
+            m = match(_input, pos)
+            if m == None:
+                break
+            
+            name, quoted, unquoted = m.groups()
+            if unquoted == None:
+                value = quoted.replace('""', '"')
+            else:
+                value = unquoted
+            name = _name(name)
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("name value =  %s, %s", name, value)
+            
+            result.append([name, value])
+            pos = m.end()
+            if pos == end:
+                if unquoted != None and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("unexpected EOL, but sequence is complete")
+                return result
+            
+        if result and _BLANKS.match(_input, pos):
+            return result
+        
+        logger.error("failure in parsing input at %d (%s)", pos, _input)
         return result
 
-class BroadcastParser (SParser):
+class BroadcastParser:
     """parsing broadcast strings for  scratch remote sensor protocol
        input is without the trailing 'broadcast'
        example: "a"
        example: "b""c"  
        example: \"\"\"a\"\"\" 
        
+       On a syntax error, the name parsed so far is returned.
     """
     def __init__(self, _input):
-        SParser.__init__(self, _input)
+        self._input = _input
         
     def parse(self):
-        state = 0
-        name = ''
-        
-        while True:
+        m = _BROADCAST.match(self._input)
+        if m == None:
+            logger.error("failure in parsing input (%s)", self._input)
+            return ''
+        if m.group(2) == None:
+            logger.error("failure in parsing input, unexpected EOL (%s)", self._input)
+        return _name(m.group(1))
+
+# --------------------------------------------------------------------------------------
+# record framing: each record is preceded by its length as 4 byte big endian.
+#
 
-            c = self.getToken()
-            # logger.debug("state = " + str(state) + " " + str(c) + " @" + str(self.pos))
-            if state == 0:
-                #
-                # expect quote or blank
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == ' ':
-                        pass
-                    elif c.char == '"':
-                        state = 1
-                    else:
-                        logger.error("%d: failure in parsing input, unexpected char %s at %d (%s)", state, c.char, self.pos, self._input )
-                        break;
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break;  
-            elif state == 1:
-                #
-                # a quoted name has started, wait for closing '"'
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == '"':
-                        state = 20
-                    else:
-                        name += c.char  
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break;  
-            elif state == 20:
-                #
-                # closing quote, or a quote in a name ?
-                #
-                if c.type == NVToken.CHAR:
-                    if c.char == '"':
-                        name += c.char 
-                        state = 1
-                    elif c.char == ' ' :
-                        break  
-                elif c.type == NVToken.EOL:
-                    logger.error("%d: failure in parsing input, unexpected EOL (%s)", state, self._input)
-                    break  
+BUFFER_SIZE = 4096
+
+_HEADER = struct.Struct('>I')
+
+def encode(record):
+    """a record as bytes, with length header. 
+       Text is sent as utf-8."""
+    if not isinstance(record, bytes):
+        record = record.encode('utf-8')
+    return _HEADER.pack(len(record)) + record
+
+if sys.version_info.major == 2:
+    def decode(record):
+        """record from RecordReader.records() as str"""
+        return record.tobytes()
+else:
+    def decode(record):
+        """record from RecordReader.records() as str"""
+        return str(record, 'utf-8')
+    
+class RecordReader:
+    """splits a byte stream into records.
+       Bytes are received into a bytearray, which only grows when a 
+       record is larger than the buffer. The records are memoryview-slices
+       of this buffer and are valid till the next recv() or feed().
+       
+       usage:
+           reader = RecordReader()
+           while reader.recv(sock):
+               for record in reader.records():
+                   text = decode(record)
+    """
+    def __init__(self, bufferSize = BUFFER_SIZE):
+        self._buffer = bytearray(bufferSize)
+        self._view = memoryview(self._buffer)
+        # unprocessed bytes are _buffer[_start:_end]
+        self._start = 0
+        self._end = 0
+        # size of the pending record including header, 4 when not yet known
+        self._need = 4
+        # bytes discarded while searching for a record start
+        self.discarded = 0
+        
+    def recv(self, sock):
+        """receive bytes from a socket, returns number of bytes, 0 on a closed connection"""
+        missing = self._start + self._need - self._end
+        if len(self._buffer) - self._end < missing:
+            self._reserve(missing)
+        elif self._end == len(self._buffer):
+            self._reserve(1)
+        n = sock.recv_into(self._view[self._end:])
+        if logger.isEnabledFor( logging.DEBUG):
+            logger.debug("received " + ' '.join( "{xx:02x}".format(xx=xx) for xx in bytearray(self._view[self._end:self._end+n])))
+        self._end += n
+        return n
+    
+    def feed(self, data):
+        """add bytes received otherwise"""
+        n = len(data)
+        self._reserve(n)
+        self._view[self._end:self._end+n] = data
+        self._end += n
+        
+    def records(self):
+        """list of complete records in the buffer"""
+        records = []
+        if self._end - self._start < self._need:
+            return records
+        
+        buf = self._buffer
+        start = self._start
+        end = self._end
+        while end - start >= 4:
+            #
+            # there are problems with scratch 1.4 2015-jan-15 on raspbian, not sending data according to bytes, but 
+            # length according to chars. When there are utf-8-chars in data stream, this is
+            # not the same.
+            # For this situation, an emergency recovery strategy is implemented: look for first two bytes of buffer 
+            # to be zero- it is reasonable that messages are less then 65536 bytes long.
+            if buf[start] != 0 or buf[start+1] != 0:
+                logger.error("fatal: first two bytes of message are not zero, discard data till zeros found")   
+                pos = buf.find(b'\x00\x00', start, end)
+                if pos < 0:
+                    pos = end - 2
+                logger.error("discarded {disc:d} bytes".format(disc=pos-start))
+                self.discarded += pos-start
+                start = pos
+                if end - start < 4:
+                    break
+            # end of error strategy
+            
+            need = 4 + _HEADER.unpack_from(buf, start)[0]
+            #
+            # are there enough bytes for a full record ?
+            # if not, remember the size and wait for more bytes to arrive.
+            #
+            if end - start < need:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("not enough data in buffer, have {have:d}, need {len:d}".format(have=end - start, len=need - 4))
+                self._start = start
+                self._need = need
+                return records
+            
+            records.append( self._view[start+4:start+need] )
+            start += need
+            
+        if start == end:
+            self._start = self._end = 0
+        else:
+            self._start = start
+        self._need = 4
+        return records
                 
-        return name
+    def _reserve(self, n):
+        """make room for n more bytes at the end of buffer"""
+        if len(self._buffer) - self._end >= n:
+            return
+        pending = self._end - self._start
+        if len(self._buffer) >= pending + n:
+            # move pending bytes to the beginning
+            self._view[0:pending] = self._view[self._start:self._end]
+        else:
+            size = len(self._buffer)
+            while size < pending + n:
+                size *= 2
+            buffer = bytearray(size)
+            buffer[0:pending] = self._view[self._start:self._end]
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        self._start = 0
+        self._end = pending
+
+class Traffic:
+    """counters for a connection, kept over reconnects. 
+       Updated per socket call, read by the metrics collector."""
+    def __init__(self):
+        self.recordsReceived = 0
+        self.bytesReceived = 0
+        self.recordsSent = 0
+        self.bytesSent = 0
+        self.connects = 0
+
@@ -18,46 +18,101 @@
 #
 # a simple publish-subscribe-mechanism
 #
+# Subscriptions are indexed by topic. Each topic maps to a tuple of receivers; 
+# subscribe/ unsubscribe never modify such a tuple but replace it (copy on write), 
+# so a publisher iterating a tuple is not disturbed by websockets subscribing
+# or unsubscribing in other threads.
+#
+# A topic ending with '*' is a prefix subscription, e.g. 'scratch.input.value.*' 
+# receives all values from scratch.
+#
+# offer() is publish() for topics which possibly have no receivers, as the 
+# variables scratch sends. Topics without receivers are remembered in a 
+# negative cache and counted instead of logged; the cache is cleared on each
+# subscription change.
+#
 
 import logging
+import threading
+
+import metrics
+import tracing
 
 debug = False
 
+WILDCARD = '*'
+
 class Pub:
     
-    topics = []
+    # topic --> tuple of receivers
+    registry = {}
+    # tuple of (prefix, receiver) for prefix subscriptions
+    wildcards = ()
+    # topics without receivers, for offer()
+    unknown = set()
+    # number of offered messages without receivers
+    rejected = 0
+    
+    _lock = threading.Lock()
     logger = logging.getLogger("Pub")
      
     @staticmethod
     def report():
         if debug:
-            for t in Pub.topics:
-                print("pubsub report ", t)
+            for topic in sorted(Pub.registry.keys()):
+                for receiver in Pub.registry[topic]:
+                    print("pubsub report ", topic, receiver)
+            for prefix, receiver in Pub.wildcards:
+                print("pubsub report ", prefix + WILDCARD, receiver)
                 
     @staticmethod
     def subscribe(topic, receiver):
-        found = False
-        for t in Pub.topics:
-            if t[0] == topic and t[1] == receiver:
-                found = True
+        with Pub._lock:
+            if topic.endswith(WILDCARD):
+                entry = (topic[:-1], receiver)
+                found = entry in Pub.wildcards
+                if not found:
+                    Pub.wildcards = Pub.wildcards + (entry, )
+            else:
+                receivers = Pub.registry.get(topic, ())
+                found = receiver in receivers
+                if not found:
+                    Pub.registry[topic] = receivers + (receiver, )
+            if not found:
+                Pub.unknown = set()
+                    
         if found:
             Pub.logger.info("subscribe: already known " + topic )
             if debug:
                 print("subscribe ", topic, receiver )
         else:
-            Pub.topics.append ( [topic, receiver] )
-       
             Pub.logger.info("subscribe: " + topic )
             if debug:
                 print("subscribe " + topic )
         
     @staticmethod
     def unsubscribe(topic, receiver):
-        try:
-            Pub.topics.remove( [topic, receiver] )
-        except ValueError as err:
+        with Pub._lock:
+            if topic.endswith(WILDCARD):
+                entry = (topic[:-1], receiver)
+                found = entry in Pub.wildcards
+                if found:
+                    Pub.wildcards = tuple( w for w in Pub.wildcards if w != entry )
+            else:
+                receivers = Pub.registry.get(topic, ())
+                found = receiver in receivers
+                if found:
+                    receivers = tuple( r for r in receivers if r != receiver )
+                    if receivers:
+                        Pub.registry[topic] = receivers
+                    else:
+                        del Pub.registry[topic]
+            if found:
+                Pub.unknown = set()
+                        
+        if not found:
             if debug:
-                print("unsubscribe error", topic, receiver, err )
+                print("unsubscribe error", topic, receiver )
             return
         
         Pub.logger.info("unsubscribe " + topic )
@@ -66,17 +121,48 @@ class Pub:
         
     @staticmethod   
     def publish(topic, message):
+        if not Pub._publish(topic, message):
+            Pub.logger.error("Topic not found " + topic)
+            if debug:
+                print( "Topic not found " + topic )
+                
+    @staticmethod   
+    def offer(topic, message):
+        """publish, returns False without logging when there is no receiver"""
+        unknown = Pub.unknown
+        if topic in unknown:
+            Pub.rejected += 1
+            return False
+        if Pub._publish(topic, message):
+            return True
+        # a subscribe in between replaced the set; then this topic is not cached
+        unknown.add(topic)
+        Pub.rejected += 1
+        return False
+        
+    @staticmethod   
+    def _publish(topic, message):
         if debug:
             print("publish", topic, message)
         found = False
-        for t in Pub.topics:
-            if t[0] == topic:
-            
-                receiver = t[1]
+        traced = tracing.enabled
+        if traced:
+            t0 = tracing.clock()
+        
+        receivers = Pub.registry.get(topic)
+        if receivers:
+            for receiver in receivers:
                 receiver(message)
-                found = True
-        if not found:
-           
-            Pub.logger.error("Topic not found " + topic)
-            if debug:
-                print( "Topic not found " + topic )
+            found = True
+            
+        wildcards = Pub.wildcards
+        if wildcards:
+            for prefix, receiver in wildcards:
+                if topic.startswith(prefix):
+                    receiver(message)
+                    found = True
+        if found and metrics.enabled:
+            metrics.inc('scratchclient_publish_total', (('topic', topic),) )
+        if traced and found:
+            tracing.complete('publish', 'pubsub', t0, { 'topic': topic })
+        return found
@@ -0,0 +1,359 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+#
+# capture and replay of remote sensor protocol sessions
+#
+# capture: proxy between scratchClient and scratch. scratchClient connects to
+#          the proxy port (default 42000), the proxy connects to scratch
+#          (default 42001). Each record is written to the log with time
+#          and direction.
+#
+#              python rspCapture.py capture -o session.rsp
+#              python scratchClient.py -port 42000 ...
+#
+# replay:  plays scratch for a scratchClient. The records scratch sent are
+#          sent again, at the captured pace (-speed 1), N times faster
+#          (-speed N) or as fast as possible (-speed 0). Arguments after '--'
+#          start a scratchClient connecting to the replay port.
+#
+#              python rspCapture.py replay session.rsp -speed 0 -- -C config/config_xy.xml
+#
+# dump:    print a log as text.
+#
+# log format: header b'RSPCAP1\n', then per record
+#     time [microseconds since capture start, monotonic], 8 bytes big endian
+#     direction, 1 byte: 0 from scratch, 1 to scratch, 2 new connection
+#     length, 4 bytes big endian, followed by the record without length header
+#
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import select
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import protocol
+
+MAGIC = b'RSPCAP1\n'
+
+FROM_SCRATCH = 0
+TO_SCRATCH = 1
+CONNECT = 2
+
+DIRECTIONS = { FROM_SCRATCH: '<', TO_SCRATCH: '>', CONNECT: '*' }
+
+_ENTRY = struct.Struct('>QBI')
+
+try:
+    clock = time.monotonic
+except AttributeError:
+    clock = time.time
+
+class CaptureWriter:
+    """writes records with time relative to creation and direction"""
+
+    def __init__(self, fileName):
+        self.file = open(fileName, 'wb')
+        self.file.write(MAGIC)
+        self.t0 = clock()
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def write(self, direction, record):
+        t = int( (clock() - self.t0) * 1000000 )
+        with self._lock:
+            self.file.write( _ENTRY.pack(t, direction, len(record)) )
+            self.file.write( record )
+            self.count += 1
+
+    def flush(self):
+        with self._lock:
+            self.file.flush()
+
+    def close(self):
+        with self._lock:
+            self.file.close()
+
+def readCapture(fileName):
+    """list of (time [sec], direction, record as bytes)"""
+    entries = []
+    with open(fileName, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("{f:s} is no capture file".format(f=fileName))
+    pos = len(MAGIC)
+    while pos + _ENTRY.size <= len(data):
+        t, direction, n = _ENTRY.unpack_from(data, pos)
+        pos += _ENTRY.size
+        if pos + n > len(data):
+            # truncated by an aborted capture
+            break
+        entries.append( (t / 1000000.0, direction, data[pos:pos+n]) )
+        pos += n
+    return entries
+
+# --------------------------------------------------------------------------------------
+# capture
+#
+class CaptureProxy:
+    """forwards the connections from scratchClient to scratch and logs each record"""
+
+    def __init__(self, writer, listenPort, scratchHost, scratchPort):
+        self.writer = writer
+        self.scratch = (scratchHost, scratchPort)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('', listenPort))
+        self.server.listen(5)
+        # socket --> (peer socket, RecordReader, direction of data received)
+        self.channel = {}
+
+    def run(self):
+        lastFlush = clock()
+        while True:
+            inputready, _, _ = select.select( [self.server] + list(self.channel.keys()), [], [], 1.0 )
+            for s in inputready:
+                if s is self.server:
+                    self.accept()
+                elif s in self.channel:
+                    self.receive(s)
+            if clock() - lastFlush > 1.0:
+                self.writer.flush()
+                lastFlush = clock()
+
+    def accept(self):
+        client, address = self.server.accept()
+        try:
+            scratch = socket.create_connection(self.scratch)
+        except socket.error as e:
+            print("no connection to scratch", self.scratch, e)
+            client.close()
+            return
+        for s in (client, scratch):
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        print(address, "connected")
+        self.writer.write(CONNECT, b'')
+        self.channel[client] = (scratch, protocol.RecordReader(), TO_SCRATCH)
+        self.channel[scratch] = (client, protocol.RecordReader(), FROM_SCRATCH)
+
+    def receive(self, s):
+        peer, reader, direction = self.channel[s]
+        try:
+            data = s.recv(protocol.BUFFER_SIZE)
+        except socket.error:
+            data = b''
+        if len(data) == 0:
+            print("connection closed")
+            for x in (s, peer):
+                del self.channel[x]
+                x.close()
+            return
+        # forward what was received, records may be incomplete
+        peer.sendall(data)
+        reader.feed(data)
+        for record in reader.records():
+            self.writer.write(direction, record.tobytes())
+
+def capture(options):
+    writer = CaptureWriter(options.output)
+    proxy = CaptureProxy(writer, options.port, options.host, options.scratchPort)
+    print("capture to {f:s}, scratchClient connects to port {p:d}, scratch at {h:s}:{s:d}".format(
+            f=options.output, p=options.port, h=options.host, s=options.scratchPort))
+    try:
+        proxy.run()
+    except KeyboardInterrupt:
+        pass
+    writer.close()
+    print("{n:d} records captured".format(n=writer.count))
+    return 0
+
+# --------------------------------------------------------------------------------------
+# replay
+#
+class Receiver(threading.Thread):
+    """counts the records scratchClient sends"""
+
+    def __init__(self, connection, writer = None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.connection = connection
+        self.writer = writer
+        self.records = 0
+        self.bytes = 0
+
+    def run(self):
+        reader = protocol.RecordReader()
+        try:
+            while True:
+                n = reader.recv(self.connection)
+                if n == 0:
+                    break
+                self.bytes += n
+                for record in reader.records():
+                    self.records += 1
+                    if self.writer != None:
+                        self.writer.write(TO_SCRATCH, record.tobytes())
+        except socket.error:
+            pass
+
+def startScratchClient(port, clientArgs):
+    src = os.path.dirname( os.path.abspath(__file__) )
+    args = [ sys.executable, os.path.join(src, 'scratchClient.py'),
+             '-nogui', '-singletonNONE',
+             '-host', '127.0.0.1', '-port', str(port) ] + clientArgs
+    devnull = open(os.devnull, 'w')
+    return subprocess.Popen(args, cwd=src, stdout=devnull, stderr=subprocess.STDOUT)
+
+def replay(options, clientArgs):
+    entries = readCapture(options.input)
+    records = [ (t, record) for t, direction, record in entries if direction == FROM_SCRATCH ]
+    captured = len( [ e for e in entries if e[1] == TO_SCRATCH ] )
+    if len(records) == 0:
+        print("no records from scratch in", options.input)
+        return 1
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', options.port))
+    server.listen(1)
+    port = server.getsockname()[1]
+
+    client = None
+    if clientArgs:
+        client = startScratchClient(port, clientArgs)
+    else:
+        print("waiting for scratchClient on port", port)
+    server.settimeout(60)
+    try:
+        connection, _ = server.accept()
+    except socket.timeout:
+        print("scratchClient did not connect")
+        return 1
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    writer = None
+    if options.output != None:
+        writer = CaptureWriter(options.output)
+        writer.write(CONNECT, b'')
+    receiver = Receiver(connection, writer)
+    receiver.start()
+    # adapters are activated after connect
+    time.sleep(options.wait)
+
+    first = records[0][0]
+    lateMax = 0.0
+    late = 0
+    t0 = clock()
+    try:
+        for t, record in records:
+            if options.speed > 0:
+                delay = t0 + (t - first) / options.speed - clock()
+                if delay > 0:
+                    time.sleep(delay)
+                elif -delay > lateMax:
+                    lateMax = -delay
+                if delay < -0.001:
+                    late += 1
+            connection.sendall( protocol.encode(record) )
+        duration = clock() - t0
+        time.sleep(options.settle)
+    finally:
+        connection.close()
+        if writer != None:
+            writer.close()
+        if client != None:
+            client.terminate()
+            for _ in range(50):
+                if client.poll() != None:
+                    break
+                time.sleep(0.1)
+            else:
+                client.kill()
+
+    result = { 'records_sent': len(records),
+               'duration_sec': duration,
+               'captured_duration_sec': records[-1][0] - first,
+               'rate': len(records) / duration if duration > 0 else None,
+               'late_records': late,
+               'late_max_ms': lateMax * 1000.0,
+               'records_received': receiver.records,
+               'records_received_captured': captured,
+               'bytes_received': receiver.bytes }
+    for key in sorted(result.keys()):
+        print("{k:>26s} {v}".format(k=key, v=result[key]))
+    if options.json != None:
+        with open(options.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+# --------------------------------------------------------------------------------------
+# dump
+#
+def dump(options):
+    for t, direction, record in readCapture(options.input):
+        print("{t:12.6f} {d:s} {r:s}".format(t=t, d=DIRECTIONS.get(direction, '?'), r=record.decode('utf-8', 'replace')))
+    return 0
+
+def main():
+    argv = sys.argv[1:]
+    clientArgs = []
+    if '--' in argv:
+        clientArgs = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+
+    parser = argparse.ArgumentParser(prog='python rspCapture.py', description='capture and replay remote sensor protocol sessions')
+    commands = parser.add_subparsers(dest='command')
+
+    p = commands.add_parser('capture', help='proxy between scratchClient and scratch, writing a log')
+    p.add_argument('-o', dest='output', required=True, help='log file')
+    p.add_argument('-port', type=int, default=42000, help='port for scratchClient, default 42000')
+    p.add_argument('-host', default='127.0.0.1', help='scratch host, default 127.0.0.1')
+    p.add_argument('-scratchPort', type=int, default=42001, help='scratch port, default 42001')
+
+    p = commands.add_parser('replay', help='play scratch for a scratchClient; arguments after -- start a scratchClient')
+    p.add_argument('input', help='log file')
+    p.add_argument('-speed', type=float, default=1.0, help='1 as captured, N times faster, 0 as fast as possible')
+    p.add_argument('-port', type=int, default=42001, help='port for scratchClient, default 42001, 0 any free port')
+    p.add_argument('-wait', type=float, default=1.0, help='seconds after connect before replay starts')
+    p.add_argument('-settle', type=float, default=1.0, help='seconds to wait for records from scratchClient after replay')
+    p.add_argument('-o', dest='output', default=None, help='log the records received from scratchClient')
+    p.add_argument('-json', default=None, help='write result as json')
+
+    p = commands.add_parser('dump', help='print a log as text')
+    p.add_argument('input', help='log file')
+
+    options = parser.parse_args(argv)
+    if options.command == 'capture':
+        return capture(options)
+    if options.command == 'replay':
+        if clientArgs and options.port == 42001:
+            options.port = 0
+        return replay(options, clientArgs)
+    if options.command == 'dump':
+        return dump(options)
+    parser.print_help()
+    return 1
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,184 @@
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+#
+# periodic tasks for polling adapters, switch -scheduler <threads>
+#
+# Instead of one thread per adapter sleeping in delay(), the adapters
+# implementing poll() register a task with their poll.interval. A small
+# number of threads run the tasks from a heap of absolute deadlines; the next
+# deadline is the last one plus the interval, so the period does not drift
+# with the execution time. Missed deadlines are skipped and counted, not
+# caught up.
+# A task with interval None runs once after its delay, as the delayed values
+# of the output_value filters in adapter/adapters.py and the debounce of
+# gpio/edge.py. These run on shared(), one thread started on first use,
+# when there is no scheduler of switch -scheduler.
+#
+
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+debug = False
+
+try:
+    clock = time.monotonic
+except AttributeError:
+    clock = time.time
+
+class Task:
+    """a periodic callback, or a single call when interval is None"""
+
+    def __init__(self, scheduler, interval, callback, name):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.callback = callback
+        self.name = name
+        self.deadline = 0
+        self.cancelled = False
+        # deadlines skipped as the task was late
+        self.missed = 0
+        # set while not running
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def cancel(self):
+        """no more calls after return, except when called from the callback itself"""
+        self.cancelled = True
+        self.scheduler._wakeup()
+        if not self.scheduler.isWorker():
+            if not self._idle.wait(1.0):
+                logger.debug("%s: task still running after cancel", self.name)
+
+class Scheduler:
+    """runs periodic tasks in a pool of threads. Used like the hardware
+       managers: setActive(True) starts the threads, setActive(False) stops them."""
+
+    def __init__(self, threads = 1):
+        self.threads = threads
+        self._condition = threading.Condition(threading.Lock())
+        # (deadline, sequence, task)
+        self._heap = []
+        self._sequence = 0
+        self._workers = []
+        self._stopped = True
+
+    def setActive(self, state):
+        if state:
+            self.start()
+        else:
+            self.stop()
+
+    def start(self):
+        with self._condition:
+            if not self._stopped:
+                return
+            self._stopped = False
+            for i in range(self.threads):
+                worker = threading.Thread(target=self._run, name='scheduler-{n:d}'.format(n=i))
+                worker.daemon = True
+                self._workers.append(worker)
+                worker.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(1)
+        self._workers = []
+
+    def isWorker(self):
+        return threading.current_thread() in self._workers
+
+    def schedule(self, interval, callback, name = None, delay = None):
+        """call callback every interval seconds, first after delay (default interval).
+           With interval None, callback is called once after delay."""
+        task = Task(self, interval, callback, name or str(callback))
+        if delay == None:
+            delay = interval
+        with self._condition:
+            task.deadline = clock() + delay
+            self._push(task)
+            self._condition.notify()
+        return task
+
+    def _push(self, task):
+        self._sequence += 1
+        heapq.heappush( self._heap, (task.deadline, self._sequence, task) )
+
+    def _wakeup(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def _run(self):
+        logger.debug("%s thread started", threading.current_thread().name)
+        condition = self._condition
+        heap = self._heap
+        condition.acquire()
+        try:
+            while not self._stopped:
+                if not heap:
+                    condition.wait(1.0)
+                    continue
+                deadline, _, task = heap[0]
+                if task.cancelled:
+                    heapq.heappop(heap)
+                    continue
+                wait = deadline - clock()
+                if wait > 0:
+                    condition.wait(wait)
+                    continue
+                heapq.heappop(heap)
+                task._idle.clear()
+                condition.release()
+                try:
+                    try:
+                        task.callback()
+                    except Exception as e:
+                        logger.error("%s: %s", task.name, e)
+                finally:
+                    condition.acquire()
+                    task._idle.set()
+
+                if task.cancelled or task.interval == None:
+                    continue
+                task.deadline += task.interval
+                now = clock()
+                if task.deadline <= now:
+                    skip = int( (now - task.deadline) / task.interval ) + 1
+                    task.missed += skip
+                    task.deadline += skip * task.interval
+                self._push(task)
+        finally:
+            condition.release()
+        logger.debug("%s thread terminated", threading.current_thread().name)
+
+# scheduler for one-shot tasks, see shared()
+_shared = None
+_sharedLock = threading.Lock()
+
+def shared():
+    """one scheduler thread for short one-shot tasks, started on first use"""
+    global _shared
+    with _sharedLock:
+        if _shared == None:
+            _shared = Scheduler(threads = 1)
+            _shared.setActive(True)
+        return _shared
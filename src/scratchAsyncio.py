@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+#
+# network core for the scratch connection, used with -asyncio (python 3.5 or later)
+#
+# One event loop in one thread owns the socket: connect and reconnect with 
+# backoff, reading the records and sending the updates queued by the 
+# adapters in ScratchSender. A closed connection is detected immediately, 
+# there is no socket timeout polling.
+#
+
+import asyncio
+import logging
+import socket
+import threading
+
+import protocol
+import tracing
+import profiling
+
+logger = logging.getLogger(__name__)
+
+debug = False
+
+class AsyncioConnection(threading.Thread):
+    """scratch connection driven by an asyncio event loop.
+       client: needs setAdaptersActive(bool)
+       sender: ScratchSender, used for queueing, merging and statistics only;
+               sender.traffic counts records and bytes. 
+       processRecord: called with each received record as str"""
+    
+    CONNECT_TIMEOUT = 1.0
+    BACKOFF_MIN = 0.05
+    BACKOFF_MAX = 2.0
+    
+    def __init__(self, client, host, port, sender, processRecord, bufferSize = protocol.BUFFER_SIZE):
+        threading.Thread.__init__(self)
+        self.setName("scratchAsyncio")
+        self.client = client
+        self.host = host
+        self.port = int(port)
+        self.sender = sender
+        self.processRecord = processRecord
+        self.bufferSize = bufferSize
+        
+        self.loop = None
+        self._stopped = False
+        self._stopEvent = None
+        self._wake = None
+        self._notified = False
+        
+    def stop(self):
+        self._stopped = True
+        loop = self.loop
+        if loop != None and self._stopEvent != None:
+            try:
+                loop.call_soon_threadsafe(self._stopEvent.set)
+            except RuntimeError:
+                # loop already closed
+                pass
+
+    def stopped(self):
+        return self._stopped
+    
+    def notify(self):
+        """called by adapter threads after an update is queued"""
+        if self._notified:
+            return
+        self._notified = True
+        try:
+            self.loop.call_soon_threadsafe(self._wake.set)
+        except (AttributeError, RuntimeError):
+            # loop not yet or no longer running
+            self._notified = False
+        
+    def run(self):
+        logger.debug("%s thread started", self.getName() )
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete( self._main() )
+        finally:
+            self.loop.close()
+        logger.debug("%s thread terminated", self.getName() )
+        
+    async def _main(self):
+        self._stopEvent = asyncio.Event()
+        self._wake = asyncio.Event()
+        self.sender.notify = self.notify
+        if self._stopped:
+            return
+        
+        backoff = self.BACKOFF_MIN
+        count = 0
+        while not self._stopped:
+            try:
+                reader, writer = await asyncio.wait_for( asyncio.open_connection(self.host, self.port), self.CONNECT_TIMEOUT )
+            except (OSError, asyncio.TimeoutError) as e:
+                if count == 0:
+                    logger.warn( "There was an error connecting to Scratch! %s", e )
+                    # in german for the kids in school:
+                    logger.warn( "  Unterstuetzung fuer Netzwerksensoren einschalten!" )
+                    logger.warn( "  Activate remote sensor connections!" )
+                    logger.info( "  No Mesh session at host: %s, port: %s" , self.host, self.port) 
+                count = (count + 1) % 40
+                await self._sleep(backoff)
+                backoff = min(backoff * 2, self.BACKOFF_MAX)
+                continue
+            
+            backoff = self.BACKOFF_MIN
+            count = 0
+            self.sender.traffic.connects += 1
+            logger.info('Connected to Scratch !')
+            writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            
+            # updates queued while disconnected are outdated
+            self._notified = False
+            self.sender.dropped += len( self.sender.takeBatch() )
+            self.client.setAdaptersActive(True)
+            
+            receiving = asyncio.ensure_future( self._receive(reader) )
+            sending = asyncio.ensure_future( self._send(writer) )
+            stopping = asyncio.ensure_future( self._stopEvent.wait() )
+            
+            await asyncio.wait( [receiving, sending, stopping], return_when=asyncio.FIRST_COMPLETED )
+            
+            for task in (receiving, sending, stopping):
+                task.cancel()
+            writer.close()
+            # let the tasks finish their cancellation
+            await asyncio.sleep(0)
+            
+            if not self._stopped:
+                logger.info("Scratch disconnected")
+                self.client.setAdaptersActive(False)
+                
+        self.sender.notify = None
+        
+    async def _sleep(self, t):
+        """sleep, but wake up on stop"""
+        try:
+            await asyncio.wait_for( self._stopEvent.wait(), t )
+        except asyncio.TimeoutError:
+            pass
+        
+    async def _receive(self, reader):
+        records = protocol.RecordReader(self.bufferSize)
+        traffic = self.sender.traffic
+        while True:
+            data = await reader.read(self.bufferSize)
+            if len(data) == 0:
+                return
+            if profiling.enabled:
+                profiling.checkpoint()
+            records.feed(data)
+            if tracing.enabled:
+                tracing.instant('receive', 'rsp', { 'bytes': len(data) })
+            received = records.records()
+            traffic.bytesReceived += len(data)
+            traffic.recordsReceived += len(received)
+            for record in received:
+                try:
+                    self.processRecord( protocol.decode(record) )
+                except Exception as e:
+                    logger.warn(e)
+            
+    async def _send(self, writer):
+        sender = self.sender
+        traffic = sender.traffic
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if sender.sendWindow > 0:
+                await asyncio.sleep(sender.sendWindow)
+                
+            self._notified = False
+            batch = sender.takeBatch()
+            if len(batch) == 0:
+                continue
+            
+            records = sender.records(batch)
+            data = b''.join( [ protocol.encode(record) for record in records ] )
+            if tracing.enabled:
+                tracing.instant('send', 'rsp', { 'records': len(records), 'bytes': len(data) })
+            writer.write( data )
+            traffic.recordsSent += len(records)
+            traffic.bytesSent += len(data)
+            try:
+                # when scratch reads slowly, wait here; adapters continue to 
+                # queue resp. coalesce their updates.
+                await writer.drain()
+            except (OSError, ConnectionError) as e:
+                logger.info(e)
+                sender.dropped += len(batch)
+                return
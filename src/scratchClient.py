@@ -40,6 +40,32 @@
 # changes:
 # 
 changes = [
+'2026-10-18 -profile with python 3.12+: cProfile allows one profiler at a time, which sees all threads; one profile of all threads is written to <file>.all.prof at exit and on write in the web gui.',
+'2026-10-18 I2CManager: one handle per bus behind a lock, block transfers with the I2C_RDWR ioctl, per device metrics scratchclient_i2c_*; fake bus i2c.TEST_i2c.',
+'2026-10-18 SPIManager bus arbiter: devices opened once and shared, transactions serialized per bus, mode and speed written on change only, per device metrics scratchclient_spi_*; SPIAdapter uses the shared device; stand-in spi.TEST_spidev.',
+'2026-10-18 adapter.adc.ADC_Scan_Input, all channels of a MCP3008 or MCP3202 read in one pass by SPIManager.scan(), one thread per chip.',
+'2026-10-18 scratchSender: -priority, broadcasts and output_value with priority=high are sent ahead of queued value updates, each lane in order; output and output_value attribute priority (high, normal); counter of preferred updates.',
+'2026-10-18 executor for blocking adapter work, switch -executor <n>: Linux_Adapter, Linux_APLAY_Adapter, Festival_Adapter, Pico2Wave_Adapter, Openweathermap_Adapter, Twitter_Adapter submit os commands and web requests instead of an own queue thread; per adapter executor.concurrency and queue.max, queue.duplicate drop or merge, metrics per adapter.',
+'2026-10-18 GPIOEncoder decodes on edges with a transition table, counts invalid transitions, sends the position at most each 0.02 sec.',
+'2026-10-18 gpio inputs GpioInput, GpioValueInput, GpioButtonInput, GpioEventInput read on edges when poll.interval is absent or event, parameter debounce.time; edge callbacks in the gpio managers, scripted edges in TEST_GPIOManager.',
+'2026-10-18 Adapter.delay waits on the stop event instead of 0.1 sec slices; periodic() iterates with absolute deadlines, used by the poll.interval loops.',
+'2026-10-18 scheduler for polling adapters, switch -scheduler <n>: adapters implementing poll() are called from n threads with drift free deadlines instead of one thread each.',
+'2026-10-18 rspCapture.py: capture proxy writing a binary log of RSP records with time and direction, replay of a log at captured pace, N times faster or max speed.',
+'2026-10-18 -profile <file>: per thread profiles of scratchClient and adapter threads, control in web gui.',
+'2026-10-18 event tracing into a ring buffer, -trace <file>, dump in chrome trace format on SIGUSR1 or from web gui.',
+'2026-10-18 poll loop statistics for adapters with poll.interval: period, jitter, overruns; web page /poll, metrics, switch -pollreport.',
+'2026-10-18 runtime metrics on /metrics (prometheus text format) and /metrics.json: records, bytes, connects, publish count per topic, adapter handler time, queue depths. Per message metrics are collected only while scraped.',
+'2026-10-18 sensor-update: unchanged values not published (parameter input_value.repeat to opt out), unknown names counted instead of logged.',
+'2026-10-18 benchmark.roundtrip: stand-in scratch server, ping-pong round trip latency and sustained rate, json results.',
+'2026-10-18 -asyncio: one event loop owns scratch connection, reconnect with backoff and sending of queued updates.',
+'2026-10-18 output_value attributes min.interval, max.rate, deadband, dedupe reduce value updates for all adapters.',
+'2026-10-18 scratchSender: -coalesce, newest queued value per variable wins; counters for coalesced and dropped updates.',
+'2026-10-18 scratchSender: outbound queue and sender thread, value updates within -sendWindow merged into one sensor-update record.',
+'2026-10-18 protocol: RecordReader, shared record framing with bytearray/recv_into for scratchListener, remote adapter and bridge.',
+'2026-10-18 protocol: name value and broadcast parsers use compiled regular expressions instead of a per-char state machine.',
+'2026-10-18 adapter resolveCommand/resolveValue: scratch names indexed by dictionary, one subscription per name.',
+'2026-10-18 adapter send/sendValue: output methods bound to precomputed emitters at configuration, no inspect.stack() on each event.',
+'2026-10-18 publish-subscribe: topics indexed by dictionary, prefix subscriptions; web gui uses one subscription per message type.',
 '2017-05-27 lirc IR receive adapter.',
 '2017-04-22 openweathermap api, added possibility to set location.',
 '2017-04-21 sonicpi-adapter added',
@@ -159,7 +185,6 @@ changes = [
 
 # --------------------------------------------------------------------------------------------
 from array import *
-import server.scratchClientServer
 
 from adapter.adapters import GPIOAdapter
 from adapter.adapters import SPIAdapter
@@ -177,6 +202,11 @@ import publishSubscribe
 import logging
 import logging.config
 import protocol
+import metrics
+import tracing
+import profiling
+import scheduler
+import executor
 import os
 import os.path
 import helper.abstractQueue
@@ -184,6 +214,7 @@ import helper.abstractQueue
 if sys.platform.startswith('linux'):
     import grp
 
+import collections
 import re
 import signal
 import socket
@@ -225,9 +256,41 @@ web gui switches
 -guiRemote           allows remote access to GUI web page, 
                      default is local access only
 
+performance switches
+
+-sendWindow <ms>     value updates to scratch arriving within this time are 
+                     merged into one sensor-update record, default 5ms.
+                     0 sends immediately what is queued.
+-coalesce            when scratch reads slowly, only the newest queued value 
+                     of a variable is sent. Broadcasts are never dropped.
+-priority            broadcasts and output_values with priority='high' are 
+                     sent ahead of queued value updates. Broadcasts with 
+                     priority='normal' keep their order with the values.
+-asyncio             one asyncio event loop handles the scratch connection, 
+                     reconnect and sending (python 3.5 or later).
+-scheduler <n>       adapters with poll.interval implementing poll() are 
+                     called by <n> scheduler threads instead of running an
+                     own thread each. Adapters without poll() keep their
+                     thread.
+-executor <n>        threads for blocking adapter work like os commands, 
+                     speech output, web requests. Default 2.
+
 debug and test switches
 
 -validate            Validate config and terminate.
+-pollreport          print loop period, jitter and overruns of the polling 
+                     adapters on shutdown.
+-trace <file>        trace events from socket to adapters and back into a 
+                     ring buffer from start. The buffer is written to file in 
+                     chrome trace format on signal SIGUSR1, default file 
+                     scratchClient.trace.json. Tracing can also be started, 
+                     stopped and downloaded in the web gui.
+-profile <file>      profile the threads of scratchClient and the adapters. 
+                     Stats are written per thread to <file>.<thread>.prof 
+                     when the thread ends. With python 3.12+, one profile 
+                     of all threads is written to <file>.all.prof at exit.
+                     Profiling can be stopped, started and written in the 
+                     web gui.
 
 -h
 -help                print command line usage and exit
@@ -254,8 +317,16 @@ DEFAULT_PIDFILENAME = 'scratchClient.pid'
 
 DEFAULT_SINGLETON = 'IPC'
 
-BUFFER_SIZE = 240 #used to be 100
+# worker threads for blocking adapter work, started on demand
+DEFAULT_EXECUTOR_THREADS = 2
+
+# initial receive buffer size, grows for large records. Used to be 100, 240
+BUFFER_SIZE = 4096
 SOCKET_TIMEOUT = 2
+# value updates arriving within this time [sec] are sent in one record
+SEND_WINDOW = 0.005
+# start a new sensor-update record when exceeding this size [chars]
+SEND_RECORD_SIZE = 4096
 
 verbose = False
 debug = False
@@ -273,6 +344,15 @@ singletonFlag = DEFAULT_SINGLETON
 
 pidFileName = DEFAULT_PIDFILENAME
 
+sendWindow = SEND_WINDOW
+coalesce = False
+priority = False
+useAsyncio = False
+pollReport = False
+schedulerThreads = 0
+executorThreads = DEFAULT_EXECUTOR_THREADS
+traceFileName = 'scratchClient.trace.json'
+
 gpl2 = """
  Copyright (C) 2013, 2017  Gerhard Hepp
 
@@ -294,12 +374,50 @@ runIt = True
 import environment        
 
 class ScratchSender(threading.Thread):
+    """values and broadcasts are queued by the adapter threads. The sender 
+       thread collects them for a short time window and merges consecutive 
+       value updates into one 'sensor-update'-record. Broadcasts keep their 
+       order relative to the value updates.
+       With coalesce, a value update replaces a queued, not yet sent value 
+       for the same name. Broadcasts are never coalesced, and values are not 
+       coalesced across a broadcast.
+       With priority, there are two lanes: broadcasts and values configured 
+       priority='high' are sent ahead of the other, bulk value updates queued 
+       at the same time; between two bulk records, high priority updates 
+       queued meanwhile are sent first. Each lane keeps its order. Broadcasts
+       configured priority='normal' stay in order with the bulk values."""
     
-    def __init__(self):
+    VALUE = 0
+    COMMAND = 1
+    # flag in kind, high priority lane
+    HIGH = 2
+    
+    scratch_socket = None
+    # called after an update is queued, for a sender loop not run by this thread
+    notify = None
+    
+    def __init__(self, sendWindow = SEND_WINDOW, coalesce = False, traffic = None, priority = False):
         threading.Thread.__init__(self)
         self.setName("scratchSender")
         self._stopEvent = threading.Event()
         self._lock = threading.Lock()
+        self.queue = helper.abstractQueue.AbstractQueue()
+        # time in seconds to collect updates before sending
+        self.sendWindow = sendWindow
+        
+        self.coalesce = coalesce
+        self.priority = priority
+        # queued value entries since last broadcast, name --> entry
+        self._pending = {}
+        self._pendingLock = threading.Lock()
+        # statistics
+        self.coalesced = 0
+        self.dropped = 0
+        # high priority updates sent ahead of queued bulk values
+        self.preferred = 0
+        if traffic == None:
+            traffic = protocol.Traffic()
+        self.traffic = traffic
         
         #publishSubscribe.Pub.subscribe('scratch.output.value', self.sendValue)
         #publishSubscribe.Pub.subscribe('scratch.output.command', self.send)
@@ -308,97 +426,303 @@ class ScratchSender(threading.Thread):
         self._stopEvent.set()
 
     def stopped(self):
+        if profiling.enabled:
+            profiling.checkpoint()
         return self._stopEvent.isSet()
 
     def setSocket(self, socket):
         self.scratch_socket = socket
         
-        
     def run(self):
-        pass
-
-    def sendValue(self, message):
-        """send a 'sensor-update'"""
+        logger.debug("%s thread started", self.getName() )
+        
+        while not self.stopped():
+            try:
+                first = self.queue.get(True, 0.1)
+            except helper.abstractQueue.AbstractQueue.Empty:
+                continue
+            
+            if self.sendWindow > 0:
+                time.sleep(self.sendWindow)
+            
+            batch = self.takeBatch( [first] )
+            if self.priority:
+                self.sendPriority(batch)
+            elif not self.send_scratch_records( self.merge(batch) ):
+                self.dropped += len(batch)
+            
+        logger.debug("%s thread terminated, coalesced %d, dropped %d", self.getName(), self.coalesced, self.dropped )
+        
+    def takeBatch(self, batch = None):
+        """all queued updates, appended to batch"""
+        if batch == None:
+            batch = []
+        try:
+            while True:
+                batch.append( self.queue.get(False) )
+        except helper.abstractQueue.AbstractQueue.Empty:
+            pass
         
-        bcast_str = 'sensor-update "' + message['name'] + '" ' +  message['value']
+        if self.coalesce:
+            # from now on, updates need a new entry
+            self._pendingLock.acquire()
+            try:
+                for entry in batch:
+                    if self._pending.get(entry[1]) is entry:
+                        del self._pending[entry[1]]
+            finally:
+                self._pendingLock.release()
+        return batch
+        
+    def getStatistics(self):
+        return { 'queued': self.queue.qsize(), 'coalesced': self.coalesced, 'dropped': self.dropped, 'preferred': self.preferred }
+        
+    def split(self, batch, bulkAhead = False):
+        """high priority and bulk updates of a batch, each in queue order. 
+        bulkAhead: bulk records are waiting from a previous batch"""
+        high = []
+        bulk = []
+        for entry in batch:
+            if entry[0] & self.HIGH:
+                if bulk or bulkAhead:
+                    self.preferred += 1
+                high.append(entry)
+            else:
+                bulk.append(entry)
+        return high, bulk
+        
+    def records(self, batch):
+        """records for a batch, high priority first when priority is set"""
+        if not self.priority:
+            return self.merge(batch)
+        high, bulk = self.split(batch)
+        return self.merge(high) + self.merge(bulk)
+        
+    def sendPriority(self, batch):
+        """send the high priority records of the batch, then the bulk records
+        one by one. Before each bulk record, the queue is checked for new high 
+        priority updates."""
+        high, bulk = self.split(batch)
+        bulkRecords = collections.deque( self.merge(bulk) )
+        count = len(batch)
+        while True:
+            records = self.merge(high)
+            if bulkRecords:
+                records.append( bulkRecords.popleft() )
+            if not records:
+                return
+            if not self.send_scratch_records( records ):
+                self.dropped += count
+                return
+            if not bulkRecords:
+                return
+            batch = self.takeBatch()
+            count += len(batch)
+            high, bulk = self.split(batch, True)
+            bulkRecords.extend( self.merge(bulk) )
+            
+    def merge(self, batch):
+        """records for a batch of queued updates, in order of the updates"""
+        records = []
+        pairs = []
+        size = 0
+        for kind, name, value in batch:
+            if not kind & self.COMMAND:
+                pair = '"' + name + '" ' + value
+                if size + len(pair) > SEND_RECORD_SIZE and pairs:
+                    records.append( 'sensor-update ' + ' '.join(pairs) )
+                    pairs = []
+                    size = 0
+                pairs.append( pair )
+                size += len(pair) + 1
+            else:
+                if pairs:
+                    records.append( 'sensor-update ' + ' '.join(pairs) )
+                    pairs = []
+                    size = 0
+                records.append( 'broadcast "{name:s}"'.format( name= name ) )
+        if pairs:
+            records.append( 'sensor-update ' + ' '.join(pairs) )
+        return records
+        
+    def sendValue(self, message, high = False):
+        """queue a 'sensor-update'"""
         if logger.isEnabledFor(logging.INFO):
-            logger.info('ScratchSender, send value: %s' , bcast_str)
+            logger.info('ScratchSender, send value: sensor-update "%s" %s' , message['name'], message['value'])
+        if tracing.enabled:
+            tracing.instant('queue', 'sender', message)
         
-        self.send_scratch(bcast_str)
+        kind = self.VALUE
+        if high:
+            kind |= self.HIGH
+        if self.coalesce:
+            name = message['name']
+            self._pendingLock.acquire()
+            try:
+                entry = self._pending.get(name)
+                if entry != None:
+                    entry[2] = message['value']
+                    self.coalesced += 1
+                    return
+                entry = [kind, name, message['value']]
+                self._pending[name] = entry
+                self.queue.put( entry )
+            finally:
+                self._pendingLock.release()
+        else:
+            self.queue.put( (kind, message['name'], message['value']) )
+        if self.notify != None:
+            self.notify()
 
-    def sendCommand(self, message):
-        """send a 'broadcast'"""
-        bcast_str = 'broadcast "{name:s}"'.format( name= message['name'] )
+    def sendHighValue(self, message):
+        """queue a 'sensor-update' in the high priority lane"""
+        self.sendValue(message, True)
+        
+    def sendCommand(self, message, high = True):
+        """queue a 'broadcast'"""
         if logger.isEnabledFor(logging.INFO):
-            logger.info('ScratchSender, send broadcast: %s', bcast_str)
+            logger.info('ScratchSender, send broadcast: broadcast "%s"', message['name'])
+        if tracing.enabled:
+            tracing.instant('queue', 'sender', message)
         
-        self.send_scratch(bcast_str)
+        kind = self.COMMAND
+        if high:
+            kind |= self.HIGH
+        if self.coalesce:
+            self._pendingLock.acquire()
+            try:
+                self._pending.clear()
+                self.queue.put( (kind, message['name'], None) )
+            finally:
+                self._pendingLock.release()
+        else:
+            self.queue.put( (kind, message['name'], None) )
+        if self.notify != None:
+            self.notify()
 
+    def sendNormalCommand(self, message):
+        """queue a 'broadcast' in order with the bulk values"""
+        self.sendCommand(message, False)
+
+    def send_scratch_records(self, records):
+        """send records with one socket call"""
+        return self.send_raw( b''.join( [ protocol.encode(record) for record in records ] ), len(records) )
+        
     def send_scratch(self, cmd):
+        """send one record immediately, bypassing the queue"""
+        return self.send_raw( protocol.encode(cmd) )
+        
+    def send_raw(self, data, records = 1):
         """this method will be used by multiple threads, so synchronizing
         looks reasonable. Missing synchronization could explain sporadic
         scratch breakdowns."""
+        traced = tracing.enabled
+        if traced:
+            t0 = tracing.clock()
         self._lock.acquire()
         try:
-            # cmd is a str
-            # in python3, use following code
-            if True:
-                
-                if sys.version_info.major == 2:
-                    try:
-                        c = bytearray(cmd)
-                    except TypeError as e:
-                        logger.error(e)
-                        c = bytearray(cmd, 'utf-8' )
-                        
-                    n = len( c )
-                if sys.version_info.major >= 3:
-                    c = bytes( cmd, 'utf-8' )
-                    n = len( c )
-    
-                a = array('B')
-                # convert len to the first four bytes
-                a.append(((n >> 24) & 0xFF))
-                a.append(((n >> 16) & 0xFF))
-                a.append(((n >>  8) & 0xFF))
-                a.append((n & 0xFF))
-                
-                if sys.version_info.major == 2:
-                    a.extend( c )
-                    # print('send a', a)
-                if sys.version_info.major >= 3:
-                    a.frombytes( c )
-                try:
-                    totalsent = 0
-                    while totalsent < len(a):
-                        sent = self.scratch_socket.send(a[totalsent:])
-                        if sent == 0:
-                            scratchClient.event_disconnect()
-                            # TODO: ordentlich alles abbrechen
-                            return
-                        totalsent += sent
-                        
-                except Exception as e:
-                    if logger.isEnabledFor(logging.INFO):
-                        logging.info(e)
-                    pass
-            else:
-                n = len(cmd)
-                a = array('c')
-                a.append(chr((n >> 24) & 0xFF))
-                a.append(chr((n >> 16) & 0xFF))
-                a.append(chr((n >>  8) & 0xFF))
-                a.append(chr(n & 0xFF))
-                
-                try:
-                    self.scratch_socket.send(a.tostring() + cmd)
-                except Exception as e:
-                    if logger.isEnabledFor(logging.INFO):
-                        logging.info(e)
-                    pass
+            try:
+                self.scratch_socket.sendall(data)
+                if traced:
+                    tracing.complete('send', 'rsp', t0, { 'records': records, 'bytes': len(data) })
+                self.traffic.recordsSent += records
+                self.traffic.bytesSent += len(data)
+                return True
+            except Exception as e:
+                if logger.isEnabledFor(logging.INFO):
+                    logging.info(e)
+                return False
         finally:
             self._lock.release()
 
+BROADCAST = 'broadcast'
+SENSOR_UPDATE = 'sensor-update'
+LEN_BROADCAST = len(BROADCAST)
+LEN_SENSOR_UPDATE = len(SENSOR_UPDATE)
+
+class InputValueFilter:
+    """Scratch 1.4 repeats all global variables in each sensor-update. A 
+       value equal to the last received one for the name is not published,
+       except for names in repeatNames, used by adapters which need each 
+       update."""
+    
+    def __init__(self):
+        # name --> last received value
+        self.last = {}
+        self.repeatNames = set()
+        # statistics
+        self.unchanged = 0
+        
+    def reset(self):
+        """a new connection delivers all values again"""
+        self.last = {}
+        
+    def changed(self, name, value):
+        if name in self.repeatNames:
+            return True
+        last = self.last
+        if last.get(name) == value:
+            self.unchanged += 1
+            return False
+        last[name] = value
+        return True
+        
+    def getStatistics(self):
+        return { 'unchanged': self.unchanged, 'unknown': publishSubscribe.Pub.rejected }
+        
+inputValueFilter = InputValueFilter()
+
+traffic = protocol.Traffic()
+
+def processRecord(dataraw):
+    """publish the content of a record received from scratch. 
+       Names nobody subscribed to are not logged, they are counted."""
+    traced = tracing.enabled
+    if traced:
+        t0 = tracing.clock()
+    if  dataraw.startswith(BROADCAST):
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('broadcast in data: %s' , dataraw)
+            
+        broadcastString = dataraw[ LEN_BROADCAST: ]
+        broadcastName = protocol.BroadcastParser(broadcastString ).parse()
+        if traced:
+            tracing.complete('parse', 'rsp', t0, { 'broadcast': broadcastName })
+        
+        publishSubscribe.Pub.offer("scratch.input.command.{name:s}".format(name=broadcastName), { 'name':broadcastName } )
+        # self.commandResolver.resolveBroadcast( broadcastName )
+        
+    elif  dataraw.startswith(SENSOR_UPDATE):
+        #print(dataraw)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug( "sensor-update rcvd %s" , dataraw) 
+        
+        #
+        # data are name value pairs. name always in quotes, values either quotes or not (for numeric values)
+        # String quotes are handled by doubling the quotes.
+        # 
+        nameValueString = dataraw[ LEN_SENSOR_UPDATE: ]
+        # print("parse ", nameValueString)
+        nameValueArray = protocol.NameValueParser(nameValueString ).parse()
+        if traced:
+            tracing.complete('parse', 'rsp', t0, { 'values': len(nameValueArray) })
+        # print(nameValueArray)
+        # for nv in nameValueArray:
+        #    print("single nv = ", nv)
+        for nv in nameValueArray:
+            # print("process single nv = ", nv)
+            # import pdb; pdb.set_trace()
+            if not inputValueFilter.changed(nv[0], nv[1]):
+                continue
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('sensor-update: {name:s}, {value:s}'.format(name=nv[0], value=nv[1]) )
+                
+            publishSubscribe.Pub.offer("scratch.input.value.{name:s}".format(name=nv[0]), { 'name':nv[0], 'value':nv[1] } )
+        # self.commandResolver.resolveValue(nv[0], nv[1])            
+    else:
+        logger.warn("unknown command in received data " + dataraw )
+
 class ScratchListener(threading.Thread):
     
     def __init__(self, socket):
@@ -412,6 +736,8 @@ class ScratchListener(threading.Thread):
         self._stopEvent.set()
 
     def stopped(self):
+        if profiling.enabled:
+            profiling.checkpoint()
         return self._stopEvent.isSet()
 
     def run(self):
@@ -420,260 +746,60 @@ class ScratchListener(threading.Thread):
         logger.debug("scratchListener thread started")
         global scratchClient
         
-        if sys.version_info.major == 2:
-            # 
-            # data is current, aggregated bytes received. From these, records are extracted.
-            #
-            data = ''
-            # 
-            # chunk are bytes arriving from the socket
-            #
-            chunk = ''
-            #
-            # record is a full, interpretable array of bytes. 
-            #
-            record = ''
-            #
-            while not self.stopped():
-                try:
-                    #
-                    # get the bytes from the socket
-                    # This is not necessarily a full record, just some bytes.
-                    # 
-                    chunk =  self.scratch_socket.recv(BUFFER_SIZE) 
-                    
-                    if logger.isEnabledFor( logging.DEBUG):
-                        x =  map(ord, chunk)
-                        s = ''
-                        for xx in x:
-                            s += "{xx:02x} ".format(xx=xx)
-                        logger.debug("received " + s )
-    
-                    #
-                    # no data arriving means: connection closed
-                    #
-                    if len(chunk) == 0:
-                        scratchClient.event_disconnect()
-                        break
-    
-                    data += chunk
-                    #
-                    # there are multiple records possible in one 
-                    # received chunk
-                    # ... as well as the data could not be long enough for a full record.
-                    #
-                    # need at least 4 bytes to identify length of record.
-                    #
-                    while  len(data) >= 4:
-                        #
-                        # there are problems with scratch 1.4 2015-jan-15 on raspbian, not sending data according to bytes, but 
-                        # length according to chars. When there are utf-8-chars in data stream, this is
-                        # not the same.
-                        # For this situation, an emergency recovery strategy is implemented: look for first two bytes of buffer 
-                        # to be zero- it is reasonable that messages are less then 65536 bytes long.
-                        if ord(data[0]) != 0 or ord(data[1]) != 0:
-                            logger.error("fatal: first two bytes of message are not zero, discard data till zeros found")   
-                            discard = 0
-                            while len(data) > 2:
-                                if ord(data[0]) == 0 and ord(data[1]) == 0:
-                                    break
-                                else:
-                                    data = data[1:]
-                                    discard += 1
-                            logger.error("discarded {disc:d} bytes".format(disc=discard))
-                            if not (len(data) >= 4 ):
-                                break
-                        # end of error stratgey
-                        
-                        recordLen = (ord(data[0]) << 24) +     \
-                                    (ord(data[1]) << 16) +     \
-                                    (ord(data[2]) <<  8) +     \
-                                    (ord(data[3]) <<  0 )                
-                        #            
-                        if recordLen > 512:
-                            logger.debug("unusual large record length received: {len:d}".format(len=recordLen))   
-                        #
-                        # are there enough bytes in data for a full record ?
-                        # if not, leave the loop here and wait for more chunks to arrive.
-                        #
-                        if len(data) < 4+recordLen:
-                            if logger.isEnabledFor(logging.DEBUG):
-                                logger.debug("not enough data in buffer, have {have:d}, need {len:d}".format(have=len(data),len=recordLen))   
-                            break   
-                        
-                        record = data[4: 4+recordLen]
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug( 'data received from scratch-Length: %d, Data: %s' , len(record), record)
-                        
-                        self.processRecord ( record )
-                        #
-                        # cut off the record from the received data
-                        #               
-                        data = data[4+recordLen:]
-                        #
-                except socket.timeout:
-                    # if logger.isEnabledFor(logging.DEBUG):
-                    #    logger.debug( "No data received: socket timeout")
-                    continue
-                except Exception as e:
-                    logger.warn(e)
-                    if logger.isEnabledFor(logging.DEBUG):
-                        traceback.print_exc(file=sys.stdout)
+        # 
+        # bytes arriving from the socket are collected in the reader. 
+        # From these, records are extracted.
+        #
+        reader = protocol.RecordReader(BUFFER_SIZE)
+        #
+        while not self.stopped():
+            try:
+                #
+                # get the bytes from the socket
+                # This is not necessarily a full record, just some bytes.
+                # 
+                n = reader.recv(self.scratch_socket)
+                #
+                # no data arriving means: connection closed
+                #
+                if n == 0:
                     scratchClient.event_disconnect()
-                    self.stop()
-                    continue
-                
-        if sys.version_info.major == 3:
-            # 
-            # data is current, aggregated bytes received. From these, records are extracted.
-            #
-            data = b''
-            # 
-            # chunk are bytes arriving from the socket
-            #
-            chunk = b''
-            #
-            # record is a full, interpretable array of bytes. 
-            #
-            record = ''
-            #
-            while not self.stopped():
-                try:
-                    #
-                    # get the bytes from the socket
-                    # This is not necessarily a full record, just some bytes.
-                    # 
-                    chunk =  self.scratch_socket.recv(BUFFER_SIZE) 
-
-                    if logger.isEnabledFor( logging.DEBUG):
-                        s = ''
-                        for xx in chunk:
-                            s += "{xx:02x} ".format(xx=xx)
-                        logger.debug("received " + s )
+                    break
+                #
+                # there are multiple records possible in one 
+                # received chunk
+                # ... as well as the data could not be long enough for a full record.
+                #
+                if tracing.enabled:
+                    tracing.instant('receive', 'rsp', { 'bytes': n })
+                records = reader.records()
+                traffic.bytesReceived += n
+                traffic.recordsReceived += len(records)
+                for data in records:
+                    record = protocol.decode(data)
                     
-    
-                    #
-                    # no data arriving means: connection closed
-                    #
-                    if len(chunk) == 0:
-                        scratchClient.event_disconnect()
-                        break
-    
-                    data += chunk
-                    #
-                    # there are multiple records possible in one 
-                    # received chunk
-                    # ... as well as the data could not be long enough for a full record.
-                    #
-                    # need at least 4 bytes to identify length of record.
-                    #
-                    while  len(data) >= 4:
-                        #
-                        # there are problems with scratch 1.4 2015-jan-15 on raspbian, not sending data according to bytes, but 
-                        # length according to chars. When there are utf-8-chars in data stream, this is
-                        # not the same.
-                        # For this situation, an emergency recovery strategy is implemented: look for first two bytes of buffer 
-                        # to be zero- it is reasonable that messages are less then 65536 bytes long.
-                        if data[0] != 0 or data[1] != 0:
-                            logger.error("fatal: first two bytes of message are not zero, discard data till zeros found")   
-                            discard = 0
-                            while len(data) > 2:
-                                if data[0] == 0 and data[1] == 0:
-                                    break
-                                else:
-                                    data = data[1:]
-                                    discard += 1
-                            logger.error("discarded {disc:d} bytes".format(disc=discard))
-                            if not (len(data) >= 4 ):
-                                break
-                        # end of error stratgey
-                        
-                        recordLen = ( data[0] << 24) +     \
-                                    ( data[1] << 16) +     \
-                                    ( data[2] <<  8) +     \
-                                    ( data[3] <<  0 )                
-                        #            
-                        if recordLen > 512:
-                            logger.debug("unusual large record length received: {len:d}".format(len=recordLen))   
-                        #
-                        # are there enough bytes in data for a full record ?
-                        # if not, leave the loop here and wait for more chunks to arrive.
-                        #
-                        if len(data) < 4+recordLen:
-                            if logger.isEnabledFor(logging.DEBUG):
-                                logger.debug("not enough data in buffer, have {have:d}, need {len:d}".format(have=len(data),len=recordLen))   
-                            break   
-                        
-                        data4 = data[4: 4+recordLen]
-                        #print( data4)
-                        record = data4.decode('utf-8') 
-                        
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug( 'data received from scratch-Length: %d, Data: %s' , len(record), record)
-                        
-                        self.processRecord ( record )
-                        #
-                        # cut off the record from the received data
-                        #               
-                        data = data[4+recordLen: ]
-                        #
-                except socket.timeout:
-                    # if logger.isEnabledFor(logging.DEBUG):
-                    #    logger.debug( "No data received: socket timeout")
-                    continue
-                except Exception as e:
-                    logger.warn(e)
                     if logger.isEnabledFor(logging.DEBUG):
-                        traceback.print_exc(file=sys.stdout)
-                    scratchClient.event_disconnect()
-                    self.stop()
-                    continue
+                        logger.debug( 'data received from scratch-Length: %d, Data: %s' , len(record), record)
+                    
+                    self.processRecord ( record )
+                    
+            except socket.timeout:
+                # if logger.isEnabledFor(logging.DEBUG):
+                #    logger.debug( "No data received: socket timeout")
+                continue
+            except Exception as e:
+                logger.warn(e)
+                if logger.isEnabledFor(logging.DEBUG):
+                    traceback.print_exc(file=sys.stdout)
+                scratchClient.event_disconnect()
+                self.stop()
+                continue
 
         logger.debug("scratchListener thread stopped")
         
-    BROADCAST = 'broadcast'
-    SENSOR_UPDATE = 'sensor-update'
-    LEN_BROADCAST = len(BROADCAST)
-    LEN_SENSOR_UPDATE = len(SENSOR_UPDATE)
-    
     def processRecord(self, dataraw):
-        if  dataraw.startswith(self.BROADCAST):
-
-            if logger.isEnabledFor(logging.DEBUG):
-                logger.debug('broadcast in data: %s' , dataraw)
-                
-            broadcastString = dataraw[ self.LEN_BROADCAST: ]
-            broadcastName = protocol.BroadcastParser(broadcastString ).parse()
-            
-            publishSubscribe.Pub.publish("scratch.input.command.{name:s}".format(name=broadcastName), { 'name':broadcastName } )
-            # self.commandResolver.resolveBroadcast( broadcastName )
-            
-        elif  dataraw.startswith(self.SENSOR_UPDATE):
-            #print(dataraw)
-            if logger.isEnabledFor(logging.DEBUG):
-                logger.debug( "sensor-update rcvd %s" , dataraw) 
-            
-            #
-            # data are name value pairs. name always in quotes, values either quotes or not (for numeric values)
-            # String quotes are handled by doubling the quotes.
-            # 
-            nameValueString = dataraw[ self.LEN_SENSOR_UPDATE: ]
-            # print("parse ", nameValueString)
-            nameValueArray = protocol.NameValueParser(nameValueString ).parse()
-            # print(nameValueArray)
-            # for nv in nameValueArray:
-            #    print("single nv = ", nv)
-            for nv in nameValueArray:
-                # print("process single nv = ", nv)
-                # import pdb; pdb.set_trace()
-                if logger.isEnabledFor(logging.INFO):
-                    logger.info('sensor-update: {name:s}, {value:s}'.format(name=nv[0], value=nv[1]) )
-                    
-                publishSubscribe.Pub.publish("scratch.input.value.{name:s}".format(name=nv[0]), { 'name':nv[0], 'value':nv[1] } )
-            # self.commandResolver.resolveValue(nv[0], nv[1])            
-        else:
-            logger.warn("unknown command in received data " + dataraw )
-    
+        processRecord(dataraw)
+        
 class ThreadManager:
     """the threads are collected here in order to have one point to terminate each of them"""
     threads = None
@@ -684,9 +810,11 @@ class ThreadManager:
         self.socketThreads = []
         
     def append(self, t):
+        profiling.attach(t)
         self.threads.append(t)
             
     def append_socket(self, t):
+        profiling.attach(t)
         self.socketThreads.append(t)    
 
     def cleanup_socket(self):
@@ -701,7 +829,7 @@ class ThreadManager:
             logger.debug("cleanup_socket: wait join %s", str(thread.name ))
             try:
                 thread.join(1)
-                if thread.isAlive():
+                if thread.is_alive():
                     logger.debug("cleanup_socket: wait join %s timeout",  thread.name) 
                 else:
                     logger.debug("cleanup_socket: wait join %s ok",  thread.name)
@@ -721,7 +849,7 @@ class ThreadManager:
             logger.debug("cleanup_threads: wait join %s", thread)
             try:
                 thread.join(1)
-                if thread.isAlive():
+                if thread.is_alive():
                     logger.debug("cleanup_threads: wait join %s timeout",  thread.name) 
                 else:
                     logger.debug("cleanup_threads: wait join %s ok",  thread.name)
@@ -757,11 +885,15 @@ class ScratchClient(threading.Thread):
         self.myQueue = helper.abstractQueue.AbstractQueue()
 
         self.listener = None
-        self.sender = ScratchSender()
+        self.sender = ScratchSender(sendWindow = sendWindow, coalesce = coalesce, traffic = traffic, priority = priority)
+        self.connection = None
         #self.commandResolver = CommandResolver()    
         self.gpioManager = None
         self.managers = []   
         if nogui == False:
+            # imported here: the server module reads scratchClient.modulePathHandler
+            # at import time, so scratchClient must be fully loaded before.
+            import server.scratchClientServer
             self.gui = server.scratchClientServer.ServerThread( parent = self, remote = guiRemote )
             
             environment.append('gui',  self.gui )
@@ -795,8 +927,8 @@ class ScratchClient(threading.Thread):
             return
         # 
         if nogui == False:
-            self.gui.start()
             threadManager.append(self.gui)
+            self.gui.start()
         # -----------------
         #
         # Instantiate the managers for the various hardware resources
@@ -840,6 +972,14 @@ class ScratchClient(threading.Thread):
             import dma.manager
             self.dmaManager = dma.manager.DMAManager()
             self.managers.append(self.dmaManager)
+            
+        self.scheduler = None
+        if schedulerThreads > 0:
+            self.scheduler = scheduler.Scheduler(threads = schedulerThreads)
+            self.managers.append(self.scheduler)
+            
+        self.executor = executor.Executor(threads = executorThreads)
+        self.managers.append(self.executor)
         # -----------------
         for m in self.managers:
             m.setActive(True)
@@ -868,11 +1008,38 @@ class ScratchClient(threading.Thread):
             if adapterMethods.hasMethod('setDMAManager'):
                 module.setDMAManager(self.dmaManager)
             
+            if self.scheduler != None and adapterMethods.hasMethod('poll'):
+                module.setScheduler(self.scheduler)
+            
+            if adapterMethods.hasMethod('setExecutor'):
+                module.setExecutor(self.executor)
+            
         # -----------------------------------------------
         
-        threadManager.append(self)
+        if not useAsyncio:
+            threadManager.append(self)
+        
+        for module in self.config.getAdapters():
+            if module.isInputValueRepeat():
+                for inputValue in module.input_values:
+                    inputValueFilter.repeatNames.update(inputValue.scratchNames)
               
         self.config.configureCommandResolver(self.sender)
+        
+        metrics.register(self.collectMetrics)
+        metrics.register(self.executor.getMetrics)
+        if self.spiManager != None:
+            metrics.register(self.spiManager.getMetrics)
+        if self.i2cManager != None:
+            metrics.register(self.i2cManager.getMetrics)
+        
+        if useAsyncio:
+            import scratchAsyncio
+            self.connection = scratchAsyncio.AsyncioConnection(self, host, port, self.sender, processRecord, BUFFER_SIZE)
+            threadManager.append(self.connection)
+        else:
+            threadManager.append(self.sender)
+            self.sender.start()
 
         if debug:
             publishSubscribe.Pub.report()
@@ -891,6 +1058,14 @@ class ScratchClient(threading.Thread):
             except RuntimeError as e:
                 logger.debug('RuntimeError: setting signals {signal:s}: {exception:s} '.format(signal=sig, exception=str(e) ) )
                 pass
+        try:
+            signal.signal(signal.SIGUSR1, self.traceHandler)
+        except (AttributeError, RuntimeError, ValueError) as e:
+            logger.debug('setting signal SIGUSR1: {exception:s}'.format(exception=str(e) ) )
+        if useAsyncio:
+            # connect, reconnect are done in the event loop
+            self.connection.start()
+            return
         self.start()
         self.event_connect()
 
@@ -898,6 +1073,8 @@ class ScratchClient(threading.Thread):
         self._stopEvent.set()
 
     def stopped(self):
+        if profiling.enabled:
+            profiling.checkpoint()
         return self._stopEvent.isSet()
         
     def run(self):
@@ -931,8 +1108,7 @@ class ScratchClient(threading.Thread):
                 print ("Scratch disconnected")
 
             logger.info("set adapters inactive")
-            for module in self.config.getAdapters():
-                module.setActive(False)
+            self.setAdaptersActive(False)
             # self.gpioManager.setActive(False)
             threadManager.cleanup_socket()
             self.state = self.STATE_DISCONNECTED
@@ -956,6 +1132,7 @@ class ScratchClient(threading.Thread):
             
             with helper.logging.LoggingContext(logger, level=logging.DEBUG):
                 logger.info('Connected to Scratch !')
+            traffic.connects += 1
             
             the_socket.settimeout(SOCKET_TIMEOUT)
 
@@ -965,18 +1142,43 @@ class ScratchClient(threading.Thread):
             threadManager.append_socket(listener)
             #threadManager.append_socket(sender)
             #
-            for module in self.config.getAdapters():
-                module.setActive(True)
+            self.setAdaptersActive(True)
             #print("listener starting")
             
             if logger.isEnabledFor(logging.INFO):
                 logger.info ("Running....")
             listener.start()
-            # self.sender.start()
          
             self.state = self.STATE_CONNECTED
                    
     
+    def collectMetrics(self):
+        """metrics collector, called on scrape"""
+        sender = self.sender
+        yield 'scratchclient_records_received_total', (), traffic.recordsReceived
+        yield 'scratchclient_records_sent_total', (), traffic.recordsSent
+        yield 'scratchclient_bytes_received_total', (), traffic.bytesReceived
+        yield 'scratchclient_bytes_sent_total', (), traffic.bytesSent
+        yield 'scratchclient_connects_total', (('connection', 'scratch'),), traffic.connects
+        yield 'scratchclient_values_coalesced_total', (), sender.coalesced
+        yield 'scratchclient_updates_preferred_total', (), sender.preferred
+        yield 'scratchclient_updates_dropped_total', (), sender.dropped
+        yield 'scratchclient_values_unchanged_total', (), inputValueFilter.unchanged
+        yield 'scratchclient_values_unknown_total', (), publishSubscribe.Pub.rejected
+        yield 'scratchclient_queue_depth', (('queue', 'scratchClient.myQueue'),), self.myQueue.qsize()
+        yield 'scratchclient_queue_depth', (('queue', 'scratchSender.queue'),), sender.queue.qsize()
+        
+        for module in self.config.getAdapters():
+            for name, labels, value in module.getMetrics():
+                yield name, (('adapter', module.name),) + tuple(labels), value
+                
+    def setAdaptersActive(self, active):
+        """called on connect and disconnect"""
+        if active:
+            inputValueFilter.reset()
+        for module in self.config.getAdapters():
+            module.setActive(active)
+        
     def create_socket(self, host, port):
         scratch_sock = None
         # count is used to limit the number of log messages on console
@@ -1034,11 +1236,26 @@ class ScratchClient(threading.Thread):
         # self.stop()
 
         global runIt
+        if pollReport and runIt:
+            self.printPollReport()
         runIt = False
+        
+    def printPollReport(self):
+        print("poll report")
+        for adapter in self.config.getAdapters():
+            if adapter.pollStatistics != None:
+                print("  {n:s}: {s:s}".format(n=adapter.name, s=adapter.pollStatistics.summary()))
        
     def sigHandler(self, signum, frame):
         logger.warn ("received signal %s", str(signum))
         self.shutdown()
+        
+    def traceHandler(self, signum, frame):
+        """SIGUSR1: write trace buffer"""
+        try:
+            tracing.dump(traceFileName)
+        except IOError as e:
+            logger.error("trace not written to %s: %s", traceFileName, e)
 
 class ModulePathHandler:
     modulePath = None
@@ -1126,6 +1343,30 @@ if __name__ == '__main__':
             elif '-guiRemote' == sys.argv[i]:
                 guiRemote = True
             
+            elif '-sendWindow' == sys.argv[i]:
+                i += 1
+                sendWindow = float(sys.argv[i]) / 1000.0
+            
+            elif '-scheduler' == sys.argv[i]:
+                i += 1
+                schedulerThreads = int(sys.argv[i])
+            
+            elif '-executor' == sys.argv[i]:
+                i += 1
+                executorThreads = int(sys.argv[i])
+            
+            elif '-coalesce' == sys.argv[i]:
+                coalesce = True
+            
+            elif '-priority' == sys.argv[i]:
+                priority = True
+            
+            elif '-asyncio' == sys.argv[i]:
+                if sys.version_info < (3, 5):
+                    print('asyncio needs python 3.5 or later, ignored')
+                else:
+                    useAsyncio = True
+            
             elif '-help' == sys.argv[i]:
                 print(commandlineHelp)
                 sys.exit(1)
@@ -1145,6 +1386,22 @@ if __name__ == '__main__':
             elif '-validate' == sys.argv[i]:
                 validate = True
                 
+            elif '-pollreport' == sys.argv[i]:
+                pollReport = True
+                
+            elif '-profile' == sys.argv[i]:
+                i += 1
+                try:
+                    profiling.configure(sys.argv[i])
+                except ValueError as e:
+                    print("-profile, profiler not enabled:", e)
+                    sys.exit(1)
+                
+            elif '-trace' == sys.argv[i]:
+                i += 1
+                traceFileName = sys.argv[i]
+                tracing.start()
+                
             elif '-singletonIPC' == sys.argv[i]:
                 singletonFlag = 'IPC' 
             elif '-singletonPID' == sys.argv[i]:
@@ -42,6 +42,9 @@ from ws4py.websocket import WebSocket
     
 import xml.etree.ElementTree as ET
 import publishSubscribe
+import metrics
+import tracing
+import profiling
 
 import adapter.adapters 
 
@@ -1064,38 +1067,39 @@ class AdapterAnimationWebSocket(WebSocket):
             publishSubscribe.Pub.publish('scratch.output.value.{name:s}'.format(name=msg['scratch']), { 'name':msg['scratch'], 'value':msg['value'] } ) 
         
     def opened(self):
+        #
+        # one prefix subscription per message type; the names known in config
+        # are collected to suppress traffic for variables not displayed.
+        #
+        self.inputCommandNames = set()
+        self.inputValueNames = set()
+        self.outputCommandNames = set()
+        self.outputValueNames = set()
+        
         for _adapter in parentApplication.config.getAdapters():
             for inp in _adapter.inputs:
-                for scratchName in inp.scratchNames:
-                    publishSubscribe.Pub.subscribe("scratch.input.command.{name:s}".format(name=scratchName), self.inputCommand  )
+                self.inputCommandNames.update( inp.scratchNames )
             for inp in _adapter.input_values:
-                for scratchName in inp.scratchNames:
-                    publishSubscribe.Pub.subscribe("scratch.input.value.{name:s}".format(name=scratchName), self.inputValue )
-            
+                self.inputValueNames.update( inp.scratchNames )
             for out in _adapter.outputs:
-                for scratchName in out.scratchNames:
-                    publishSubscribe.Pub.subscribe("scratch.output.command.{name:s}".format(name=scratchName), self.outputCommand )
+                self.outputCommandNames.update( out.scratchNames )
             for out in _adapter.output_values:
-                for scratchName in out.scratchNames:
-                    publishSubscribe.Pub.subscribe("scratch.output.value.{name:s}".format(name=scratchName), self.outputValue )
+                self.outputValueNames.update( out.scratchNames )
+                
+        publishSubscribe.Pub.subscribe("scratch.input.command.*", self.inputCommand )
+        publishSubscribe.Pub.subscribe("scratch.input.value.*", self.inputValue )
+        publishSubscribe.Pub.subscribe("scratch.output.command.*", self.outputCommand )
+        publishSubscribe.Pub.subscribe("scratch.output.value.*", self.outputValue )
         
     def closed(self, code, reason=None):
-        for _adapter in parentApplication.config.getAdapters():
-            for inp in _adapter.inputs:
-                for scratchName in inp.scratchNames:
-                    publishSubscribe.Pub.unsubscribe("scratch.input.command.{name:s}".format(name=scratchName), self.inputCommand  )
-            for inp in _adapter.input_values:
-                for scratchName in inp.scratchNames:
-                    publishSubscribe.Pub.unsubscribe("scratch.input.value.{name:s}".format(name=scratchName), self.inputValue )
-            
-            for out in _adapter.outputs:
-                for scratchName in out.scratchNames:
-                    publishSubscribe.Pub.unsubscribe("scratch.output.command.{name:s}".format(name=scratchName), self.outputCommand )
-            for out in _adapter.output_values:
-                for scratchName in out.scratchNames:
-                    publishSubscribe.Pub.unsubscribe("scratch.output.value.{name:s}".format(name=scratchName), self.outputValue )        
+        publishSubscribe.Pub.unsubscribe("scratch.input.command.*", self.inputCommand )
+        publishSubscribe.Pub.unsubscribe("scratch.input.value.*", self.inputValue )
+        publishSubscribe.Pub.unsubscribe("scratch.output.command.*", self.outputCommand )
+        publishSubscribe.Pub.unsubscribe("scratch.output.value.*", self.outputValue )
         
     def inputValue(self, message):
+        if not message['name'] in self.inputValueNames:
+            return
         message['command'] = 'scratch_input_value'
         if not self.terminated:
             try:
@@ -1106,6 +1110,8 @@ class AdapterAnimationWebSocket(WebSocket):
                 pass
         
     def inputCommand(self, message):
+        if not message['name'] in self.inputCommandNames:
+            return
         message['command'] = 'scratch_input_command'
         if not self.terminated:
             try:
@@ -1116,6 +1122,8 @@ class AdapterAnimationWebSocket(WebSocket):
                 pass
                 
     def outputValue(self, message):
+        if not message['name'] in self.outputValueNames:
+            return
         message['command'] = 'scratch_output_value'
         if not self.terminated:
             try:
@@ -1126,6 +1134,8 @@ class AdapterAnimationWebSocket(WebSocket):
                 pass
             
     def outputCommand(self, message):
+        if not message['name'] in self.outputCommandNames:
+            return
         message['command'] = 'scratch_output_command'
         if not self.terminated:
             try:
@@ -1160,6 +1170,102 @@ class ValueHandler:
         # eventHandler.resolveValue(self, adapter, command, value, qualifier='output')
         return ""
 
+# ------------------------------------------------------------------------------------------------
+# cherrypy-Handler
+#
+class PollHandler(BaseHandler):
+    """loop period statistics of the polling adapters"""
+    
+    def ms(self, t):
+        if t == None:
+            return '-'
+        return '{t:.2f}'.format(t=t * 1000.0)
+    
+    def get(self):
+        rows = []
+        for _adapter in parentApplication.config.getAdapters():
+            stats = _adapter.pollStatistics
+            if stats == None:
+                continue
+            p99 = stats.jitterPercentile(99)
+            if stats.loops == 0:
+                p99 = '-'
+            elif p99 == None:
+                p99 = '> ' + self.ms(metrics.BUCKETS[-1])
+            else:
+                p99 = '<= ' + self.ms(p99)
+            jitter = None
+            if stats.loops > 0:
+                jitter = stats.jitterSum / stats.loops
+            rows.append( { 'name': _adapter.name, 
+                           'interval': self.ms(stats.interval),
+                           'loops': stats.loops,
+                           'mean': self.ms(stats.periodMean()),
+                           'min': self.ms(stats.periodMin),
+                           'max': self.ms(stats.periodMax),
+                           'jitter': self.ms(jitter),
+                           'p99': p99,
+                           'overruns': stats.overruns } )
+            
+        return self.render_response('html/poll.html', { 'rows': rows })
+        
+# ------------------------------------------------------------------------------------------------
+# cherrypy-Handler
+#
+class MetricsHandler:
+    """runtime metrics, prometheus text format or json"""
+    
+    def text(self):
+        cherrypy.response.headers['Content-Type'] = metrics.CONTENT_TYPE
+        return metrics.prometheusText()
+    
+    def json(self):
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        # no text/* type, not encoded by cherrypy
+        return metrics.jsonText().encode('utf-8')
+        
+# ------------------------------------------------------------------------------------------------
+# cherrypy-Handler
+#
+class TraceHandler:
+    """start, stop (POST) and download event tracing"""
+    
+    def start(self):
+        tracing.clear()
+        tracing.start()
+        raise cherrypy.HTTPRedirect('/')
+    
+    def stop(self):
+        tracing.stop()
+        raise cherrypy.HTTPRedirect('/')
+    
+    def get(self):
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        cherrypy.response.headers['Content-Disposition'] = 'attachment; filename="scratchClient.trace.json"'
+        # no text/* type, not encoded by cherrypy
+        return tracing.chromeTrace().encode('utf-8')
+        
+# ------------------------------------------------------------------------------------------------
+# cherrypy-Handler
+#
+class ProfileHandler:
+    """start, stop and write (POST) the profiles"""
+    
+    def _request(self, f):
+        if not profiling.enabled:
+            return "profiling needs command line switch -profile &lt;file&gt;"
+        f()
+        raise cherrypy.HTTPRedirect('/')
+        
+    def start(self):
+        return self._request(profiling.start)
+    
+    def stop(self):
+        return self._request(profiling.stop)
+    
+    def write(self):
+        return self._request(profiling.write)
+        
 parentApplication = None
 remote = False
 
@@ -1274,6 +1380,10 @@ class ServerThread(threading.Thread):
 
             value = ValueHandler()
             fileHandler = FileProvider()
+            metricsHandler = MetricsHandler()
+            pollHandler = PollHandler()
+            traceHandler = TraceHandler()
+            profileHandler = ProfileHandler()
             
             
             self.dispatcher.connect(name='main'      , route='/'                 , controller=self.main    , action='get')
@@ -1286,6 +1396,17 @@ class ServerThread(threading.Thread):
             self.dispatcher.connect(name='value_out' , route='/value/output'     , controller=value   , action='output')
 
             self.dispatcher.connect(name='adapters'  , route='/adapters'         , controller=adapters, action='get')
+            
+            self.dispatcher.connect(name='poll'        , route='/poll'           , controller=pollHandler, action='get')
+            self.dispatcher.connect(name='trace'       , route='/trace'          , controller=traceHandler, action='get')
+            # state changes: POST only, a prefetch or reload must not start or stop them
+            self.dispatcher.connect(name='trace_start' , route='/trace/start'    , controller=traceHandler, action='start', conditions=dict(method=['POST']))
+            self.dispatcher.connect(name='trace_stop'  , route='/trace/stop'     , controller=traceHandler, action='stop' , conditions=dict(method=['POST']))
+            self.dispatcher.connect(name='profile_start', route='/profile/start' , controller=profileHandler, action='start', conditions=dict(method=['POST']))
+            self.dispatcher.connect(name='profile_stop' , route='/profile/stop'  , controller=profileHandler, action='stop' , conditions=dict(method=['POST']))
+            self.dispatcher.connect(name='profile_write', route='/profile/write' , controller=profileHandler, action='write', conditions=dict(method=['POST']))
+            self.dispatcher.connect(name='metrics'     , route='/metrics'        , controller=metricsHandler, action='text')
+            self.dispatcher.connect(name='metrics_json', route='/metrics.json'   , controller=metricsHandler, action='json')
             # serverEvent-Requests
             #dispatcher.connect(name='events'    , route='/events'           , controller=event   , action='event')
 
@@ -138,7 +138,7 @@ class SingletonIPC:
         self._stopEvent.set()
         if self.thread != None:
             self.thread.join(1)
-            if self.thread.isAlive():
+            if self.thread.is_alive():
                 logger.debug(self.name +  " no timely join in adapter")
     
     def _timer(self):
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+
+import threading
+import time
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 
+# spidev for test purposes, used off the pi with 
+#   SPIManager(spidevModule = spi.TEST_spidev)
+#
+# Devices answer with zeros unless a responder is set by
+# setResponder(bus, device, responder); responder(data) returns the bytes
+# received. A transfer takes transferTime seconds.
+# Each SpiDev counts the mode and max_speed_hz writes (ioctl on the pi) and
+# the transfers; transfers overlapping on a bus are counted in 'overlaps'.
+#
+
+debug = False
+
+# (bus, device) --> responder
+responders = {}
+transferTime = 0.0
+overlaps = 0
+
+_lock = threading.Lock()
+# bus --> transfers running
+_active = {}
+
+def setResponder(bus, device, responder):
+    responders[(bus, device)] = responder
+
+def reset():
+    global overlaps
+    responders.clear()
+    _active.clear()
+    overlaps = 0
+
+class SpiDev(object):
+    """spidev.SpiDev"""
+    
+    bus = None
+    device = None
+    
+    def __init__(self):
+        self._mode = 0
+        self._max_speed_hz = 125000000
+        self.settings = 0
+        self.transfers = 0
+        
+    def _getMode(self):
+        return self._mode
+    
+    def _setMode(self, mode):
+        self.settings += 1
+        self._mode = mode
+        
+    mode = property(_getMode, _setMode)
+    
+    def _getMaxSpeedHz(self):
+        return self._max_speed_hz
+    
+    def _setMaxSpeedHz(self, max_speed_hz):
+        self.settings += 1
+        self._max_speed_hz = max_speed_hz
+        
+    max_speed_hz = property(_getMaxSpeedHz, _setMaxSpeedHz)
+    
+    def open(self, bus, device):
+        if debug:
+            print("SpiDev.open()", bus, device)
+        self.bus = bus
+        self.device = device
+        
+    def close(self):
+        if debug:
+            print("SpiDev.close()", self.bus, self.device)
+        
+    def _transfer(self, data):
+        global overlaps
+        with _lock:
+            n = _active.get(self.bus, 0)
+            if n > 0:
+                overlaps += 1
+            _active[self.bus] = n + 1
+        try:
+            self.transfers += 1
+            if transferTime > 0:
+                time.sleep(transferTime)
+            responder = responders.get((self.bus, self.device))
+            if responder == None:
+                return [0] * len(data)
+            return list(responder(list(data)))
+        finally:
+            with _lock:
+                _active[self.bus] -= 1
+            
+    def xfer(self, data):
+        return self._transfer(data)
+    
+    def xfer2(self, data):
+        return self._transfer(data)
+    
+    def writebytes(self, data):
+        self._transfer(data)
+        
+    def readbytes(self, n):
+        return self._transfer([0] * n)
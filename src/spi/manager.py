@@ -16,8 +16,16 @@
     # ---------------------------------------------------------------------------------------------
 
 # 
+# Each device (bus, chip select) is opened once and shared by the adapters.
+# The devices of a bus are behind an arbiter: a transaction (one transfer, or
+# a sequence like an adc scan) holds the bus lock, so transfers of adapter
+# threads do not interleave. Mode and max_speed_hz are written to spidev 
+# when they change only, each is an ioctl.
+# Per device, transactions, bytes, time on the bus and time waited for the
+# bus are counted and reported as metrics.
 #
-#
+import contextlib
+import threading
 import time
 import logging
 logger = logging.getLogger(__name__)
@@ -25,15 +33,117 @@ logger = logging.getLogger(__name__)
 try:
     import spidev
 except ImportError as e:
+    spidev = None
     logger.warn(e)        
 
-class _SPIData:
+try:
+    clock = time.monotonic
+except AttributeError:
+    clock = time.time
+
+class _SPIBus:
+    """arbiter of a bus, serializes the transactions of its devices"""
+    
+    def __init__(self, bus):
+        self.bus = bus
+        # reentrant, handlers call transfers inside a transaction
+        self.lock = threading.RLock()
+        
+class _SPIDevice:
+    """a device on a bus, used like spidev.SpiDev by handlers and adapters.
+    mode and max_speed_hz are the wanted settings, applied before the next
+    transfer if they differ from those in spidev."""
+    
     spi = None
     spiHandler = None
     
-    def __init__(self, spi, spiHandler):
+    mode = None
+    max_speed_hz = None
+    
+    def __init__(self, arbiter, device, spi, spiHandler):
+        self.arbiter = arbiter
+        self.bus = arbiter.bus
+        self.device = device
         self.spi = spi
         self.spiHandler = spiHandler
+        # adapters using the device
+        self.users = 0
+        # settings in spidev
+        self._mode = None
+        self._max_speed_hz = None
+        # nesting of transaction(), bus lock held when > 0
+        self._depth = 0
+        self._start = 0.0
+        # statistics
+        self.transactions = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.waitSeconds = 0.0
+        self.settings = 0
+        
+    @contextlib.contextmanager
+    def transaction(self):
+        """holds the bus; with a handler, its settings are used"""
+        t = clock()
+        self.arbiter.lock.acquire()
+        try:
+            self._depth += 1
+            if self._depth == 1:
+                self._start = clock()
+                self.waitSeconds += self._start - t
+                if self.spiHandler != None:
+                    self.mode = self.spiHandler.mode
+                    self.max_speed_hz = self.spiHandler.max_speed_hz
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.transactions += 1
+                self.seconds += clock() - self._start
+            self.arbiter.lock.release()
+            
+    def _apply(self):
+        """called in a transaction"""
+        if self.mode != None and self.mode != self._mode:
+            self.spi.mode = self.mode
+            self._mode = self.mode
+            self.settings += 1
+        if self.max_speed_hz != None and self.max_speed_hz != self._max_speed_hz:
+            self.spi.max_speed_hz = self.max_speed_hz
+            self._max_speed_hz = self.max_speed_hz
+            self.settings += 1
+            
+    def xfer2(self, data):
+        with self.transaction():
+            self._apply()
+            self.bytes += len(data)
+            return self.spi.xfer2(data)
+        
+    def xfer(self, data):
+        with self.transaction():
+            self._apply()
+            self.bytes += len(data)
+            return self.spi.xfer(data)
+        
+    def writebytes(self, data):
+        with self.transaction():
+            self._apply()
+            self.bytes += len(data)
+            return self.spi.writebytes(data)
+        
+    def readbytes(self, n):
+        with self.transaction():
+            self._apply()
+            self.bytes += n
+            return self.spi.readbytes(n)
+        
+    def getMetrics(self):
+        labels = (('bus', str(self.bus)), ('device', str(self.device)))
+        yield 'scratchclient_spi_transactions_total', labels, self.transactions
+        yield 'scratchclient_spi_bytes_total', labels, self.bytes
+        yield 'scratchclient_spi_seconds_total', labels, self.seconds
+        yield 'scratchclient_spi_wait_seconds_total', labels, self.waitSeconds
+        yield 'scratchclient_spi_settings_total', labels, self.settings
         
 class _SPIRegistry:
     
@@ -41,6 +151,8 @@ class _SPIRegistry:
     
     def __init__(self):
         self.spiBusDeviceHandler = {}
+        # bus --> _SPIBus
+        self.buses = {}
     
     def getBusDeviceHandler(self, bus, device):
         k = str(bus) + '$' + str(device)
@@ -51,8 +163,22 @@ class _SPIRegistry:
     
     def addBusDeviceHandler(self, bus, device, spi, spiHandler):
         k = str(bus) + '$' + str(device)
-        self.spiBusDeviceHandler[k] = _SPIData(spi, spiHandler)
+        arbiter = self.buses.get(bus)
+        if arbiter == None:
+            arbiter = _SPIBus(bus)
+            self.buses[bus] = arbiter
+        spiDevice = _SPIDevice(arbiter, device, spi, spiHandler)
+        self.spiBusDeviceHandler[k] = spiDevice
+        return spiDevice
+    
+    def removeBusDeviceHandler(self, bus, device):
+        k = str(bus) + '$' + str(device)
+        spiDevice = self.spiBusDeviceHandler.pop(k)
+        spiDevice.spi.close()
         
+    def getDevices(self):
+        return list(self.spiBusDeviceHandler.values())
+    
     def closeAll(self):
         for k in self.spiBusDeviceHandler.keys():
             spiData = self.spiBusDeviceHandler[k]
@@ -61,6 +187,9 @@ class _SPIRegistry:
 
             
 class _Handler_WS2801:
+    mode = 0
+    max_speed_hz = 2000000
+    
     def __init__(self):
         pass
     
@@ -69,23 +198,31 @@ class _Handler_WS2801:
     
     def writeValue(self, spi, channel, data):
 
-        spi.max_speed_hz = 2000000
         # print(data)
         r = spi.xfer2(data)
         return r 
     
     def writeRawData(self, spi, data):
 
-        spi.max_speed_hz = 2000000
         # print(data)
         r = spi.xfer2( list( data) )
         return r 
 
 class _Handler_MCP3202_10bit:
+    mode = 0
+    max_speed_hz = 500000
+    
     def __init__(self):
         pass
     
     def getValue(self, spi, channel):
+        return self.read(spi, channel)
+    
+    def scan(self, spi, channels):
+        """one conversion per channel, back to back"""
+        return [ self.read(spi, channel) for channel in channels ]
+    
+    def read(self, spi, channel):
         # EXPLANATION of 
         # r = spi.xfer2([1,(2+channel)<<6,0])
         # Send start bit, sgl/diff, odd/sign, MSBF 
@@ -99,8 +236,6 @@ class _Handler_MCP3202_10bit:
         # We must then parse out the correct 10-bit byte from the 24 bits returned. The following line discards
         # all bits but the 10 data bits from the center of the last 2 bytes: XXXX XXXX - XXXX DDDD - DDDD DDXX 
 
-        spi.max_speed_hz = 500000
-        
         i = [ 1, (2+channel)<<6, 0  ]
         # print(" i {r0:08b} {r1:08b} {r2:08b} {r3:08b} ".format(r0=i[0], r1=i[1], r2=i[2], r3=i[3]))
         
@@ -117,9 +252,20 @@ class _Handler_MCP3202_10bit:
         pass
     
 class _Handler_MCP3202_12bit:
+    mode = 0
+    max_speed_hz = 800000
+    
     def __init__(self):
         pass
+    
     def getValue(self, spi, channel):
+        return self.read(spi, channel)
+    
+    def scan(self, spi, channels):
+        """one conversion per channel, back to back"""
+        return [ self.read(spi, channel) for channel in channels ]
+    
+    def read(self, spi, channel):
         # EXPLANATION of 
         # r = spi.xfer2([1,(2+channel)<<6,0])
         # Send start bit, sgl/diff, odd/sign, MSBF 
@@ -133,7 +279,6 @@ class _Handler_MCP3202_12bit:
         # We must then parse out the correct 12-bit byte from the 24 bits returned. The following line discards
         # all bits but the 12 data bits from the center of the last 2 bytes: XXXX XXXX - XXXX DDDD - DDDD DDDD 
 
-        spi.max_speed_hz = 800000
         r = spi.xfer2([1, (2+channel)<<6, 0])  # these two lines are explained in more detail at the bottom
         ret = ((r[1]&31) << 8) + (r[2] )
         return ret 
@@ -143,7 +288,37 @@ class _Handler_MCP3202_12bit:
     def writeRawData(self, spi, data):
         pass
 
+class _Handler_MCP3008:
+    mode = 0
+    # data sheet: 1.35MHz @2.7V
+    max_speed_hz = 1350000
+    
+    def __init__(self):
+        pass
+    
+    def getValue(self, spi, channel):
+        return self.read(spi, channel)
+    
+    def scan(self, spi, channels):
+        """one conversion per channel, back to back. A conversion starts
+        with chip select, so the channels can't share one xfer2"""
+        return [ self.read(spi, channel) for channel in channels ]
+    
+    def read(self, spi, channel):
+        # start bit, single ended, channel in the upper nibble
+        r = spi.xfer2([1, (8+channel) << 4, 0])
+        # 10 data bits, XXXX XXXX - XXXX XXDD - DDDD DDDD
+        return ((r[1]&3) << 8) + r[2]
+    
+    def writeValue(self, spi, channel, data):
+        pass
+    def writeRawData(self, spi, data):
+        pass
+
 class _Handler_MAX31855:
+    mode = 0
+    max_speed_hz = 5000000
+    
     def __init__(self):
         pass
     def getValue(self, spi, channel):
@@ -160,7 +335,6 @@ class _Handler_MAX31855:
         # We must then parse out the correct 12-bit byte from the 24 bits returned. The following line discards
         # all bits but the 12 data bits from the center of the last 2 bytes: XXXX XXXX - XXXX DDDD - DDDD DDDD 
 
-        spi.max_speed_hz = 5000000
         r = spi.xfer2([0,0,0,0])  # these two lines are explained in more detail at the bottom
         # print(" r {r0:08b} {r1:08b} {r2:08b} {r3:08b} ".format(r0=r[0], r1=r[1], r2=r[2], r3=r[3]))
 
@@ -196,6 +370,7 @@ class _Handler_MAX31855:
     
 
 class _Handler_MCP23S17:
+    mode = 0
     
     def __init__(self):
         self.max_speed_hz = 10000000
@@ -210,7 +385,6 @@ class _Handler_MCP23S17:
         pass
     
     def writeRawData(self, spi, data):
-        spi.max_speed_hz = self.max_speed_hz
         r = spi.xfer2( list(data)  ) 
         return r
     
@@ -222,6 +396,7 @@ class _Handler_Atmel328:
     # 200000 --> 125kHz, byte gap 12.5 us
     # 240000 --> 250kHz, byte gap 6 us
     
+    mode = 0
     max_speed_hz = 120000
     
     def __init__(self):
@@ -235,7 +410,6 @@ class _Handler_Atmel328:
         pass
        
     def writeRawData(self, spi, dataList):
-        spi.max_speed_hz = self.max_speed_hz
         r = spi.xfer2( list(dataList)  ) 
         return r
             
@@ -252,6 +426,7 @@ class SPIManager:
     #
     type_MCP3202_10bit = 'MCP3202_10'
     type_MCP3202_12bit = 'MCP3202_12'
+    type_MCP3008       = 'MCP3008'
     type_WS2801        = 'WS2801'
     type_Atmel328      = 'Atmel328'
     type_MAX31855      = 'MCP31855'
@@ -260,54 +435,96 @@ class SPIManager:
     handlers = {
                 type_MCP3202_10bit: _Handler_MCP3202_10bit() ,
                 type_MCP3202_12bit: _Handler_MCP3202_12bit() ,
+                type_MCP3008      : _Handler_MCP3008()       ,
                 type_WS2801       : _Handler_WS2801()        ,
                 type_Atmel328     : _Handler_Atmel328()      ,
                 type_MAX31855     : _Handler_MAX31855()      ,
                 type_MCP23S17     : _Handler_MCP23S17()      ,
                 }
         
-    def __init__(self):
+    def __init__(self, spidevModule = None):
+        """spidevModule replaces spidev, e.g. spi.TEST_spidev off the pi"""
         self.spiRegistry = _SPIRegistry()
+        self.spidevModule = spidevModule
+        self._lock = threading.Lock()
 
     def setActive(self, state):
-        """called from main module, but has no function for this manager"""
-        pass
+        """devices still open are closed on shutdown"""
+        if not state:
+            with self._lock:
+                self.spiRegistry.closeAll()
     
-    def open(self, bus, device, deviceType ):
-        #
-        # avoid multiple open
-        #
-        if None == self.spiRegistry.getBusDeviceHandler(bus, device):
-            
-            # print("spi.open()")
-            spi_0 = spidev.SpiDev()
-            spi_0.open(bus, device)
-            time.sleep(0.1)
-            
-            handler = self.handlers[deviceType]
-            if handler == None:
-                raise Exception("no handler defined")
-            
-            self.spiRegistry.addBusDeviceHandler(
-                                                 bus,
-                                                 device,
-                                                 spi_0,
-                                                 handler )
+    def open(self, bus, device, deviceType = None ):
+        """open a device, or use the open one. deviceType selects the handler,
+        None for adapters doing their own transfers on the device returned"""
+        with self._lock:
+            spiDevice = self.spiRegistry.getBusDeviceHandler(bus, device)
+            if None == spiDevice:
+                module = self.spidevModule
+                if module == None:
+                    module = spidev
+                if module == None:
+                    raise Exception("spidev not available")
+                
+                # print("spi.open()")
+                spi_0 = module.SpiDev()
+                spi_0.open(bus, device)
+                time.sleep(0.1)
+                
+                spiDevice = self.spiRegistry.addBusDeviceHandler(
+                                                     bus,
+                                                     device,
+                                                     spi_0,
+                                                     None )
+            if deviceType != None:
+                handler = self.handlers[deviceType]
+                if handler == None:
+                    raise Exception("no handler defined")
+                spiDevice.spiHandler = handler
+            spiDevice.users += 1
+            return spiDevice
 
     def getValue(self, bus, device, channel):
         spiData = self.spiRegistry.getBusDeviceHandler(bus, device)
-        return spiData.spiHandler.getValue(spiData.spi, channel)
+        with spiData.transaction():
+            return spiData.spiHandler.getValue(spiData, channel)
+
+    def scan(self, bus, device, channels):
+        """values of a multi channel adc, the channels read in one pass"""
+        spiData = self.spiRegistry.getBusDeviceHandler(bus, device)
+        with spiData.transaction():
+            return spiData.spiHandler.scan(spiData, channels)
 
     def writeValue(self, bus, device, channel, data):
         spiData = self.spiRegistry.getBusDeviceHandler(bus, device)
-        return spiData.spiHandler.writeValue(spiData.spi, channel, data)
+        with spiData.transaction():
+            return spiData.spiHandler.writeValue(spiData, channel, data)
     
     def writeRawData ( self, bus, device, data ):
         # print("writeRawData", bus, device, data)
         spiData = self.spiRegistry.getBusDeviceHandler(bus, device)
-        r =  spiData.spiHandler.writeRawData (spiData.spi, data )
+        with spiData.transaction():
+            r =  spiData.spiHandler.writeRawData (spiData, data )
         return r
     
-    def close(self):
-        """closes all connections, selective shutdowns are not implemented"""
-        self.spiRegistry.closeAll()
+    def close(self, bus = None, device = None):
+        """a device is closed when the last adapter using it closes it.
+        Without bus, device all connections are closed"""
+        with self._lock:
+            if bus == None:
+                self.spiRegistry.closeAll()
+                return
+            spiDevice = self.spiRegistry.getBusDeviceHandler(bus, device)
+            if spiDevice == None:
+                return
+            spiDevice.users -= 1
+            if spiDevice.users <= 0:
+                self.spiRegistry.removeBusDeviceHandler(bus, device)
+        
+    def getMetrics(self):
+        """metrics collector, called on scrape"""
+        with self._lock:
+            devices = self.spiRegistry.getDevices()
+        for spiDevice in devices:
+            for sample in spiDevice.getMetrics():
+                yield sample
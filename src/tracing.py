@@ -0,0 +1,123 @@
+    # --------------------------------------------------------------------------------------------
+    # Copyright (C) 2013  Gerhard Hepp
+    #
+    # This program is free software; you can redistribute it and/or modify it under the terms of
+    # the GNU General Public License as published by the Free Software Foundation; either version 2
+    # of the License, or (at your option) any later version.
+    #
+    # This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+    # without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+    # See the GNU General Public License for more details.
+    #
+    # You should have received a copy of the GNU General Public License along with this program; if
+    # not, write to the Free Software Foundation, Inc., 51 Franklin St, Fifth Floor, Boston,
+    # MA 02110, USA
+    # ---------------------------------------------------------------------------------------------
+#
+# event tracing into a fixed size ring buffer, dumped in chrome trace event
+# format (load in chrome://tracing or https://ui.perfetto.dev).
+#
+# Stages traced: receive in listener, parse, publish, adapter method,
+# GPIOManager call, queue and socket write in sender.
+#
+# Each trace point is guarded by 'if tracing.enabled:', so the disabled path
+# is this check only. Recording does not lock: the slot index comes from an
+# itertools.count, which is atomic in CPython.
+#
+
+import itertools
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+debug = False
+
+enabled = False
+
+# number of events kept
+SIZE = 65536
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+try:
+    _ident = threading.get_ident
+except AttributeError:
+    import thread
+    _ident = thread.get_ident
+
+_buffer = [None] * SIZE
+_counter = itertools.count()
+# thread ident --> thread name
+_threadNames = {}
+
+def start():
+    global enabled
+    logger.info("tracing started")
+    enabled = True
+
+def stop():
+    global enabled
+    logger.info("tracing stopped")
+    enabled = False
+
+def clear():
+    global _buffer, _counter
+    _buffer = [None] * SIZE
+    _counter = itertools.count()
+
+def _tid():
+    tid = _ident()
+    if not tid in _threadNames:
+        _threadNames[tid] = threading.current_thread().name
+    return tid
+
+def complete(name, category, t0, args = None):
+    """a span from t0 (taken from tracing.clock()) till now"""
+    t1 = clock()
+    _buffer[ next(_counter) % SIZE ] = ('X', name, category, t0, t1 - t0, _tid(), args)
+
+def instant(name, category, args = None):
+    _buffer[ next(_counter) % SIZE ] = ('i', name, category, clock(), 0, _tid(), args)
+
+def events():
+    """recorded events, oldest first"""
+    buf = list(_buffer)
+    # the next slot to be written holds the oldest event
+    n = next(_counter)
+    i = n % SIZE
+    if n < SIZE:
+        return [ e for e in buf[:i] if e != None ]
+    return [ e for e in buf[i:] + buf[:i] if e != None ]
+
+def chromeTrace():
+    """recorded events as chrome trace event json"""
+    result = []
+    tids = set()
+    for phase, name, category, t, duration, tid, args in events():
+        event = { 'name': name, 'cat': category, 'ph': phase,
+                  'ts': t * 1000000.0, 'pid': 1, 'tid': tid }
+        if phase == 'X':
+            event['dur'] = duration * 1000000.0
+        else:
+            # instant event, thread scope
+            event['s'] = 't'
+        if args != None:
+            event['args'] = args
+        result.append(event)
+        tids.add(tid)
+    for tid in tids:
+        result.append( { 'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                         'args': { 'name': _threadNames.get(tid, str(tid)) } } )
+    return json.dumps( { 'traceEvents': result, 'displayTimeUnit': 'ms' } )
+
+def dump(fileName):
+    """write chrome trace json to file"""
+    with open(fileName, 'w') as f:
+        f.write( chromeTrace() )
+    logger.info("trace written to %s", fileName)